@@ -0,0 +1,25 @@
+import importlib
+
+# loaded on first use, so importing gqlclient.core for the generated configs
+# does not pull in the HTTP and asyncio stacks
+_LAZY = {
+    'GQLClient': '.client',
+    'AsyncGQLClient': '.aio',
+    'apaginate': '.pagination',
+    'paginate': '.pagination',
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
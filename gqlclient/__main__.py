@@ -1,11 +1,37 @@
-from typing import (Dict, Any, Tuple)
+from typing import (Dict, Any, Iterator, List, Tuple)
+import argparse
+import hashlib
+import json
 import keyword
 import os
+import shutil
+import sys
 
 root = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
 WORK_DIR = f'{root}/build'
 SCHEMA_PATH = f'{root}/tests/shopify.schema.json'
 CLASS_FIELDS_DICT = {}
+SCHEMA_INDEX = {}
+# size of the write buffer of every generated file
+BUFFER_SIZE = 1 << 20
+
+COMMON_HEADER = '''from typing import Any
+from gqlclient.core import *
+from gqlclient.core import _GQLConfig
+'''
+PYI_HEADER = 'from .common import *\n'
+CONFIG_PY_HEADER = 'from .common import _GQLConfig,NewType,directive_impl\nfrom .routing import ROUTES\n'
+ROUTING_HEADER = 'from .common import FragmentRoutes\n'
+MODEL_HEADER = '''from gqlclient.model import Model as _Model
+
+
+class Model(_Model):
+\t\'\'\'Base of the models of this module, nested types are looked up among them.\'\'\'
+\t__slots__ = ()
+\t_registry = {}
+
+
+'''
 
 
 def get_inherited_fields(super_types: list) -> set:
@@ -22,13 +48,38 @@ def visit_object(data: Dict[str, Any]) -> str:
     if interfaces_list:
         interfaces_list = f"({interfaces_list})"
 
-    object_str = f"class {data['name']}{interfaces_list}:\n"
-    object_str += f"\t'''{data['description']}'''\n"
+    parts = [
+        f"class {data['name']}{interfaces_list}:\n",
+        f"\t'''{data['description']}'''\n",
+    ]
+    parts.extend(visit_field(field, excludes) for field in data['fields'])
+    return ''.join(parts)
 
-    for field in data['fields']:
-        object_str += visit_field(field, excludes)
 
-    return object_str
+def visit_model(data: Dict[str, Any]) -> str:
+    slots = []
+    fields = {}
+    renames = {}
+    for field in data['fields']:
+        name = field['name']
+        attr = name
+        if name in keyword.kwlist:
+            attr += '_'
+            renames[name] = attr
+        typ = field['type']
+        while typ['ofType']:
+            typ = typ['ofType']
+        slots.append(attr)
+        fields[name] = typ['name'] if typ['kind'] in ('OBJECT', 'INTERFACE', 'UNION') else None
+
+    parts = [
+        f"class {data['name']}(Model):\n",
+        f"\t__slots__ = {tuple(slots)}\n",
+        f"\t_fields = {fields}\n",
+    ]
+    if renames:
+        parts.append(f"\t_renames = {renames}\n")
+    return ''.join(parts)
 
 
 def visit_arg(data: Dict[str, Any]) -> str:
@@ -68,16 +119,16 @@ def visit_field(data: Dict[str, Any], excludes: set) -> str:
     if name in excludes:
         return ''
     field_type = visit_field_type(data['type'])
-    field_str = '\t@property\n'
+    parts = ['\t@property\n']
     if data.get('isDeprecated'):
-        field_str += f"\t@deprecated(reason='''{data['deprecationReason']}''')\n"
+        parts.append(f"\t@deprecated(reason='''{data['deprecationReason']}''')\n")
     if name in keyword.kwlist:
         name += '_'
-    field_str += f"\tdef {name}(self) -> {field_type}:\n"
+    parts.append(f"\tdef {name}(self) -> {field_type}:\n")
     if data['description']:
-        field_str += f"\t\t'''{data['description']}'''\n"
-    field_str += "\t\t...\n"
-    return field_str
+        parts.append(f"\t\t'''{data['description']}'''\n")
+    parts.append("\t\t...\n")
+    return ''.join(parts)
 
 
 def visit_field_type(data: Dict[str, Any]) -> str:
@@ -100,29 +151,27 @@ def get_config_type(data: Dict[str, Any]) -> str:
 
 
 def visit_enum(data: Dict[str, Any]) -> str:
-    enum_str = f"class {data['name']}:\n"
-    enum_str += f"\t'''{data['description']}'''\n"
-    enum_str += f"\t__slots__ = ()\n"
-    enumValues = data["enumValues"]
-    for i in range(len(enumValues)):
-        ev = enumValues[i]
+    parts = [
+        f"class {data['name']}:\n",
+        f"\t'''{data['description']}'''\n",
+        "\t__slots__ = ()\n",
+    ]
+    for i, ev in enumerate(data["enumValues"]):
         if ev['description']:
-            enum_str += f"\t'''{ev['description']}'''\n"
+            parts.append(f"\t'''{ev['description']}'''\n")
         if ev['isDeprecated']:
-            enum_str += f"\t'''@deprecated: {ev['deprecationReason']}'''\n"
-        enum_str += f"\t{ev['name']}={i}\n"
-        pass
-    return enum_str
+            parts.append(f"\t'''@deprecated: {ev['deprecationReason']}'''\n")
+        parts.append(f"\t{ev['name']}={i}\n")
+    return ''.join(parts)
 
 
 def visit_input_object(data: Dict[str, Any]) -> str:
-    input_str = f"class {data['name']}:\n"
-    input_str += f"\t'''{data['description']}'''\n"
-
-    for field in data['inputFields']:
-        input_str += visit_field(field, set())
-
-    return input_str
+    parts = [
+        f"class {data['name']}:\n",
+        f"\t'''{data['description']}'''\n",
+    ]
+    parts.extend(visit_field(field, set()) for field in data['inputFields'])
+    return ''.join(parts)
 
 
 def visit_union(data: Dict[str, Any]) -> str:
@@ -132,22 +181,18 @@ def visit_union(data: Dict[str, Any]) -> str:
         if typ.startswith('Union['):
             typ = typ[6:-6]
         types.append(typ)
-    union_str = f"'''{data['description']}'''\n"
     if len(types) > 1:
-        union_str += f"{data['name']}=Union[{','.join(types)}]\n"
-    else:
-        union_str += f"{data['name']}={types[0]}\n"
-    return union_str
+        return f"'''{data['description']}'''\n{data['name']}=Union[{','.join(types)}]\n"
+    return f"'''{data['description']}'''\n{data['name']}={types[0]}\n"
 
 
 def visit_intertface(data: Dict[str, Any]) -> str:
-    object_str = f"class {data['name']}(abc.ABC):\n"
-    object_str += f"\t'''{data['description']}'''\n"
-
-    for field in data['fields']:
-        object_str += visit_field(field, set())
-
-    return object_str
+    parts = [
+        f"class {data['name']}(abc.ABC):\n",
+        f"\t'''{data['description']}'''\n",
+    ]
+    parts.extend(visit_field(field, set()) for field in data['fields'])
+    return ''.join(parts)
 
 
 def visit_type(data: Dict[str, Any], is_config) -> str:
@@ -164,9 +209,7 @@ def visit_type(data: Dict[str, Any], is_config) -> str:
         return visit_union(data)
     elif kind == 'SCALAR':
         name = data['name']
-        rst = f"'''{data['description']}'''\n"
-        rst += f"{name} = NewType('{name}', str)\n"
-        return rst
+        return f"'''{data['description']}'''\n{name} = NewType('{name}', str)\n"
     elif kind == 'INTERFACE':
         return visit_intertface(data)
     raise Exception(f'unknow kind {kind}')
@@ -214,10 +257,8 @@ def get_func_description(
     indent=0,
 ) -> str:
     indent_str = '\t' * indent
-    args_descp = ''
-    for k, v in args_description.items():
-        v = f'\n{indent_str}\t\t\t'.join(v)
-        args_descp += f"\n{indent_str}\t\t{k}:{v}"
+    args_descp = ''.join(
+        f"\n{indent_str}\t\t{k}:" + f'\n{indent_str}\t\t\t'.join(v) for k, v in args_description.items())
     if args_descp:
         args_descp = f'\n{indent_str}\tArgs:{args_descp}'
     return f"{indent_str}\t'''{func_description}{args_descp}'''\n"
@@ -226,13 +267,13 @@ def get_func_description(
 def visit_config_field(data: Dict[str, Any], excludes: set) -> str:
     """
     This is an example of Google style.
-    
+
     Args:
         param1: This is the first param.
-    
+
     Returns:
         This is a description of what is returned.
-    
+
     Raises:
         This is a description of what is returned.
     """
@@ -240,29 +281,28 @@ def visit_config_field(data: Dict[str, Any], excludes: set) -> str:
     if name in excludes:
         return ''
     func_config = parse_func(data)
-    field_str = ''
+    parts = []
     args_list = func_config['args_list']
     return_type = func_config['type']
     if not args_list:
-        field_str += '\t@property\n'
+        parts.append('\t@property\n')
         args_list = ['self']
     else:
         args_list = [f'_config:{return_type}', '*', *args_list]
-        field_str += '\t@staticmethod\n'
+        parts.append('\t@staticmethod\n')
         return_type = 'None'
     if func_config['deprecated']:
-        field_str += f"\t{func_config['deprecated']}\n"
+        parts.append(f"\t{func_config['deprecated']}\n")
 
     args_list = ','.join(args_list)
-    field_str += f"\tdef {func_config['func_name']}({args_list}) -> {return_type}:\n"
-    description = get_func_description(
+    parts.append(f"\tdef {func_config['func_name']}({args_list}) -> {return_type}:\n")
+    parts.append(get_func_description(
         func_config['args_description'],
         func_config['func_description'],
         indent=1,
-    )
-    field_str += description
-    field_str += "\t\t...\n"
-    return field_str
+    ))
+    parts.append("\t\t...\n")
+    return ''.join(parts)
 
 
 def visit_config(data: Dict[str, Any]) -> str:
@@ -272,308 +312,426 @@ def visit_config(data: Dict[str, Any]) -> str:
     if interfaces_list:
         interfaces_list = f"({interfaces_list})"
 
-    object_str = f"class {data['name']}{interfaces_list}:\n"
-    object_str += f"\t'''{data['description']}'''\n"
+    parts = [
+        f"class {data['name']}{interfaces_list}:\n",
+        f"\t'''{data['description']}'''\n",
+    ]
+    parts.extend(visit_config_field(field, excludes) for field in data['fields'])
+    return ''.join(parts)
 
-    for field in data['fields']:
-        object_str += visit_config_field(field, excludes)
-
-    return object_str
-
-
-import ijson
-
-fo = open(f'{WORK_DIR}/common.py', 'w', encoding='utf8')
-fo.write('''import abc
-from typing import (
-    List,
-    NewType,
-    Union,
-    Any,
-)
-
-AccountNumber = NewType('AccountNumber', str)
-BigInt = NewType('BigInt', str)
-Byte = NewType('Byte', str)
-CountryCode = NewType('CountryCode', str)
-Currency = NewType('Currency', str)
-Date = NewType('Date', str)
-DateTime = NewType('DateTime', str)
-DID = NewType('DID', str)
-Duration = NewType('Duration', str)
-EmailAddress = NewType('EmailAddress', str)
-HexColorCode = NewType('HexColorCode', str)
-Hexadecimal = NewType('Hexadecimal', str)
-HSL = NewType('HSL', str)
-IPv4 = NewType('IPv4', str)
-IPv6 = NewType('IPv6', str)
-IBAN = NewType('IBAN', str)
-ISBN = NewType('ISBN', str)
-JSON = NewType('JSON', str)
-JSONObject = NewType('JSONObject', str)
-JWT = NewType('JWT', str)
-Latitude = NewType('Latitude', str)
-LocalDate = NewType('LocalDate', str)
-LocalEndTime = NewType('LocalEndTime', str)
-LocalTime = NewType('LocalTime', str)
-Locale = NewType('Locale', str)
-Longitude = NewType('Longitude', str)
-MAC = NewType('MAC', str)
-NegativeFloat = NewType('NegativeFloat', str)
-NegativeInt = NewType('NegativeInt', str)
-NonEmptyString = NewType('NonEmptyString', str)
-NonNegativeFloat = NewType('NonNegativeFloat', str)
-NonNegativeInt = NewType('NonNegativeInt', str)
-NonPositiveFloat = NewType('NonPositiveFloat', str)
-NonPositiveInt = NewType('NonPositiveInt', str)
-ObjectID = NewType('ObjectID', str)
-PhoneNumber = NewType('PhoneNumber', str)
-Port = NewType('Port', str)
-PositiveFloat = NewType('PositiveFloat', str)
-PositiveInt = NewType('PositiveInt', str)
-PostalCode = NewType('PostalCode', str)
-RegularExpression = NewType('RegularExpression', str)
-RGB = NewType('RGB', str)
-RGBA = NewType('RGBA', str)
-RoutingNumber = NewType('RoutingNumber', str)
-SafeInt = NewType('SafeInt', str)
-Time = NewType('Time', str)
-TimeZone = NewType('TimeZone', str)
-Timestamp = NewType('Timestamp', str)
-URL = NewType('URL', str)
-USCurrency = NewType('USCurrency', str)
-UTCOffset = NewType('UTCOffset', str)
-UUID = NewType('UUID', str)
-Void = NewType('Void', str)
-Cuid = NewType('Cuid', str)
-Ip = NewType('Ip', str)
-Semver = NewType('Semver', str)
-
-import warnings
-import functools
-
-
-def deprecated(reason=None, version=None):
-
-    def wrapper(func):
-
-        @functools.wraps(func)
-        def wraped_func(*args, **kwargs):
-            info = ''
-            if version:
-                info += f"After version {version}, "
-            info += f"{func.__name__} has been deprecated."
-            if reason:
-                info += f"Because {reason}"
-            warnings.warn(info, DeprecationWarning, stacklevel=2)
-            return func(*args, **kwargs)
-
-        return wraped_func
-
-    return wrapper
-
-
-################
-
-
-class _GQLConfig:
-    __slots__ = ('_data', )
-    _attr_from = {}
-
-    def __init__(self) -> None:
-        self._data = {}
-
-    def __call__(self, value, **kwds):
-        if isinstance(value, _GQLConfig):
-            self._data = value._data.copy()
-        else:
-            self._data = {}
-        for k, v in kwds.items():
-            self._data[f'${k}'] = v
-
-    def _key(self, attrName: str) -> str:
-        if attrName.endswith('_'):
-            return attrName[:-1]
-        return attrName
-
-    def _get_ctx(self, _key: str):
-        _data = self._data
-        _on_key = self._judge_attr_from(_key)
-        if _on_key:
-            _on_key = f"... on {_on_key}"
-            if _on_key not in _data:
-                _data[_on_key] = {}
-            _data = _data[_on_key]
-        return _data
-
-    @classmethod
-    def _judge_attr_from(cls, attrName: str) -> str:
-        return cls._attr_from.get(attrName)
-
-    def __setattr__(self, k: str, v):
-        if k.startswith('_'):
-            return super().__setattr__(k, v)
-        _key = self._key(k)
-        _data = self._get_ctx(_key)
-        _data[_key] = v
-
-    def __getattribute__(self, k: str):
-        if k.startswith('_'):
-            return super().__getattribute__(k)
-        try:
-            _key = self._key(k)
-            _data = self._get_ctx(_key)
-            if _key not in _data:
-                _data[_key] = _GQLConfig()
-            return _data[_key]
-        except KeyError:
-            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{k}'")
-
-    def __delattr__(self, k: str):
-        if k.startswith('_'):
-            return super().__delattr__(k)
-        try:
-            _key = self._key(k)
-            _on_key = self._judge_attr_from(_key)
-            if _on_key:
-                if len(self._data[_on_key]) > 1:
-                    del self._data[_on_key][_key]
-                else:
-                    del self._data[_on_key]
-                return
-            del self._data[_key]
-        except KeyError:
-            raise AttributeError(k)
-
-
-def parse_gql_param(config) -> str:
-    if isinstance(config, _GQLConfig):
-        config = config._data
-    if isinstance(config, (str, float, int)):
-        return str(config)
-    if isinstance(config, bool):
-        if config:
-            return 'true'
-        return 'false'
-    if isinstance(config, dict):
-        return f"{{{','.join({f'{k}:{parse_gql_param(v)}' for k, v in config.items()})}}}"
-    return f"[{','.join(parse_gql_param(x) for x in config)}]"
-
-
-def parse_gql_config(config) -> str:
-    if isinstance(config, _GQLConfig):
-        config = config._data
-    if isinstance(config, str):
-        return config
-    fields = []
-    parms = []
-    for k, v in config.items():
-        if k.startswith('$'):
-            parms.append(f"{k[1:]}:{parse_gql_param(v)}")
-        else:
-            fields.append(f"{k} {parse_gql_config(v)}")
-    rst = ''
-    if parms:
-        rst += f"({','.join(parms)})"
-    if fields:
-        rst += f"{{{' '.join(fields)}}}"
+
+def visit_config_impl(data: Dict[str, Any]) -> str:
+    """
+    Render the runtime config class of a type for config.py.
+    """
+    kind = data['kind']
+    if kind == 'OBJECT' or kind == 'INPUT_OBJECT':
+        return f"class {data['name']}(_GQLConfig):\n\tpass\n"
+    elif kind == 'ENUM':
+        return visit_enum(data)
+    elif kind == 'SCALAR':
+        name = data['name']
+        return f"{name} = NewType('{name}', str)\n"
+    elif kind == 'UNION' or kind == 'INTERFACE':
+        possible_types = ','.join(f"'{x['name']}'" for x in data['possibleTypes'])
+        return f"class {data['name']}(_GQLConfig):\n\n\t_fragments = ROUTES.of({possible_types})\n"
+    return ''
+
+
+def visit_routing(types: List[Dict[str, Any]]) -> str:
+    """
+    Render routing.py, the fields of every possible type of a union or interface,
+    shared by all of them through `FragmentRoutes`.
+    """
+    possible_types = {}
+    for typ in types:
+        for x in typ.get('possibleTypes') or ():
+            possible_types[x['name']] = None
+    fields = {k: tuple(CLASS_FIELDS_DICT[k]) for k in sorted(possible_types)}
+    return f"{ROUTING_HEADER}\nROUTES = FragmentRoutes({fields})\n"
+
+
+def visit_directive(data: Dict[str, Any]) -> str:
+    conf = parse_func(data)
+    args_list = ','.join(conf['args_list'])
+    args_descp = ''.join(f"\n\t\t{k}:" + '\n\t\t\t'.join(v) for k, v in conf['args_description'].items())
+    if args_descp:
+        args_descp = '\n\tArgs:' + args_descp
+    return (f"def {conf['func_name']}(payload:Any, *, {args_list})->None:\n"
+            f"\t'''{conf['func_description']}{args_descp}'''\n")
+
+
+def visit_directive_impl(data: Dict[str, Any]) -> str:
+    conf = parse_func(data)
+    return f'''def {conf['func_name']}(payload, **kwargs):\n\tdirective_impl(payload, '{data['name']}', **kwargs)\n'''
+
+
+#### 解析schema
+
+_TYPE_KEYS = ('kind', 'name', 'description', 'fields', 'inputFields', 'interfaces', 'enumValues', 'possibleTypes')
+_FIELD_KEYS = ('name', 'description', 'args', 'type', 'isDeprecated', 'deprecationReason', 'defaultValue')
+
+
+def compact_type_ref(data: Dict[str, Any], refs: dict) -> Dict[str, Any]:
+    """
+    Return the shared copy of a type reference, equal references are stored once.
+    """
+    if data is None:
+        return None
+    of_type = compact_type_ref(data.get('ofType'), refs)
+    key = (data['kind'], data['name'], id(of_type))
+    ref = refs.get(key)
+    if ref is None:
+        name = data['name']
+        ref = refs[key] = {
+            'kind': sys.intern(data['kind']),
+            'name': name and sys.intern(name),
+            'ofType': of_type,
+        }
+    return ref
+
+
+def compact_field(data: Dict[str, Any], refs: dict) -> Dict[str, Any]:
+    rst = {k: data[k] for k in _FIELD_KEYS if k in data}
+    rst['name'] = sys.intern(rst['name'])
+    if 'type' in rst:
+        rst['type'] = compact_type_ref(rst['type'], refs)
+    if rst.get('args') is not None:
+        rst['args'] = [compact_field(x, refs) for x in rst['args']]
     return rst
 
-def directive_impl(
-    payload: Union[_GQLConfig, dict],
-    directive: str,
-    **kwargs,
-):
-    data = {}
-    for k, v in kwargs.items():
-        key = f'${k}'
-        if key.endswith('_'):
-            key = key[:-1]
-        data[key] = v
-    if isinstance(payload, _GQLConfig):
-        payload._data[f'@{directive}'] = data
-    else:
-        payload[f'@{directive}'] = data
-    pass
 
-''')
-fo.close()
-fo = open(f'{WORK_DIR}/shopifygql.pyi', 'w', encoding='utf8')
-config_file = open(f'{WORK_DIR}/config.pyi', 'w', encoding='utf8')
+def compact_type(data: Dict[str, Any], refs: dict) -> Dict[str, Any]:
+    """
+    Keep only what the generator reads of an introspection type.
+    """
+    rst = {k: data[k] for k in _TYPE_KEYS if k in data}
+    rst['name'] = sys.intern(rst['name'])
+    for k in ('fields', 'inputFields', 'enumValues'):
+        if rst.get(k) is not None:
+            rst[k] = [compact_field(x, refs) for x in rst[k]]
+    for k in ('interfaces', 'possibleTypes'):
+        if rst.get(k) is not None:
+            rst[k] = [compact_type_ref(x, refs) for x in rst[k]]
+    return rst
 
-fo.write('from .common import *\n')
-config_file.write('from .common import *\n')
 
-with open(SCHEMA_PATH, 'r', encoding='utf8') as fi:
-    for typ in ijson.items(fi, '__schema.types.item'):
-        if typ['name'].startswith('__'):
-            continue
-        tmp = []
-        for x in typ['fields'] or []:
-            tmp.append(x['name'])
-        for x in typ['inputFields'] or []:
-            tmp.append(x['name'])
-        CLASS_FIELDS_DICT[typ['name']] = tmp
-#### 生成pyi文件
-with open(SCHEMA_PATH, 'r', encoding='utf8') as fi:
-    for typ in ijson.items(fi, '__schema.types.item'):
-        if typ['name'].startswith('__'):
-            continue
-        config_file.write(visit_type(typ, True))
-        config_file.write('\n')
-        fo.write(visit_type(typ, False))
-        fo.write('\n')
-
-with open(SCHEMA_PATH, 'r', encoding='utf8') as fi:
-    for directive in ijson.items(fi, '__schema.directives.item'):
-        conf = parse_func(directive)
-        args_list = conf['args_list']
-        args_list = ','.join(args_list)
-        directive_str = f"def {conf['func_name']}(payload:Any, *, {args_list})->None:\n"
-
-        args_description: dict = conf['args_description']
-        args_descp = ''
-        for k, v in args_description.items():
-            v = '\n\t\t\t'.join(v)
-            args_descp += f"\n\t\t{k}:{v}"
-        if args_descp:
-            args_descp = '\n\tArgs:' + args_descp
-        directive_str += f"\t'''{conf['func_description']}{args_descp}'''\n"
-        config_file.write(directive_str)
-
-#### 生成py文件
-
-config_file = open(f'{WORK_DIR}/config.py', 'w', encoding='utf8')
-config_file.write('from .common import _GQLConfig,NewType,directive_impl\n')
-
-with open(SCHEMA_PATH, 'r', encoding='utf8') as fi:
-    for typ in ijson.items(fi, '__schema.types.item'):
-        if typ['name'].startswith('__'):
+def _iter_items(events: Iterator[tuple], prefixes: Dict[str, list]):
+    """
+    Build the objects at `prefixes` out of one stream of ijson events.
+    """
+    from ijson.common import ObjectBuilder
+    for prefix, event, value in events:
+        target = prefixes.get(prefix)
+        if target is None or event != 'start_map':
             continue
-        kind = typ['kind']
-        cls_str = ''
-        if kind == 'OBJECT' or kind == 'INPUT_OBJECT':
-            cls_str = f"class {typ['name']}(_GQLConfig):\n\tpass\n"
-        elif kind == 'ENUM':
-            cls_str = visit_enum(typ)
-        elif kind == 'SCALAR':
-            name = typ['name']
-            cls_str = f"{name} = NewType('{name}', str)\n"
-        elif kind == 'UNION' or kind == 'INTERFACE':
-            cls_str = f"class {typ['name']}(_GQLConfig):\n\n"
-            _attr_from = {}
-            sub_cls = [x['name'] for x in typ['possibleTypes']]
-            for k in sub_cls:
-                for kk in CLASS_FIELDS_DICT[k]:
-                    _attr_from[kk] = k
-            cls_str += f"\t_attr_from ={_attr_from}\n"
-            # return visit_intertface(data)
-        config_file.write(cls_str)
-        config_file.write('\n')
-
-with open(SCHEMA_PATH, 'r', encoding='utf8') as fi:
-    for directive in ijson.items(fi, '__schema.directives.item'):
-        conf = parse_func(directive)
-        config_file.write(
-            f'''def {conf['func_name']}(payload, **kwargs):\n\tdirective_impl(payload, '{directive['name']}', **kwargs)\n'''
-        )
+        builder = ObjectBuilder()
+        depth = 0
+        while True:
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+                if depth == 0:
+                    break
+            _, event, value = next(events)
+        yield target, builder.value
+
+
+def load_schema(path: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Parse the introspection file once and return its compacted types and directives.
+
+    Types of the introspection system itself are left out. Fills `CLASS_FIELDS_DICT`
+    and `SCHEMA_INDEX`.
+    """
+    import ijson
+    from gqlclient.schema import index_type
+    types = []
+    directives = []
+    refs = {}
+    prefixes = {'__schema.types.item': types, '__schema.directives.item': directives}
+    with open(path, 'rb') as fi:
+        for target, item in _iter_items(ijson.parse(fi), prefixes):
+            if target is types:
+                if item['name'].startswith('__'):
+                    continue
+                item = compact_type(item, refs)
+            else:
+                item = compact_field(item, refs)
+            target.append(item)
+    for typ in types:
+        CLASS_FIELDS_DICT[typ['name']] = [x['name'] for x in (typ['fields'] or []) + (typ['inputFields'] or [])]
+        SCHEMA_INDEX[typ['name']] = index_type(typ)
+    return types, directives
+
+
+def _open(path: str):
+    return open(path, 'w', encoding='utf8', buffering=BUFFER_SIZE)
+
+
+def render_type(typ: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    """
+    Render a type into its parts of shopifygql.pyi, config.pyi, config.py and models.py.
+    """
+    models = visit_model(typ) + '\n' if typ['kind'] == 'OBJECT' else ''
+    return visit_type(typ, False) + '\n', visit_type(typ, True) + '\n', visit_config_impl(typ) + '\n', models
+
+
+def render_types(types: List[Dict[str, Any]]) -> List[Tuple[str, str, str, str]]:
+    return [render_type(typ) for typ in types]
+
+
+def _init_worker(class_fields: dict):
+    CLASS_FIELDS_DICT.update(class_fields)
+
+
+def _chunks(items: list, n: int) -> List[list]:
+    size = max(1, -(-len(items) // n))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def render_all(types: List[Dict[str, Any]], jobs: int = 1) -> Iterator[Tuple[str, str, str, str]]:
+    """
+    Render the types in order, sharded across `jobs` worker processes when more than one.
+
+    The parts are yielded in the order of `types`, so the output does not depend on `jobs`.
+    """
+    if jobs <= 1 or len(types) < 2:
+        yield from map(render_type, types)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    # a few chunks per worker keeps them busy when types differ in size
+    chunks = _chunks(types, jobs * 4)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(CLASS_FIELDS_DICT, )) as executor:
+        for parts in executor.map(render_types, chunks):
+            yield from parts
+
+
+#### 增量生成
+
+MANIFEST_NAME = '.manifest.json'
+
+
+def _generator_hash() -> str:
+    with open(__file__, 'rb') as fi:
+        return hashlib.sha1(fi.read()).hexdigest()
+
+
+def type_hash(typ: Dict[str, Any]) -> str:
+    """
+    Hash of everything the rendering of a type reads.
+
+    Besides the type itself, that is the fields of its interfaces, which objects leave
+    out. So an object is rendered again when one of its interfaces gains or loses a
+    field. Unions and interfaces only name their possible types, their fields go to
+    routing.py, which is written on every run.
+    """
+    depends = [x['name'] for x in typ.get('interfaces') or []]
+    content = [typ, [CLASS_FIELDS_DICT.get(x) for x in depends]]
+    return hashlib.sha1(json.dumps(content, sort_keys=True).encode('utf8')).hexdigest()
+
+
+def load_manifest(work_dir: str) -> Dict[str, Any]:
+    """
+    The manifest of the last run in `work_dir`, empty when missing or written by another generator.
+    """
+    try:
+        with open(f'{work_dir}/{MANIFEST_NAME}', encoding='utf8') as fi:
+            manifest = json.load(fi)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('generator') != _generator_hash():
+        return {}
+    return manifest.get('types') or {}
+
+
+def save_manifest(work_dir: str, types: Dict[str, Any]):
+    with _open(f'{work_dir}/{MANIFEST_NAME}') as fo:
+        json.dump({'generator': _generator_hash(), 'types': types}, fo)
+
+
+def render_incremental(types: List[Dict[str, Any]], work_dir: str,
+                       jobs: int = 1) -> Tuple[List[Tuple[str, str, str, str]], int]:
+    """
+    Render the types, reusing the parts the manifest of `work_dir` holds for unchanged ones.
+
+    Returns:
+        The parts of every type in order, and the number of types rendered again.
+    """
+    cached = load_manifest(work_dir)
+    hashes = [type_hash(typ) for typ in types]
+    stale = [typ for typ, h in zip(types, hashes) if cached.get(typ['name'], {}).get('hash') != h]
+    rendered = dict(zip((x['name'] for x in stale), render_all(stale, jobs)))
+    manifest = {}
+    parts = []
+    for typ, h in zip(types, hashes):
+        name = typ['name']
+        part = rendered[name] if name in rendered else tuple(cached[name]['parts'])
+        manifest[name] = {'hash': h, 'parts': part}
+        parts.append(part)
+    save_manifest(work_dir, manifest)
+    return parts, len(stale)
+
+
+#### 生成文件
+
+# number of types of one module of a split config package
+GROUP_SIZE = 64
+PACKAGE_INIT = '''import importlib
+
+_MODULES = {modules}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+	module = _MODULES.get(name)
+	if module is None:
+		raise AttributeError(f"module {{__name__!r}} has no attribute {{name!r}}")
+	value = getattr(importlib.import_module(f'.{{module}}', __name__), name)
+	globals()[name] = value
+	return value
+
+
+def __dir__():
+	return __all__
+'''
+
+
+class ConfigPackage:
+    """Writes config.py as a package instead, loading its types on first use.
+
+    Types are written into modules of `group_size` types each, and directives into
+    a module of their own. The `__init__` of the package maps every name to its
+    module and imports that module from a PEP 562 `__getattr__` when the name is
+    first looked up.
+    """
+    def __init__(self, path: str, group_size: int = GROUP_SIZE) -> None:
+        self.path = path
+        self.group_size = group_size
+        self.modules = {}
+        self._files = {}
+        self._group = None
+        self._count = 0
+
+    def _file(self, module: str):
+        fo = self._files.get(module)
+        if fo is None:
+            fo = self._files[module] = _open(f'{self.path}/{module}.py')
+            fo.write(CONFIG_PY_HEADER.replace('from .', 'from ..'))
+        return fo
+
+    def write_type(self, name: str, text: str):
+        if self._group is None or self._count >= self.group_size:
+            self._group = f'_g{len(self._files)}'
+            self._count = 0
+        self._count += 1
+        self.modules[name] = self._group
+        self._file(self._group).write(text)
+
+    def write_directive(self, name: str, text: str):
+        self.modules[name] = '_directives'
+        self._file('_directives').write(text)
+
+    def close(self):
+        for fo in self._files.values():
+            fo.close()
+        with _open(f'{self.path}/__init__.py') as fo:
+            fo.write(PACKAGE_INIT.format(modules=self.modules))
+
+
+def _remove(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def generate(schema_path: str = SCHEMA_PATH,
+             work_dir: str = WORK_DIR,
+             jobs: int = 1,
+             incremental: bool = False,
+             split: bool = False):
+    """
+    Generate every output file into `work_dir` from one parse of the schema.
+
+    Args:
+        schema_path: The introspection JSON file.
+        work_dir: The directory the files are written to.
+        jobs: The number of processes rendering the types, all cores when 0.
+        incremental: Render only the types changed since the last incremental run
+            into `work_dir`, as recorded in its manifest.
+        split: Write the configs as the lazily loaded package `config/`,
+            see `ConfigPackage`, instead of the module config.py.
+    """
+    types, directives = load_schema(schema_path)
+    jobs = jobs or os.cpu_count() or 1
+    if incremental:
+        rendered, _ = render_incremental(types, work_dir, jobs)
+    else:
+        rendered = render_all(types, jobs)
+    with _open(f'{work_dir}/common.py') as fo:
+        fo.write(COMMON_HEADER)
+    with _open(f'{work_dir}/schema.py') as fo:
+        fo.write(f"SCHEMA_INDEX = {SCHEMA_INDEX}\n")
+    with _open(f'{work_dir}/routing.py') as fo:
+        fo.write(visit_routing(types))
+    # a package shadows a module of the same name, drop the output of the other layout
+    _remove(f'{work_dir}/config')
+    if split:
+        _remove(f'{work_dir}/config.py')
+        _remove(f'{work_dir}/config.pyi')
+        os.makedirs(f'{work_dir}/config')
+        package = ConfigPackage(f'{work_dir}/config')
+        config_pyi_path = f'{work_dir}/config/__init__.pyi'
+        config_file = None
+    else:
+        package = None
+        config_pyi_path = f'{work_dir}/config.pyi'
+        config_file = _open(f'{work_dir}/config.py')
+        config_file.write(CONFIG_PY_HEADER)
+    with _open(f'{work_dir}/shopifygql.pyi') as pyi_file, \
+            _open(config_pyi_path) as config_pyi_file, \
+            _open(f'{work_dir}/models.py') as model_file:
+        pyi_file.write(PYI_HEADER)
+        config_pyi_file.write(PYI_HEADER.replace('from .common', 'from ..common') if split else PYI_HEADER)
+        model_file.write(MODEL_HEADER)
+        for typ, (pyi, config_pyi, config, models) in zip(types, rendered):
+            pyi_file.write(pyi)
+            config_pyi_file.write(config_pyi)
+            if package:
+                package.write_type(typ['name'], config)
+            else:
+                config_file.write(config)
+            model_file.write(models)
+        for directive in directives:
+            config_pyi_file.write(visit_directive(directive))
+            if package:
+                package.write_directive(parse_func(directive)['func_name'], visit_directive_impl(directive))
+            else:
+                config_file.write(visit_directive_impl(directive))
+    if package:
+        package.close()
+    else:
+        config_file.close()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(prog='python -m gqlclient',
+                                     description='Generate query configs from a GraphQL introspection result.')
+    parser.add_argument('schema', nargs='?', default=SCHEMA_PATH, help='the introspection JSON file')
+    parser.add_argument('-o', '--out', default=WORK_DIR, help='the directory the files are written to')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='the number of processes rendering the types, all cores when 0')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='render only the types changed since the last incremental run into the directory')
+    parser.add_argument('-s', '--split', action='store_true',
+                        help='write the configs as a package whose types are loaded on first use')
+    args = parser.parse_args(argv)
+    generate(args.schema, args.out, args.jobs, args.incremental, args.split)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+import asyncio
+import json
+import ssl
+import urllib.parse
+from typing import (Any, AsyncIterator, Iterable, List, Tuple)
+
+from .apq import PersistedQueryRegistry, execute_persisted_async
+from .client import build_payload, decode_body
+from .core import _GQLConfig
+from .cost import estimate_cost
+from .dto import DtoDict
+from .throttle import CostBucket, send_throttled_async
+from .transport import TransportError
+
+# errors of a kept alive connection that the server already closed
+_STALE_ERRORS = (
+    ConnectionResetError,
+    BrokenPipeError,
+    asyncio.IncompleteReadError,
+)
+
+
+class AsyncConnectionPool:
+    """Pool of keep-alive HTTP/1.1 connections to one endpoint built on asyncio streams.
+
+    At most `size` requests are in flight at the same time, further callers wait
+    for a free connection.
+
+    Args:
+        url: The endpoint, http or https.
+        size: The maximum number of connections.
+        timeout: Timeout of connecting and of one request, in seconds.
+    """
+    def __init__(self, url: str, size: int = 10, timeout: float = 30.0) -> None:
+        parts = urllib.parse.urlsplit(url)
+        self.url = url
+        self.size = size
+        self.timeout = timeout
+        self.path = parts.path or '/'
+        if parts.query:
+            self.path += f'?{parts.query}'
+        self._ssl = ssl.create_default_context() if parts.scheme == 'https' else None
+        self._host = parts.hostname
+        self._port = parts.port or (443 if self._ssl else 80)
+        self._host_header = parts.netloc
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = None
+
+    async def _connect(self):
+        return await asyncio.wait_for(
+            asyncio.open_connection(self._host, self._port, ssl=self._ssl), self.timeout)
+
+    async def _roundtrip(self, conn, body: bytes, headers: dict) -> Tuple[int, bytes, bool]:
+        reader, writer = conn
+        head = f'POST {self.path} HTTP/1.1\r\nHost: {self._host_header}\r\nContent-Length: {len(body)}\r\n'
+        head += ''.join(f'{k}: {v}\r\n' for k, v in headers.items())
+        writer.write(head.encode('latin-1') + b'\r\n' + body)
+        await writer.drain()
+        line = await reader.readline()
+        if not line:
+            raise ConnectionResetError('connection closed by server')
+        version, status = line.decode('latin-1').split(' ', 2)[:2]
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            k, _, v = line.decode('latin-1').partition(':')
+            response_headers[k.strip().lower()] = v.strip()
+        keep_alive = version == 'HTTP/1.1' and response_headers.get('connection', '').lower() != 'close'
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if not size:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            data = await reader.readexactly(int(response_headers['content-length']))
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return int(status), data, keep_alive
+
+    async def post(self, body: bytes, headers: dict) -> Tuple[int, bytes]:
+        """
+        Send a POST and return the status and body of the response.
+
+        A connection the server closed while idle is replaced once.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            reused = bool(self._idle)
+            conn = self._idle.pop() if reused else await self._connect()
+            try:
+                try:
+                    status, data, keep_alive = await asyncio.wait_for(
+                        self._roundtrip(conn, body, headers), self.timeout)
+                except _STALE_ERRORS:
+                    if not reused:
+                        raise
+                    conn[1].close()
+                    conn = await self._connect()
+                    status, data, keep_alive = await asyncio.wait_for(
+                        self._roundtrip(conn, body, headers), self.timeout)
+            except BaseException:
+                conn[1].close()
+                raise
+            if keep_alive:
+                self._idle.append(conn)
+            else:
+                conn[1].close()
+            return status, data
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+class AsyncGQLClient:
+    """asyncio GraphQL client sharing one pool of keep-alive connections.
+
+    Takes the same arguments as `GQLClient`, except `pool_timeout`.
+
+    Example:
+        >>> async def main(queries):
+        ...     async with AsyncGQLClient('https://shop.example/graphql.json') as client:
+        ...         async for rst in client.gather(queries, concurrency=50):
+        ...             ...
+    """
+    def __init__(
+        self,
+        url: str,
+        headers: dict = None,
+        pool_size: int = 10,
+        timeout: float = 30.0,
+        schema: dict = None,
+        apq: bool = False,
+        registry: PersistedQueryRegistry = None,
+        throttle: CostBucket = None,
+        canonical: bool = False,
+    ) -> None:
+        self.pool = AsyncConnectionPool(url, pool_size, timeout)
+        self.headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            **(headers or {}),
+        }
+        self.schema = schema
+        self.apq = apq
+        self.registry = registry if registry is not None else PersistedQueryRegistry()
+        self.throttle = throttle
+        self.canonical = canonical
+
+    async def post_raw(self, payload: dict) -> bytes:
+        """
+        Send a payload and return the raw response body.
+        """
+        body = json.dumps(payload, separators=(',', ':')).encode('utf8')
+        status, data = await self.pool.post(body, self.headers)
+        if not 200 <= status < 300:
+            raise TransportError(status, data)
+        return data
+
+    async def post(self, payload: dict) -> dict:
+        """
+        Send a payload and return the decoded response.
+        """
+        return json.loads(await self.post_raw(payload))
+
+    async def execute(self, query, variables: dict = None, operation: str = None) -> DtoDict:
+        """
+        Serialize and send a query, and return the response wrapped as DtoDict.
+        """
+        return decode_body(query, await self.send(self.payload(query, variables, operation)))
+
+    def payload(self, query, variables: dict = None, operation: str = None) -> dict:
+        """
+        Build the payload of a query with the schema of the client.
+
+        With a throttle, configs sent the first time reserve their estimated cost.
+        """
+        payload = build_payload(query, variables, self.schema, operation, self.canonical)
+        if self.throttle is not None and isinstance(query, _GQLConfig):
+            if not self.throttle.knows(payload['query']):
+                self.throttle.learn(payload['query'], estimate_cost(query, self.schema, variables=variables))
+        return payload
+
+    async def send(self, payload: dict):
+        """
+        Send a payload built by `build_payload`, as a persisted query when enabled.
+
+        Returns the raw or the decoded response body.
+        """
+        if self.throttle is not None:
+            return await send_throttled_async(self.throttle, self._send, payload)
+        if self.apq:
+            return await self._send(payload)
+        return await self.post_raw(payload)
+
+    async def _send(self, payload: dict) -> dict:
+        if self.apq:
+            return await execute_persisted_async(self.post, payload['query'], payload.get('variables'),
+                                                 self.registry, on_unsupported=self._unsupported)
+        return await self.post(payload)
+
+    def _unsupported(self):
+        # the server has no persisted queries, send documents as they are from now on
+        self.apq = False
+
+    async def gather(
+        self,
+        queries: Iterable[Any],
+        concurrency: int = None,
+        return_exceptions: bool = False,
+        with_index: bool = False,
+    ) -> AsyncIterator[Any]:
+        """
+        Execute many queries with at most `concurrency` in flight, yielding results as
+        they complete.
+
+        `queries` is consumed lazily, a new query is only started once a result has
+        been taken, so a slow consumer holds the senders back.
+
+        Args:
+            queries: Queries, or `(query, variables)` tuples.
+            concurrency: The maximum number of queries in flight, the pool size by default.
+            return_exceptions: Yield the exception of a failed query instead of raising it.
+            with_index: Yield `(index, result)` where index is the position in `queries`.
+        """
+        concurrency = concurrency or self.pool.size
+        source = iter(enumerate(queries))
+        pending = {}
+
+        def spawn() -> bool:
+            try:
+                i, query = next(source)
+            except StopIteration:
+                return False
+            variables = None
+            if isinstance(query, tuple):
+                query, variables = query
+            pending[asyncio.ensure_future(self.execute(query, variables))] = i
+            return True
+
+        for _ in range(concurrency):
+            if not spawn():
+                break
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    i = pending.pop(task)
+                    if task.exception() is None:
+                        rst = task.result()
+                    elif return_exceptions:
+                        rst = task.exception()
+                    else:
+                        raise task.exception()
+                    yield (i, rst) if with_index else rst
+                    spawn()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def close(self):
+        await self.pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
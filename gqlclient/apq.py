@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+from typing import (Callable, Dict, Optional, Tuple)
+
+from .core import document_hash
+from .transport import Post
+
+NOT_FOUND = 'PersistedQueryNotFound'
+NOT_FOUND_CODE = 'PERSISTED_QUERY_NOT_FOUND'
+NOT_SUPPORTED = 'PersistedQueryNotSupported'
+NOT_SUPPORTED_CODE = 'PERSISTED_QUERY_NOT_SUPPORTED'
+
+
+class PersistedQueryRegistry:
+    """Local hash -> document registry for automatic persisted queries.
+
+    Documents are hashed once, later lookups are dict lookups.
+    With `path`, entries are appended to a JSON lines file and loaded again on start,
+    so hashes survive restarts and can be shared between workers.
+
+    Test:
+        >>> r = PersistedQueryRegistry()
+        >>> h = r.add('{shop{name}}')
+        >>> h in r, r[h]
+        (True, '{shop{name}}')
+    """
+    __slots__ = ('path', '_documents', '_hashes', '_lock')
+
+    def __init__(self, path: str = None) -> None:
+        self.path = path
+        self._documents: Dict[str, str] = {}
+        self._hashes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf8') as fi:
+                for line in fi:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._remember(entry['hash'], entry['query'])
+
+    def _remember(self, h: str, document: str):
+        self._documents[h] = document
+        self._hashes[document] = h
+
+    def add(self, document: str) -> str:
+        """
+        Register a document and return its hash.
+        """
+        h = self._hashes.get(document)
+        if h is not None:
+            return h
+        h = document_hash(document)
+        with self._lock:
+            if h not in self._documents:
+                self._remember(h, document)
+                if self.path:
+                    with open(self.path, 'a', encoding='utf8') as fo:
+                        fo.write(json.dumps({'hash': h, 'query': document}) + '\n')
+        return h
+
+    def get(self, h: str) -> Optional[str]:
+        return self._documents.get(h)
+
+    def __getitem__(self, h: str) -> str:
+        return self._documents[h]
+
+    def __contains__(self, h: str) -> bool:
+        return h in self._documents
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+
+def _has_error(response: dict, message: str, code: str) -> bool:
+    for error in response.get('errors') or ():
+        if error.get('message') == message:
+            return True
+        if (error.get('extensions') or {}).get('code') == code:
+            return True
+    return False
+
+
+def is_not_found(response: dict) -> bool:
+    """
+    Whether the server answered that it does not know the persisted query hash.
+    """
+    return _has_error(response, NOT_FOUND, NOT_FOUND_CODE)
+
+
+def is_not_supported(response: dict) -> bool:
+    """
+    Whether the server answered that it does not support persisted queries at all.
+    """
+    return _has_error(response, NOT_SUPPORTED, NOT_SUPPORTED_CODE)
+
+
+def _full_payload(payload: dict, document: str) -> dict:
+    """
+    The plain payload of a document, without the persisted query extension.
+    """
+    rst = {k: v for k, v in payload.items() if k != 'extensions'}
+    rst['query'] = document
+    return rst
+
+
+def persisted_payload(
+    document: str,
+    variables: dict = None,
+    registry: PersistedQueryRegistry = None,
+    operation_name: str = None,
+) -> Tuple[dict, str]:
+    """
+    Build the hash only payload of a document and return it with the full text.
+
+    `document` may also be the hash of a document already in `registry`.
+    """
+    if registry is None:
+        registry = PersistedQueryRegistry()
+    if document in registry:
+        h, document = document, registry[document]
+    else:
+        h = registry.add(document)
+    payload = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': h}}}
+    if variables:
+        payload['variables'] = variables
+    if operation_name:
+        payload['operationName'] = operation_name
+    return payload, document
+
+
+def execute_persisted(
+    post: Post,
+    document: str,
+    variables: dict = None,
+    registry: PersistedQueryRegistry = None,
+    operation_name: str = None,
+    on_unsupported: Callable[[], None] = None,
+) -> dict:
+    """
+    Execute a document through the automatic persisted queries protocol.
+
+    Only the SHA-256 of the document is sent first, the full text is sent again only
+    when the server reports the hash unknown. A server without persisted queries
+    gets the plain document instead.
+
+    Args:
+        post: Sends a JSON payload and returns the decoded response.
+        document: The document, or the hash of a document already in `registry`.
+        registry: Where hashes are kept, a private one is used when omitted.
+        on_unsupported: Called when the server does not support persisted queries,
+            so the caller can stop sending hashes to it.
+    """
+    payload, document = persisted_payload(document, variables, registry, operation_name)
+    response = post(payload)
+    if is_not_found(response):
+        payload['query'] = document
+        response = post(payload)
+    elif is_not_supported(response):
+        if on_unsupported is not None:
+            on_unsupported()
+        response = post(_full_payload(payload, document))
+    return response
+
+
+async def execute_persisted_async(
+    post,
+    document: str,
+    variables: dict = None,
+    registry: PersistedQueryRegistry = None,
+    operation_name: str = None,
+    on_unsupported: Callable[[], None] = None,
+) -> dict:
+    """
+    `execute_persisted` with a coroutine `post`.
+    """
+    payload, document = persisted_payload(document, variables, registry, operation_name)
+    response = await post(payload)
+    if is_not_found(response):
+        payload['query'] = document
+        response = await post(payload)
+    elif is_not_supported(response):
+        if on_unsupported is not None:
+            on_unsupported()
+        response = await post(_full_payload(payload, document))
+    return response
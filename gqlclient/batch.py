@@ -0,0 +1,186 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (Dict, List, Tuple)
+
+from .client import decode_body, operation_of
+from .core import _GQLConfig, alias_configs, split_aliased
+from .dto import DtoDict
+
+Batch = List[Tuple[_GQLConfig, Future]]
+
+
+def _payload(client, batch: Batch) -> Tuple[dict, list]:
+    """
+    Build the payload of a batch, a batch of one is sent as it is.
+    """
+    if len(batch) == 1:
+        return client.payload(batch[0][0]), None
+    root, aliases = alias_configs([query for query, _ in batch])
+    return client.payload(root), aliases
+
+
+def _resolve(batch: Batch, body, aliases: list):
+    if aliases is None:
+        query, future = batch[0]
+        future.set_result(decode_body(query, body))
+        return
+    if not isinstance(body, dict):
+        body = json.loads(body)
+    for (query, future), part in zip(batch, split_aliased(body, aliases)):
+        future.set_result(decode_body(query, part))
+
+
+def _reject(batch: Batch, error: BaseException):
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+class Batcher:
+    """Sends queries submitted close together as one request, like a DataLoader.
+
+    The root fields of the queries of one batch are merged under generated aliases,
+    and the response is split back into the response of each query. A batch is sent
+    `window` seconds after its first query or once it holds `max_size` queries.
+    Queries and mutations are batched apart.
+
+    Args:
+        client: A `GQLClient`, batches are sent on its pool in parallel.
+        max_size: The maximum number of queries of one request.
+        window: How long the first query of a batch waits for others, in seconds.
+
+    Example:
+        with Batcher(client) as batcher:
+            futures = [batcher.submit(product_query(x)) for x in ids]
+            products = [x.result().data.product for x in futures]
+    """
+    def __init__(self, client, max_size: int = 50, window: float = 0.005) -> None:
+        self.client = client
+        self.max_size = max_size
+        self.window = window
+        self._pending: Dict[str, Batch] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=client.pool.size)
+
+    def submit(self, query: _GQLConfig) -> Future:
+        """
+        Add a root config to the current batch and return the future of its response.
+        """
+        future = Future()
+        operation = operation_of(query)
+        with self._lock:
+            batch = self._pending.setdefault(operation, [])
+            batch.append((query, future))
+            if len(batch) >= self.max_size:
+                self._flush(operation)
+            elif len(batch) == 1:
+                timer = threading.Timer(self.window, self._expire, (operation, ))
+                timer.daemon = True
+                self._timers[operation] = timer
+                timer.start()
+        return future
+
+    def execute(self, query: _GQLConfig) -> DtoDict:
+        """
+        Submit a root config and wait for its response.
+        """
+        return self.submit(query).result()
+
+    def _expire(self, operation: str):
+        with self._lock:
+            if self._timers.get(operation) is threading.current_thread():
+                self._flush(operation)
+
+    def _flush(self, operation: str):
+        batch = self._pending.pop(operation, None)
+        timer = self._timers.pop(operation, None)
+        if timer is not None:
+            timer.cancel()
+        if batch:
+            self._executor.submit(self._send, batch)
+
+    def _send(self, batch: Batch):
+        try:
+            payload, aliases = _payload(self.client, batch)
+            _resolve(batch, self.client.send(payload), aliases)
+        except BaseException as e:
+            _reject(batch, e)
+
+    def flush(self):
+        """
+        Send every pending batch now.
+        """
+        with self._lock:
+            for operation in list(self._pending):
+                self._flush(operation)
+
+    def close(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class AsyncBatcher:
+    """`Batcher` with an `AsyncGQLClient`, submitted from the running event loop."""
+    def __init__(self, client, max_size: int = 50, window: float = 0.005) -> None:
+        self.client = client
+        self.max_size = max_size
+        self.window = window
+        self._pending: Dict[str, Batch] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks = set()
+
+    def submit(self, query: _GQLConfig) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        operation = operation_of(query)
+        batch = self._pending.setdefault(operation, [])
+        batch.append((query, future))
+        if len(batch) >= self.max_size:
+            self._flush(operation)
+        elif len(batch) == 1:
+            self._timers[operation] = loop.call_later(self.window, self._flush, operation)
+        return future
+
+    async def execute(self, query: _GQLConfig) -> DtoDict:
+        return await self.submit(query)
+
+    def _flush(self, operation: str):
+        batch = self._pending.pop(operation, None)
+        timer = self._timers.pop(operation, None)
+        if timer is not None:
+            timer.cancel()
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: Batch):
+        try:
+            payload, aliases = _payload(self.client, batch)
+            _resolve(batch, await self.client.send(payload), aliases)
+        except BaseException as e:
+            _reject(batch, e)
+
+    def flush(self):
+        for operation in list(self._pending):
+            self._flush(operation)
+
+    async def close(self):
+        self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
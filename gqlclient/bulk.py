@@ -0,0 +1,194 @@
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import time
+import urllib.request
+from typing import (Any, Callable, Dict, Iterator)
+
+from .core import parse_gql_config
+from .dto import LazyDtoDict
+from .transport import GQLError
+
+RUN_QUERY = ('mutation($query:String!){bulkOperationRunQuery(query:$query){'
+             'bulkOperation{id status}userErrors{field message}}}')
+POLL_QUERY = ('query($id:ID!){node(id:$id){... on BulkOperation{'
+              'id status errorCode objectCount url partialDataUrl}}}')
+
+# statuses after which a bulk operation no longer changes
+FAILED = frozenset({'FAILED', 'CANCELED', 'EXPIRED'})
+COMPLETED = 'COMPLETED'
+
+
+class BulkOperationError(Exception):
+    """Raised when a bulk operation is rejected or does not complete."""
+    def __init__(self, message: str, operation: dict = None) -> None:
+        super().__init__(message)
+        self.operation = operation
+
+
+def _data(response: dict) -> dict:
+    if response.get('errors'):
+        raise GQLError(response['errors'])
+    return response['data']
+
+
+def run_bulk_query(client, query, poll_interval: float = 1.0, max_interval: float = 30.0,
+                   timeout: float = None) -> dict:
+    """
+    Submit a query as a bulk operation and poll it until it completes.
+
+    The poll interval doubles up to `max_interval` while the operation runs.
+    Returns the completed operation, whose `url` is None when nothing matched.
+
+    Args:
+        client: A `GQLClient`.
+        query: A `_GQLConfig` root or a document.
+        timeout: Give up after this many seconds, None waits forever.
+    """
+    document = query if isinstance(query, str) else parse_gql_config(query)
+    result = _data(client.post({'query': RUN_QUERY, 'variables': {'query': document}}))
+    result = result['bulkOperationRunQuery']
+    if result.get('userErrors'):
+        raise BulkOperationError('; '.join(x['message'] for x in result['userErrors']), result)
+    operation = result['bulkOperation']
+    deadline = None if timeout is None else time.monotonic() + timeout
+    interval = poll_interval
+    while operation['status'] != COMPLETED:
+        if operation['status'] in FAILED:
+            raise BulkOperationError(
+                f"bulk operation {operation['id']} {operation['status']}: {operation.get('errorCode')}",
+                operation)
+        if deadline is not None and time.monotonic() + interval > deadline:
+            raise TimeoutError(f"bulk operation {operation['id']} did not complete within {timeout}s")
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
+        operation = _data(client.post({'query': POLL_QUERY, 'variables': {'id': operation['id']}}))['node']
+    return operation
+
+
+def download(url: str, path: str, timeout: float = None, chunk_size: int = 1 << 20) -> str:
+    """
+    Stream the file at `url` to `path` in chunks and return `path`.
+    """
+    with urllib.request.urlopen(url, timeout=timeout) as response, open(path, 'wb') as fo:
+        shutil.copyfileobj(response, fo, chunk_size)
+    return path
+
+
+def iter_lines(path: str) -> Iterator[bytes]:
+    """
+    Yield the non empty lines of a file through a read only memory map.
+    """
+    with open(path, 'rb') as fi:
+        if not os.fstat(fi.fileno()).st_size:
+            return
+        with mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            readline = mm.readline
+            line = readline()
+            while line:
+                if not line.isspace():
+                    yield line
+                line = readline()
+
+
+def child_kind(obj: dict) -> str:
+    """
+    The resource type of an object, read from the global id, such as `ProductVariant`.
+    """
+    typename = obj.get('__typename')
+    if typename:
+        return typename
+    gid = obj.get('id')
+    if isinstance(gid, str) and gid.startswith('gid://'):
+        return gid.split('/')[3]
+    return 'children'
+
+
+def iter_bulk_objects(
+    path: str,
+    fields: Dict[str, str] = None,
+    map_type: type = LazyDtoDict,
+    max_index: int = 1_000_000,
+    kind: Callable[[dict], str] = child_kind,
+) -> Iterator[Any]:
+    """
+    Read the JSON lines result of a bulk operation and yield one object tree per root.
+
+    Objects of nested connections are separate lines, pointing to their parent by
+    `__parentId` and written after it. Children are appended to a list of their
+    parent named by `fields[kind(child)]`, or by the kind itself. A root is complete
+    once the next root starts, so only the objects of the current tree are indexed.
+
+    Args:
+        path: The downloaded result file.
+        fields: Resource type -> field name, such as `{'ProductVariant': 'variants'}`.
+        map_type: The dict class trees are wrapped as.
+        max_index: The maximum number of objects of one tree.
+        kind: Returns the resource type of a child object.
+
+    Test:
+        >>> import tempfile
+        >>> with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as fo:
+        ...     _ = fo.write('{"id":"gid://shopify/Product/1"}\\n'
+        ...                  '{"id":"gid://shopify/ProductVariant/2","__parentId":"gid://shopify/Product/1"}\\n')
+        >>> [x.ProductVariant[0].id for x in iter_bulk_objects(fo.name)]
+        ['gid://shopify/ProductVariant/2']
+    """
+    fields = fields or {}
+    loads = json.loads
+    root = None
+    index = {}
+    for line in iter_lines(path):
+        obj = loads(line)
+        parent_id = obj.pop('__parentId', None)
+        if parent_id is None:
+            if root is not None:
+                yield map_type(root)
+            root = obj
+            index.clear()
+        else:
+            parent = index.get(parent_id)
+            if parent is None:
+                raise BulkOperationError(f'parent {parent_id} of a line is not in the current tree')
+            k = kind(obj)
+            parent.setdefault(fields.get(k, k), []).append(obj)
+        gid = obj.get('id')
+        if gid is not None:
+            if len(index) >= max_index:
+                raise BulkOperationError(f'one tree has more than {max_index} objects')
+            index[gid] = obj
+    if root is not None:
+        yield map_type(root)
+
+
+def bulk_export(
+    client,
+    query,
+    fields: Dict[str, str] = None,
+    path: str = None,
+    map_type: type = LazyDtoDict,
+    poll_interval: float = 1.0,
+    timeout: float = None,
+) -> Iterator[Any]:
+    """
+    Run a query as a bulk operation and yield the assembled trees of its result.
+
+    The result is streamed to `path`, or to a temporary file removed afterwards,
+    and read back line by line, so exports larger than memory are fine.
+    See `run_bulk_query` and `iter_bulk_objects`.
+    """
+    operation = run_bulk_query(client, query, poll_interval, timeout=timeout)
+    if not operation.get('url'):
+        return
+    keep = path is not None
+    if not keep:
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+    try:
+        download(operation['url'], path)
+        yield from iter_bulk_objects(path, fields, map_type)
+    finally:
+        if not keep:
+            os.remove(path)
@@ -0,0 +1,193 @@
+import json
+from typing import (Any, Iterator)
+
+from .apq import PersistedQueryRegistry, execute_persisted
+from .cost import estimate_cost
+from .core import OPERATIONS, PreparedQuery, _GQLConfig, canonical_gql_config, operation_of, parse_gql_config
+from .decoder import decode_response
+from .dto import Dto, DtoDict, LazyDtoDict
+from .throttle import CostBucket, send_throttled
+from .transport import ConnectionPool, TransportError, iter_items
+
+def build_payload(query,
+                  variables: dict = None,
+                  schema: dict = None,
+                  operation: str = None,
+                  canonical: bool = False) -> dict:
+    """
+    Build the JSON payload of a query.
+
+    Args:
+        query: A `_GQLConfig` root, a `PreparedQuery` or a document.
+        variables: Variables of the query, or values bound to a `PreparedQuery`.
+        schema: Optional schema index, inline arguments of configs are then hoisted
+            into variables.
+        operation: The operation type of a config, inferred from its class name.
+        canonical: Serialize configs with `canonical_gql_config`, so equal configs
+            are sent as the same text and hashed as `document_hash` does.
+    """
+    if isinstance(query, PreparedQuery):
+        return query(**(variables or {}))
+    if isinstance(query, str):
+        document = query
+    else:
+        operation = operation or operation_of(query)
+        if schema is not None:
+            document, hoisted = parse_gql_config(query, schema, operation=operation, canonical=canonical)
+            variables = {**hoisted, **(variables or {})}
+        else:
+            document = canonical_gql_config(query) if canonical else parse_gql_config(query)
+            if operation != 'query':
+                document = operation + document
+    payload = {'query': document}
+    if variables:
+        payload['variables'] = variables
+    return payload
+
+
+def decode_body(query, body) -> DtoDict:
+    """
+    Wrap a response body as DtoDict.
+
+    Responses of configs and prepared queries are decoded with a decoder specialized
+    to their shape.
+    """
+    if isinstance(query, (_GQLConfig, PreparedQuery)):
+        return decode_response(query, body)
+    if not isinstance(body, dict):
+        body = json.loads(body)
+    return Dto(body)
+
+
+class GQLClient:
+    """GraphQL client sending queries over a pool of keep-alive connections.
+
+    Args:
+        url: The GraphQL endpoint.
+        headers: Extra headers of every request, such as access tokens.
+        pool_size: The maximum number of open connections.
+        timeout: Socket timeout of connecting and reading, in seconds.
+        pool_timeout: How long to wait for a free connection, None waits forever.
+        schema: Optional schema index used to hoist inline arguments into variables.
+        apq: Send documents as automatic persisted queries.
+        registry: The persisted query registry, a private one is used when omitted.
+        throttle: The cost bucket of the shop, queries then wait for their cost instead
+            of being throttled. Share one bucket between the clients of a shop.
+            Configs sent the first time reserve their estimated cost.
+        canonical: Send configs in canonical form, see `build_payload`.
+    """
+    def __init__(
+        self,
+        url: str,
+        headers: dict = None,
+        pool_size: int = 10,
+        timeout: float = 30.0,
+        pool_timeout: float = None,
+        schema: dict = None,
+        apq: bool = False,
+        registry: PersistedQueryRegistry = None,
+        throttle: CostBucket = None,
+        canonical: bool = False,
+    ) -> None:
+        self.pool = ConnectionPool(url, pool_size, timeout, pool_timeout)
+        self.headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            **(headers or {}),
+        }
+        self.schema = schema
+        self.apq = apq
+        self.registry = registry if registry is not None else PersistedQueryRegistry()
+        self.throttle = throttle
+        self.canonical = canonical
+
+    def _body(self, payload: dict) -> bytes:
+        return json.dumps(payload, separators=(',', ':')).encode('utf8')
+
+    def post_raw(self, payload: dict) -> bytes:
+        """
+        Send a payload and return the raw response body.
+        """
+        status, body = self.pool.post(self._body(payload), self.headers)
+        if not 200 <= status < 300:
+            raise TransportError(status, body)
+        return body
+
+    def post(self, payload: dict) -> dict:
+        """
+        Send a payload and return the decoded response.
+        """
+        return json.loads(self.post_raw(payload))
+
+    def execute(self, query, variables: dict = None, operation: str = None) -> DtoDict:
+        """
+        Serialize and send a query, and return the response wrapped as DtoDict.
+        """
+        return decode_body(query, self.send(self.payload(query, variables, operation)))
+
+    def payload(self, query, variables: dict = None, operation: str = None) -> dict:
+        """
+        Build the payload of a query with the schema of the client.
+
+        With a throttle, configs sent the first time reserve their estimated cost.
+        """
+        payload = build_payload(query, variables, self.schema, operation, self.canonical)
+        if self.throttle is not None and isinstance(query, _GQLConfig):
+            if not self.throttle.knows(payload['query']):
+                self.throttle.learn(payload['query'], estimate_cost(query, self.schema, variables=variables))
+        return payload
+
+    def send(self, payload: dict):
+        """
+        Send a payload built by `build_payload`, as a persisted query when enabled.
+
+        Returns the raw or the decoded response body.
+        """
+        if self.throttle is not None:
+            return send_throttled(self.throttle, self._send, payload)
+        if self.apq:
+            return self._send(payload)
+        return self.post_raw(payload)
+
+    def _send(self, payload: dict) -> dict:
+        if self.apq:
+            return execute_persisted(self.post, payload['query'], payload.get('variables'), self.registry,
+                                     on_unsupported=self._unsupported)
+        return self.post(payload)
+
+    def _unsupported(self):
+        # the server has no persisted queries, send documents as they are from now on
+        self.apq = False
+
+    def stream(
+        self,
+        query,
+        path: str,
+        variables: dict = None,
+        operation: str = None,
+        map_type: type = LazyDtoDict,
+    ) -> Iterator[Any]:
+        """
+        Send a query and yield the values at `path` while the response arrives.
+
+        See `gqlclient.transport.iter_items`.
+        """
+        payload = self.payload(query, variables, operation)
+        conn, response = self.pool.request(self._body(payload), self.headers)
+        reuse = False
+        try:
+            if not 200 <= response.status < 300:
+                raise TransportError(response.status, response.read())
+            yield from iter_items(response, path, map_type)
+            reuse = not response.will_close and not response.read()
+        finally:
+            self.pool.release(conn, reuse)
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
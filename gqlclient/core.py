@@ -1,7 +1,9 @@
 import abc
 from typing import (
+    Dict,
     List,
     NewType,
+    Tuple,
     Union,
 )
 
@@ -62,6 +64,12 @@ Cuid = NewType('Cuid', str)
 Ip = NewType('Ip', str)
 Semver = NewType('Semver', str)
 
+import copy
+import hashlib
+import io
+import json
+import sys
+import weakref
 import warnings
 import functools
 
@@ -89,12 +97,99 @@ def deprecated(reason=None, version=None):
 ################
 
 
+class FragmentRoutes:
+    """Routes the fields of unions and interfaces to the fragment of their concrete type.
+
+    One table holds the field names of the concrete types of a generated schema and is
+    shared by every abstract config class of it. The routing dict of a class is built
+    the first time the class is used, and classes with the same possible types share it.
+    Its keys and values are interned, values being the ready `... on Type` keys.
+
+    Args:
+        fields: The field names of each concrete type.
+
+    Test:
+        >>> routes = FragmentRoutes({'Collection': ('id', 'handle'), 'Product': ('id', 'title')})
+        >>> class Node(_GQLConfig):
+        ...     _fragments = routes.of('Collection', 'Product')
+        >>> node = Node()
+        >>> node.handle = ''
+        >>> node.title = ''
+        >>> parse_gql_config(node)
+        '{... on Collection {handle } ... on Product {title }}'
+        >>> Node._judge_attr_from('id')
+        'Product'
+    """
+    __slots__ = ('fields', '_tables')
+
+    def __init__(self, fields: Dict[str, Tuple[str, ...]]) -> None:
+        self.fields = fields
+        self._tables = {}
+
+    def table(self, possible_types: Tuple[str, ...]) -> Dict[str, str]:
+        """
+        The routing dict of a union or interface, fields of later types win.
+        """
+        table = self._tables.get(possible_types)
+        if table is None:
+            table = {}
+            for typ in possible_types:
+                on_key = sys.intern(f'... on {typ}')
+                for field in self.fields.get(typ, ()):
+                    table[sys.intern(field)] = on_key
+            self._tables[possible_types] = table
+        return table
+
+    def of(self, *possible_types: str) -> '_LazyFragments':
+        """
+        The `_fragments` class attribute of a union or interface config.
+        """
+        return _LazyFragments(self, possible_types)
+
+
+class _LazyFragments:
+    """Class attribute replacing itself with the routing dict of its class on first access."""
+    __slots__ = ('routes', 'possible_types')
+
+    def __init__(self, routes: FragmentRoutes, possible_types: Tuple[str, ...]) -> None:
+        self.routes = routes
+        self.possible_types = possible_types
+
+    def __get__(self, obj, cls) -> Dict[str, str]:
+        table = self.routes.table(self.possible_types)
+        setattr(cls, '_fragments', table)
+        return table
+
+
 class _GQLConfig:
-    __slots__ = ('_data', )
+    """Base class of the generated query configs.
+
+    Every config caches its serialized text. Edits through attributes or calls only
+    drop the cache of the edited config and of its ancestors, so re-serializing after
+    a small edit reuses the text of every untouched subtree.
+
+    Note:
+        In-place edits of plain dict or list values are not tracked,
+        reassign them or call `_invalidate` afterwards.
+    """
+    # `_shape` is the hashable response shape of the config, see `gqlclient.decoder`
+    __slots__ = ('_data', '_cache', '_shape', '_parents', '__weakref__')
+    # field -> concrete type, for hand written unions and interfaces
     _attr_from = {}
+    # field -> `... on Type` key of its fragment, see `FragmentRoutes`
+    _fragments = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        attr_from = cls.__dict__.get('_attr_from')
+        if attr_from and '_fragments' not in cls.__dict__:
+            cls._fragments = {k: sys.intern(f'... on {v}') for k, v in attr_from.items()}
 
     def __init__(self) -> None:
         self._data = {}
+        self._cache = None
+        self._shape = None
+        self._parents = []
 
     def __call__(self, value, **kwds):
         if isinstance(value, _GQLConfig):
@@ -103,17 +198,74 @@ class _GQLConfig:
             self._data = {}
         for k, v in kwds.items():
             self._data[f'${k}'] = v
+        for v in self._data.values():
+            self._adopt(v)
+        self._invalidate()
 
     def _key(self, attrName: str) -> str:
         if attrName.endswith('_'):
             return attrName[:-1]
         return attrName
 
+    # the cache and the weak parent links are not copied, they are rebuilt from `_data`
+    def __getstate__(self):
+        return self._data
+
+    def __setstate__(self, state):
+        self._data = state
+        self._cache = None
+        self._shape = None
+        self._parents = []
+        self._adopt(state)
+
+    def __deepcopy__(self, memo):
+        new = memo[id(self)] = type(self).__new__(type(self))
+        new.__setstate__(copy.deepcopy(self._data, memo))
+        return new
+
+    def _adopt(self, v):
+        """
+        Register self as a parent of the configs in `v` so their edits invalidate self.
+        """
+        ref = weakref.ref(self)
+        stack = [v]
+        while stack:
+            v = stack.pop()
+            if isinstance(v, _GQLConfig):
+                parents = v._parents
+                if ref not in parents:
+                    parents[:] = [x for x in parents if x() is not None]
+                    parents.append(ref)
+            elif isinstance(v, dict):
+                stack.extend(v.values())
+            elif isinstance(v, (list, tuple)):
+                stack.extend(v)
+
+    def _invalidate(self):
+        """
+        Drop the cached text and response shape of self and of every ancestor.
+
+        The walk can not stop at an uncached ancestor, configs used as argument
+        values are never cached themselves but their parents are.
+        """
+        seen = set()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            node._cache = None
+            node._shape = None
+            for ref in node._parents:
+                parent = ref()
+                if parent is not None:
+                    stack.append(parent)
+
     def _get_ctx(self, _key: str):
         _data = self._data
-        _on_key = self._judge_attr_from(_key)
+        _on_key = self._fragments.get(_key)
         if _on_key:
-            _on_key = f"... on {_on_key}"
             if _on_key not in _data:
                 _data[_on_key] = {}
             _data = _data[_on_key]
@@ -121,7 +273,8 @@ class _GQLConfig:
 
     @classmethod
     def _judge_attr_from(cls, attrName: str) -> str:
-        return cls._attr_from.get(attrName)
+        _on_key = cls._fragments.get(attrName)
+        return _on_key and _on_key[len('... on '):]
 
     def __setattr__(self, k: str, v):
         if k.startswith('_'):
@@ -129,6 +282,8 @@ class _GQLConfig:
         _key = self._key(k)
         _data = self._get_ctx(_key)
         _data[_key] = v
+        self._adopt(v)
+        self._invalidate()
 
     def __getattribute__(self, k: str):
         if k.startswith('_'):
@@ -137,7 +292,9 @@ class _GQLConfig:
             _key = self._key(k)
             _data = self._get_ctx(_key)
             if _key not in _data:
-                _data[_key] = _GQLConfig()
+                _data[_key] = child = _GQLConfig()
+                self._adopt(child)
+                self._invalidate()
             return _data[_key]
         except KeyError:
             raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{k}'")
@@ -147,14 +304,15 @@ class _GQLConfig:
             return super().__delattr__(k)
         try:
             _key = self._key(k)
-            _on_key = self._judge_attr_from(_key)
+            _on_key = self._fragments.get(_key)
             if _on_key:
                 if len(self._data[_on_key]) > 1:
                     del self._data[_on_key][_key]
                 else:
                     del self._data[_on_key]
-                return
-            del self._data[_key]
+            else:
+                del self._data[_key]
+            self._invalidate()
         except KeyError:
             raise AttributeError(k)
 
@@ -162,20 +320,45 @@ class _GQLConfig:
 def parse_gql_param(config) -> str:
     if isinstance(config, _GQLConfig):
         config = config._data
-    if isinstance(config, (str, float, int)):
-        return str(config)
+    if isinstance(config, Variable):
+        return f"${config.name}"
     if isinstance(config, bool):
         if config:
             return 'true'
         return 'false'
+    if isinstance(config, (str, float, int)):
+        return str(config)
     if isinstance(config, dict):
-        return f"{{{','.join({f'{k}:{parse_gql_param(v)}' for k, v in config.items()})}}}"
+        return f"{{{','.join(f'{k}:{parse_gql_param(v)}' for k, v in config.items())}}}"
     return f"[{','.join(parse_gql_param(x) for x in config)}]"
 
 
-def parse_gql_config(config) -> str:
+def parse_gql_config(config,
+                     schema: dict = None,
+                     root: str = None,
+                     operation: str = 'query',
+                     canonical: bool = False):
+    """
+    Serialize a config tree to a GraphQL document.
+
+    Args:
+        schema: Optional schema index (see `gqlclient.schema`). When given, every inline
+            argument whose type is known is hoisted into a typed `$variable` and
+            `(document, variables)` is returned instead of the document alone.
+        root: Type name of the root config, defaults to its class name.
+        operation: Operation type used in the header in hoisting mode.
+        canonical: Write the body of the hoisted document with `canonical_gql_config`.
+    """
+    if schema is not None:
+        tree = _hoist(config, {}, '', root or type(config).__name__, schema, {})
+        slots = _collect_variables(tree, {})
+        variables = {k: v.default for k, v in slots.items() if v.default is not _MISSING}
+        body = canonical_gql_config(tree) if canonical else parse_gql_config(tree)
+        return _operation_header(operation, '', slots) + body, variables
     if isinstance(config, _GQLConfig):
-        config = config._data
+        if config._cache is None:
+            config._cache = parse_gql_config(config._data)
+        return config._cache
     if isinstance(config, str):
         return config
     fields = []
@@ -191,3 +374,539 @@ def parse_gql_config(config) -> str:
     if fields:
         rst += f"{{{' '.join(fields)}}}"
     return rst
+
+
+_PARAM = 1
+_CONFIG = 2
+_FLUSH_CHUNKS = 4096
+
+
+def _plain(value) -> bool:
+    """
+    Whether an argument value is written as `str(value)`, booleans are not.
+    """
+    return isinstance(value, (str, float, int)) and not isinstance(value, bool)
+
+
+def _expand_param(config, stack: list):
+    if isinstance(config, _GQLConfig):
+        config = config._data
+    if isinstance(config, Variable):
+        return f"${config.name}"
+    if isinstance(config, bool):
+        return 'true' if config else 'false'
+    if isinstance(config, (str, float, int)):
+        return str(config)
+    if isinstance(config, dict):
+        if all(_plain(v) for v in config.values()):
+            return f"{{{','.join(f'{k}:{v}' for k, v in config.items())}}}"
+        opening, closing, items = '{', '}', [(f'{k}:', v) for k, v in config.items()]
+    else:
+        opening, closing, items = '[', ']', [('', x) for x in config]
+    stack.append(closing)
+    for i in range(len(items) - 1, -1, -1):
+        prefix, v = items[i]
+        if i:
+            prefix = f",{prefix}"
+        if _plain(v):
+            stack.append(f"{prefix}{v}")
+        else:
+            stack.append((_PARAM, v))
+            stack.append(prefix)
+    return opening
+
+
+def _expand_config(config, stack: list):
+    if isinstance(config, _GQLConfig):
+        if config._cache is not None:
+            return config._cache
+        config = config._data
+    if isinstance(config, str):
+        return config
+    parms = [(k, v) for k, v in config.items() if k.startswith('$')]
+    fields = [(k, v) for k, v in config.items() if not k.startswith('$')]
+    if fields:
+        stack.append('}')
+        for i in range(len(fields) - 1, -1, -1):
+            k, v = fields[i]
+            prefix = f" {k} " if i else f"{k} "
+            if isinstance(v, str):
+                stack.append(f"{prefix}{v}")
+            else:
+                stack.append((_CONFIG, v))
+                stack.append(prefix)
+        stack.append('{')
+    if parms:
+        stack.append(')')
+        for i in range(len(parms) - 1, -1, -1):
+            k, v = parms[i]
+            prefix = f",{k[1:]}:" if i else f"{k[1:]}:"
+            if _plain(v):
+                stack.append(f"{prefix}{v}")
+            else:
+                stack.append((_PARAM, v))
+                stack.append(prefix)
+        return '('
+    return ''
+
+
+def write_gql_config(config, sink=None, encoding: str = 'utf8'):
+    """
+    Serialize a config tree without recursion, writing chunks straight into `sink`.
+
+    The output is identical to `parse_gql_config(config)`, but nesting depth is only
+    bounded by memory.
+
+    Args:
+        sink: A text or binary file-like object, or a bytearray.
+            When omitted, the document is returned as a str.
+        encoding: Encoding used for binary sinks.
+
+    Test:
+        >>> q = _GQLConfig()
+        >>> q.node('', id=1)
+        >>> write_gql_config(q) == parse_gql_config(q)
+        True
+        >>> write_gql_config(q, bytearray())
+        bytearray(b'{node (id:1)}')
+    """
+    if sink is None:
+        write = None
+    elif isinstance(sink, bytearray):
+        write = lambda chunk: sink.extend(chunk.encode(encoding))
+    elif isinstance(sink, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(sink, 'mode', ''):
+        write = lambda chunk: sink.write(chunk.encode(encoding))
+    else:
+        write = sink.write
+    chunks = []
+    stack = [(_CONFIG, config)]
+    while stack:
+        item = stack.pop()
+        if item.__class__ is str:
+            chunks.append(item)
+            continue
+        if item[0] == _CONFIG:
+            chunks.append(_expand_config(item[1], stack))
+        else:
+            chunks.append(_expand_param(item[1], stack))
+        if write and len(chunks) >= _FLUSH_CHUNKS:
+            write(''.join(chunks))
+            chunks.clear()
+    if write is None:
+        return ''.join(chunks)
+    write(''.join(chunks))
+    return sink
+
+
+def _canonical_param(config) -> str:
+    if isinstance(config, _GQLConfig):
+        config = config._data
+    if isinstance(config, Variable):
+        return f"${config.name}"
+    if isinstance(config, bool):
+        return 'true' if config else 'false'
+    if isinstance(config, str):
+        return config.strip()
+    if isinstance(config, (float, int)):
+        return str(config)
+    if isinstance(config, dict):
+        return f"{{{','.join(f'{k}:{_canonical_param(config[k])}' for k in sorted(config))}}}"
+    return f"[{','.join(_canonical_param(x) for x in config)}]"
+
+
+def canonical_gql_config(config) -> str:
+    """
+    Serialize a config tree in canonical form.
+
+    Fields, arguments and input object fields are sorted by name and separated by
+    exactly one character, so equal trees always produce the same text no matter
+    the order they were built in.
+
+    Test:
+        >>> a, b = _GQLConfig(), _GQLConfig()
+        >>> a.x = ''
+        >>> a.y('', first=1, after='"c"')
+        >>> b.y('', after=' "c"', first=1)
+        >>> b.x = ''
+        >>> canonical_gql_config(a) == canonical_gql_config(b)
+        True
+        >>> canonical_gql_config(a)
+        '{x y(after:"c",first:1)}'
+    """
+    if isinstance(config, _GQLConfig):
+        config = config._data
+    if isinstance(config, str):
+        return config.strip()
+    fields = []
+    parms = []
+    for k in sorted(config):
+        v = config[k]
+        if k.startswith('$'):
+            parms.append(f"{k[1:]}:{_canonical_param(v)}")
+        else:
+            sub = canonical_gql_config(v)
+            if sub and sub[0] not in '({':
+                sub = f" {sub}"
+            fields.append(f"{k}{sub}")
+    rst = ''
+    if parms:
+        rst += f"({','.join(parms)})"
+    if fields:
+        rst += f"{{{' '.join(fields)}}}"
+    return rst
+
+
+# root config class name -> operation type, every other root is a query
+OPERATIONS = {
+    'Mutation': 'mutation',
+    'Subscription': 'subscription',
+}
+
+
+def operation_of(config) -> str:
+    return OPERATIONS.get(type(config).__name__, 'query')
+
+
+def document_hash(document) -> str:
+    """
+    Return the hex SHA-256 digest of a document.
+
+    A config tree is hashed through its canonical form, prefixed with its operation
+    type unless it is a query. That is the document a client created with
+    `canonical=True` and no schema sends, so the digest is also the one of its
+    persisted query. A str is hashed as is.
+
+    Test:
+        >>> q = _GQLConfig()
+        >>> q.shop.name = ''
+        >>> document_hash(q) == document_hash(canonical_gql_config(q)) == document_hash('{shop{name}}')
+        True
+    """
+    if not isinstance(document, str):
+        operation = operation_of(document)
+        document = canonical_gql_config(document)
+        if operation != 'query':
+            document = operation + document
+    return hashlib.sha256(document.encode('utf8')).hexdigest()
+
+
+def response_shape(config, shape: dict = None) -> dict:
+    """
+    Return the nested object fields of the response a config tree selects.
+
+    Maps response keys to the shape of their sub-selection, leaf fields are left out.
+    Fragments are merged into the selection they belong to.
+
+    Test:
+        >>> q = _GQLConfig()
+        >>> q.shop.name = ''
+        >>> q.node('', id=1)
+        >>> response_shape(q)
+        {'shop': {}}
+    """
+    if shape is None:
+        shape = {}
+    if isinstance(config, _GQLConfig):
+        config = config._data
+    if isinstance(config, str):
+        return shape
+    for k, v in config.items():
+        if k[0] in '$@':
+            continue
+        if k.startswith('... on '):
+            response_shape(v, shape)
+            continue
+        if isinstance(v, _GQLConfig):
+            v = v._data
+        if isinstance(v, dict) and any(x[0] not in '$@' for x in v):
+            key = k.split(':')[0].strip()
+            response_shape(v, shape.setdefault(key, {}))
+    return shape
+
+
+def alias_configs(configs: List['_GQLConfig'], prefix: str = 'b') -> Tuple['_GQLConfig', List[Dict[str, str]]]:
+    """
+    Merge the root fields of several configs into one root, each under its own alias.
+
+    The alias of a field is `{prefix}{i}_{response key}`, where `i` is the position of
+    its config. Returns the merged root, of the class of the first config, and per
+    config the map of alias -> response key, see `split_aliased`.
+
+    Test:
+        >>> a, b = _GQLConfig(), _GQLConfig()
+        >>> a.product(a.product, id='"1"')
+        >>> a.product.title = ''
+        >>> b.product(a.product, id='"2"')
+        >>> root, aliases = alias_configs([a, b])
+        >>> parse_gql_config(root)
+        '{b0_product:product (id:"1"){title } b1_product:product (id:"2"){title }}'
+        >>> aliases
+        [{'b0_product': 'product'}, {'b1_product': 'product'}]
+    """
+    data = {}
+    aliases = []
+    for i, config in enumerate(configs):
+        if isinstance(config, _GQLConfig):
+            config = config._data
+        names = {}
+        for k, v in config.items():
+            if k[0] in '$@' or k.startswith('... on '):
+                raise ValueError(f'only root fields can be aliased, not {k!r}')
+            key, _, name = k.rpartition(':')
+            name = name.strip()
+            key = key.strip() or name
+            alias = f'{prefix}{i}_{key}'
+            data[f'{alias}:{name}'] = v
+            names[alias] = key
+        aliases.append(names)
+    root = type(configs[0])() if configs and isinstance(configs[0], _GQLConfig) else _GQLConfig()
+    root._data = data
+    root._adopt(data)
+    return root, aliases
+
+
+def split_aliased(body: dict, aliases: List[Dict[str, str]]) -> List[dict]:
+    """
+    Split the response body of a root merged by `alias_configs` into one body per config.
+
+    Errors are given to the config of the alias their path starts with, with the
+    path renamed back, errors without a path are given to every config.
+    """
+    data = body.get('data')
+    errors = body.get('errors') or ()
+    owners = {alias: i for i, names in enumerate(aliases) for alias in names}
+    rst = []
+    for names in aliases:
+        part = {'data': None if data is None else {key: data.get(alias) for alias, key in names.items()}}
+        part_errors = []
+        for error in errors:
+            path = error.get('path')
+            if not path:
+                part_errors.append(error)
+            elif path[0] in names:
+                part_errors.append({**error, 'path': [names[path[0]], *path[1:]]})
+        if part_errors:
+            part['errors'] = part_errors
+        rst.append(part)
+    for error in errors:
+        path = error.get('path')
+        if path and path[0] not in owners:
+            for part in rst:
+                part.setdefault('errors', []).append(error)
+    return rst
+
+
+def directive_impl(
+    payload: Union[_GQLConfig, dict],
+    directive: str,
+    **kwargs,
+):
+    data = {}
+    for k, v in kwargs.items():
+        key = f'${k}'
+        if key.endswith('_'):
+            key = key[:-1]
+        data[key] = v
+    if isinstance(payload, _GQLConfig):
+        payload._data[f'@{directive}'] = data
+        payload._invalidate()
+    else:
+        payload[f'@{directive}'] = data
+    pass
+
+
+_MISSING = object()
+
+
+class Variable:
+    """Placeholder for a GraphQL variable used as an argument value.
+
+    Test:
+        >>> q = _GQLConfig()
+        >>> q.node(_GQLConfig(), id=Variable('id', 'ID!'))
+        >>> parse_gql_config(q)
+        '{node (id:$id)}'
+    """
+    __slots__ = ('name', 'type', 'default')
+
+    def __init__(self, name: str, type: str, default=_MISSING) -> None:
+        self.name = name
+        self.type = type
+        self.default = default
+
+    def __repr__(self) -> str:
+        return f"Variable({self.name!r}, {self.type!r})"
+
+    def definition(self) -> str:
+        return f"${self.name}:{self.type}"
+
+
+def _collect_variables(config, variables: dict) -> dict:
+    if isinstance(config, _GQLConfig):
+        config = config._data
+    if isinstance(config, Variable):
+        old = variables.setdefault(config.name, config)
+        if old.type != config.type:
+            raise ValueError(
+                f"variable '{config.name}' declared as both {old.type} and {config.type}")
+    elif isinstance(config, dict):
+        for v in config.values():
+            _collect_variables(v, variables)
+    elif isinstance(config, (list, tuple)):
+        for v in config:
+            _collect_variables(v, variables)
+    return variables
+
+
+class PreparedQuery:
+    """Immutable query compiled from a `_GQLConfig` tree.
+
+    The document is serialized once, every `Variable` in the tree becomes a slot.
+    Binding only builds the variables payload, the tree is never walked again.
+
+    Test:
+        >>> q = _GQLConfig()
+        >>> q.node(_GQLConfig(), id=Variable('id', 'ID!'))
+        >>> pq = prepare(q)
+        >>> pq.document
+        'query($id:ID!){node (id:$id)}'
+        >>> pq(id='gid://1') == {'query': pq.document, 'variables': {'id': 'gid://1'}}
+        True
+    """
+    __slots__ = ('document', 'slots', 'shape')
+
+    def __init__(self, document: str, slots: dict, shape: dict = None) -> None:
+        object.__setattr__(self, 'document', document)
+        object.__setattr__(self, 'slots', slots)
+        object.__setattr__(self, 'shape', shape)
+
+    def __setattr__(self, k: str, v):
+        raise AttributeError(f"'{self.__class__.__name__}' object is read only")
+
+    def __delattr__(self, k: str):
+        raise AttributeError(f"'{self.__class__.__name__}' object is read only")
+
+    def bind(self, **values) -> dict:
+        """
+        Build the variables of one call. Values are plain JSON values, not GraphQL literals.
+        """
+        variables = {}
+        for name, slot in self.slots.items():
+            if name in values:
+                variables[name] = values[name]
+            elif slot.default is not _MISSING:
+                variables[name] = slot.default
+            elif slot.type.endswith('!'):
+                raise TypeError(f"missing required variable '{name}'")
+        for k in values:
+            if k not in self.slots:
+                raise TypeError(f"unexpected variable '{k}'")
+        return variables
+
+    def __call__(self, **values) -> dict:
+        return {'query': self.document, 'variables': self.bind(**values)}
+
+
+def _operation_header(operation: str, name: str, slots: dict) -> str:
+    header = operation
+    if name:
+        header += f" {name}"
+    if slots:
+        header += f"({','.join(v.definition() for v in slots.values())})"
+    return header
+
+
+_LITERALS = {'true': True, 'false': False, 'null': None}
+
+
+def _literal_value(value):
+    """
+    Convert an inline argument value (GraphQL literal text) to its JSON value.
+    """
+    if isinstance(value, _GQLConfig):
+        value = value._data
+    if isinstance(value, str):
+        if value.startswith('"'):
+            return json.loads(value)
+        if value in _LITERALS:
+            return _LITERALS[value]
+        for typ in (int, float):
+            try:
+                return typ(value)
+            except ValueError:
+                pass
+        return value
+    if isinstance(value, dict):
+        return {k: _literal_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_literal_value(x) for x in value]
+    return value
+
+
+def _hoistable(value) -> bool:
+    if isinstance(value, str):
+        return not value.startswith('$')
+    return not _collect_variables(value, {})
+
+
+def _hoist(config, args: dict, path: str, type_name: str, schema: dict, names: dict):
+    """
+    Copy a config tree, replacing typed inline arguments with `Variable`s.
+
+    Variables are named after the field path so the same tree shape always yields the
+    same document.
+    """
+    if isinstance(config, _GQLConfig):
+        config = config._data
+    if isinstance(config, str):
+        return config
+    fields = schema.get(type_name) or {}
+    rst = {}
+    for k, v in config.items():
+        if k.startswith('$'):
+            ref = args.get(k[1:])
+            if ref and _hoistable(v):
+                name = f"{path}_{k[1:]}"
+                names[name] = names.get(name, 0) + 1
+                if names[name] > 1:
+                    name += str(names[name])
+                v = Variable(name, ref, _literal_value(v))
+        elif k.startswith('... on '):
+            v = _hoist(v, {}, path, k[7:], schema, names)
+        elif not k.startswith('@'):
+            alias, _, name = k.rpartition(':')
+            name = name.strip()
+            alias = alias.strip() or name
+            ref, field_args = fields.get(name, ('', {}))
+            v = _hoist(v, field_args, f"{path}_{alias}" if path else alias,
+                       ref.strip('[]!'), schema, names)
+        rst[k] = v
+    return rst
+
+
+def prepare(
+    config,
+    operation: str = 'query',
+    name: str = '',
+    schema: dict = None,
+    root: str = None,
+) -> PreparedQuery:
+    """
+    Compile a `_GQLConfig` root into a `PreparedQuery`.
+
+    Args:
+        config: The root config, such as QueryRoot or Mutation.
+        operation: The operation type, `query` or `mutation`.
+        name: Optional operation name.
+        schema: Optional schema index. Inline arguments are hoisted into slots whose
+            default is the inline value.
+        root: Type name of the root config, defaults to its class name.
+    """
+    if schema is not None:
+        config = _hoist(config, {}, '', root or type(config).__name__, schema, {})
+    slots = _collect_variables(config, {})
+    return PreparedQuery(
+        _operation_header(operation, name, slots) + parse_gql_config(config),
+        slots,
+        response_shape(config),
+    )
@@ -0,0 +1,155 @@
+from typing import (Any, Dict)
+
+from .core import _MISSING, Variable, _GQLConfig
+from .schema import SchemaIndex, base_type
+
+OBJECT_COST = 1
+CONNECTION_COST = 2
+MUTATION_COST = 10
+# root type name -> cost of each of its fields
+ROOT_COSTS = {
+    'Mutation': MUTATION_COST,
+}
+
+
+def _children(v) -> dict:
+    """
+    The sub-selection of a field, None for leaf fields.
+    """
+    if isinstance(v, _GQLConfig):
+        v = v._data
+    if isinstance(v, dict) and any(k[0] not in '$@' for k in v):
+        return v
+    return None
+
+
+def _int(value, variables: Dict[str, Any]):
+    if isinstance(value, Variable):
+        value = variables.get(value.name, None if value.default is _MISSING else value.default)
+    elif isinstance(value, str):
+        if value.startswith('$'):
+            value = variables.get(value[1:])
+        else:
+            try:
+                value = int(value)
+            except ValueError:
+                return None
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def _page_size(selection: dict, variables: Dict[str, Any], default_size: int) -> int:
+    for arg in ('$first', '$last'):
+        if arg in selection:
+            size = _int(selection[arg], variables)
+            if size is not None:
+                return size
+    return default_size
+
+
+def _is_connection(type_name: str, selection: dict) -> bool:
+    if type_name:
+        return type_name.endswith('Connection')
+    return 'edges' in selection or 'nodes' in selection
+
+
+class _Estimator:
+    __slots__ = ('schema', 'variables', 'default_size')
+
+    def __init__(self, schema: SchemaIndex, variables: Dict[str, Any], default_size: int) -> None:
+        self.schema = schema
+        self.variables = variables
+        self.default_size = default_size
+
+    def field_type(self, type_name: str, key: str) -> str:
+        fields = self.schema.get(type_name)
+        if not fields:
+            return ''
+        return base_type(fields.get(key.split(':')[-1].strip(), ('', ))[0])
+
+    def selection(self, selection: dict, type_name: str) -> int:
+        """
+        Cost of a selection set, only the most expensive of its fragments is counted.
+        """
+        total = fragments = 0
+        for k, v in selection.items():
+            if k[0] in '$@':
+                continue
+            if k.startswith('... on '):
+                fragments = max(fragments, self.selection(_children(v) or {}, k[7:]))
+                continue
+            children = _children(v)
+            if children is not None:
+                total += self.field(children, self.field_type(type_name, k))
+        return total + fragments
+
+    def field(self, selection: dict, type_name: str) -> int:
+        if not _is_connection(type_name, selection):
+            return OBJECT_COST + self.selection(selection, type_name)
+        return CONNECTION_COST + _page_size(selection, self.variables, self.default_size) * self.items(
+            selection, type_name)
+
+    def items(self, selection: dict, type_name: str) -> int:
+        """
+        Cost of one item of a connection, wrappers and page info are free.
+        """
+        item = 0
+        edges = _children(selection.get('edges'))
+        if edges is not None:
+            node = _children(edges.get('node'))
+            if node is not None:
+                edge_type = self.field_type(type_name, 'edges')
+                item = max(item, self.field(node, self.field_type(edge_type, 'node')))
+        nodes = _children(selection.get('nodes'))
+        if nodes is not None:
+            item = max(item, self.field(nodes, self.field_type(type_name, 'nodes')))
+        return item
+
+
+def estimate_cost(
+    config,
+    schema: SchemaIndex = None,
+    root: str = None,
+    variables: Dict[str, Any] = None,
+    default_size: int = 1,
+) -> int:
+    """
+    Estimate the requested cost the server calculates for a config tree.
+
+    Follows the Shopify rules: scalars and enums are free, objects cost 1,
+    connections cost 2 plus their `first` or `last` times the cost of one node,
+    and every mutation field costs 10. Runs in one pass over the tree.
+
+    Args:
+        config: The root config, such as QueryRoot or Mutation.
+        schema: Optional schema index. Without it, fields selecting `edges` or
+            `nodes` are taken as connections.
+        root: Type name of the root config, defaults to its class name.
+        variables: Values of variables used as `first` or `last`.
+        default_size: The page size of connections without a known size.
+
+    Test:
+        >>> variants = _GQLConfig()
+        >>> variants.edges.node.id = ''
+        >>> products = _GQLConfig()
+        >>> products.edges.node.variants(variants, first='5')
+        >>> q = _GQLConfig()
+        >>> q.shop.name = ''
+        >>> q.products(products, first=10)
+        >>> estimate_cost(q)
+        83
+    """
+    root = root or type(config).__name__
+    estimator = _Estimator(schema or {}, variables or {}, default_size)
+    selection = _children(config) or {}
+    per_field = ROOT_COSTS.get(root)
+    if per_field is None:
+        return estimator.selection(selection, root)
+    total = 0
+    for k, v in selection.items():
+        if k[0] in '$@' or k.startswith('... on '):
+            continue
+        children = _children(v)
+        total += per_field
+        if children is not None:
+            total += estimator.selection(children, estimator.field_type(root, k))
+    return total
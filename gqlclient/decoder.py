@@ -0,0 +1,120 @@
+import json
+import threading
+from typing import (Any, Callable, Dict)
+
+from .core import PreparedQuery, _GQLConfig, response_shape
+from .dto import DtoDict, DtoList
+
+Decoder = Callable[[Any], Any]
+
+_CACHE: Dict[tuple, Decoder] = {}
+_LOCK = threading.Lock()
+
+
+def _shape_key(shape: dict) -> tuple:
+    return tuple((k, _shape_key(v)) for k, v in shape.items())
+
+
+def _wrap_list(decode: Decoder, v: list, new_list, extend) -> list:
+    rst = new_list()
+    extend(rst, [
+        None if x is None else
+        decode(x) if x.__class__ is not list else _wrap_list(decode, x, new_list, extend)
+        for x in v
+    ])
+    return rst
+
+
+def _generate(shape: dict, dict_cls: type, list_cls: type) -> Decoder:
+    """
+    Generate the source of one function per object of the shape and compile it.
+    """
+    lines = []
+    names = []
+
+    def visit(shape: dict) -> str:
+        children = [(k, visit(v)) for k, v in shape.items()]
+        name = f"_n{len(names)}"
+        names.append(name)
+        lines.append(f"def {name}(v):")
+        lines.append("\to = _new(_D)")
+        lines.append("\t_update(o, v)")
+        for k, child in children:
+            lines.append(f"\tx = v.get({k!r})")
+            lines.append("\tif x is not None:")
+            lines.append(
+                f"\t\to[{k!r}] = {child}(x) if x.__class__ is not list else _wrap_list({child}, x, _new_list, _extend)"
+            )
+        lines.append("\treturn o")
+        return name
+
+    root = visit(shape)
+    namespace = {
+        '_new': dict.__new__,
+        '_update': dict.update,
+        '_D': dict_cls,
+        '_new_list': lambda: list.__new__(list_cls),
+        '_extend': list.extend,
+        '_wrap_list': _wrap_list,
+    }
+    exec('\n'.join(lines), namespace)
+    return namespace[root]
+
+
+def compile_decoder(query, dict_cls: type = DtoDict, list_cls: type = DtoList) -> Decoder:
+    """
+    Return a decoder specialized to the response shape of a query.
+
+    The decoder takes the `data` object of a response decoded by plain `json.loads`
+    and wraps it in one pass. Only the objects the query selects are visited, leaf
+    values are copied as they are. Decoders are cached by shape, and the shape of
+    a config is kept on it until the config is edited.
+
+    Args:
+        query: A `_GQLConfig` or a `PreparedQuery`.
+        dict_cls: The DtoDict class objects are built as.
+        list_cls: The DtoList class lists of objects are built as.
+
+    Test:
+        >>> from gqlclient.core import _GQLConfig
+        >>> q = _GQLConfig()
+        >>> q.shop.domains.host = ''
+        >>> data = compile_decoder(q)({'shop': {'domains': [{'host': 'a'}]}})
+        >>> data.shop.domains[0].host
+        'a'
+    """
+    if isinstance(query, PreparedQuery):
+        shape = query.shape
+        shape_key = _shape_key(shape)
+    elif isinstance(query, _GQLConfig) and query._shape is not None:
+        shape = None
+        shape_key = query._shape
+    else:
+        shape = response_shape(query)
+        shape_key = _shape_key(shape)
+        if isinstance(query, _GQLConfig):
+            query._shape = shape_key
+    key = (shape_key, dict_cls, list_cls)
+    decoder = _CACHE.get(key)
+    if decoder is None:
+        with _LOCK:
+            decoder = _CACHE.get(key)
+            if decoder is None:
+                if shape is None:
+                    shape = response_shape(query)
+                decoder = _CACHE[key] = _generate(shape, dict_cls, list_cls)
+    return decoder
+
+
+def decode_response(query, body, dict_cls: type = DtoDict, list_cls: type = DtoList):
+    """
+    Decode a raw response body, wrapping `data` with the decoder of `query`.
+    """
+    if isinstance(body, (str, bytes, bytearray)):
+        body = json.loads(body)
+    data = body.get('data')
+    response = DtoDict({k: v for k, v in body.items() if k != 'data'})
+    if 'data' in body:
+        dict.__setitem__(response, 'data',
+                         None if data is None else compile_decoder(query, dict_cls, list_cls)(data))
+    return response
@@ -12,6 +12,7 @@ class Dto:
 
     """
     __slots__ = ()
+    _lazy = False
 
     def __new__(cls, v):
         if isinstance(v, Dto):
@@ -21,14 +22,61 @@ class Dto:
         if isinstance(v, dict):
             if issubclass(cls, dict):
                 return cls(v)
+            if cls._lazy:
+                return LazyDtoDict(v)
             return DtoDict(v)
         if isinstance(v, Iterable):
             if issubclass(cls, list):
                 return cls(v)
+            if cls._lazy:
+                return LazyDtoList(v)
             return DtoList(v)
         return v
 
 
+_DICT_ATTRS = frozenset({
+    'clear', 'copy', 'fromkeys', 'get', 'items', 'keys', 'pop', 'popitem',
+    'setdefault', 'update', 'values'
+})
+_getattribute = dict.__getattribute__
+
+
+def _make_getattribute(key_of, identity: bool = False):
+    """
+    Build the `__getattribute__` of a DtoDict class.
+
+    Reserved names are found with one frozenset lookup. The attribute -> key mapping
+    of `key_of` is memoized, so `_key` must only depend on the attribute name. A
+    class whose `_key` is no longer `key_of`, such as one assigned after the class
+    was created, calls its `_key` every time.
+
+    Args:
+        key_of: The `_key` the function is built for.
+        identity: `key_of` returns the attribute name unchanged.
+    """
+    keys = {}
+
+    def __getattribute__(self, k: str):
+        if k[:1] == '_' or k in _DICT_ATTRS:
+            return _getattribute(self, k)
+        fn = type(self)._key
+        if fn is not key_of:
+            key = fn(self, k)
+        elif identity:
+            key = k
+        else:
+            key = keys.get(k)
+            if key is None:
+                key = keys[k] = key_of(self, k)
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{k}'") from None
+
+    return __getattribute__
+
+
 class DtoDict(dict, Dto):
     """dict-like data transmission object.
 
@@ -97,32 +145,28 @@ class DtoDict(dict, Dto):
         ]
         if k.startswith('_'):
             code = 1
-        elif k in {
-                'clear', 'copy', 'fromkeys', 'get', 'items', 'keys', 'pop',
-                'popitem', 'setdefault', 'update', 'values'
-        }:
+        elif k in _DICT_ATTRS:
             code = 2
         if code > 0 and strict:
             raise AttributeError(f"{msg[code-1]} is read only")
         return code
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # `_key` may come from any class of the MRO, such as a mixin
+        if cls._key is not DtoDict._key and '__getattribute__' not in cls.__dict__:
+            cls.__getattribute__ = _make_getattribute(cls._key)
+
     def __setattr__(self, k: str, v):
-        if DtoDict._is_iattr(k, strict=True):
-            return super().__setattr__(k, v)
-        super().__setitem__(self._key(k), Dto.__new__(self.__class__, v))
+        if k[:1] == '_' or k in _DICT_ATTRS:
+            return DtoDict._is_iattr(k, strict=True)
+        dict.__setitem__(self, self._key(k), Dto.__new__(self.__class__, v))
 
-    def __getattribute__(self, k: str):
-        if DtoDict._is_iattr(k):
-            return super().__getattribute__(k)
-        try:
-            return super().__getitem__(self._key(k))
-        except KeyError:
-            raise AttributeError(
-                f"'{self.__class__.__name__}' object has no attribute '{k}'")
+    __getattribute__ = _make_getattribute(_key, identity=True)
 
     def __delattr__(self, k: str):
-        if DtoDict._is_iattr(k, strict=True):
-            return super().__delattr__(k)
+        if k[:1] == '_' or k in _DICT_ATTRS:
+            return DtoDict._is_iattr(k, strict=True)
         try:
             return super().__delitem__(self._key(k))
         except KeyError:
@@ -167,3 +211,149 @@ class DtoList(list, Dto):
 
     def __add__(self, arr: list):
         return super().__add__(Dto.__new__(self.__class__, arr))
+
+
+def _is_raw(v) -> bool:
+    return isinstance(v, (dict, list, tuple)) and not isinstance(v, Dto)
+
+
+class LazyDtoDict(DtoDict):
+    """DtoDict that wraps its children on first access.
+
+    Construction only makes a shallow copy. A nested dict or list is wrapped the first
+    time it is read through an attribute, an index, `get`, `setdefault`, `values`,
+    `items`, `pop` or `popitem`, and the wrapped object replaces the raw one in place.
+    `copy` and `|` wrap every child first.
+
+    Test:
+        >>> d = LazyDtoDict({'a': {'b': [{'c': 1}]}})
+        >>> dict.__getitem__(d, 'a').__class__.__name__
+        'dict'
+        >>> d.a.b[0].c
+        1
+        >>> dict.__getitem__(d, 'a').__class__.__name__
+        'LazyDtoDict'
+    """
+    __slots__ = ()
+    _lazy = True
+
+    def __init__(self, data: dict = None):
+        if data is None:
+            return dict.__init__(self)
+        if data is self:
+            return
+        if not isinstance(data, dict):
+            raise TypeError(
+                f'expected dict-like, but got {data.__class__.__name__}')
+        dict.__init__(self, data)
+
+    def __getitem__(self, k):
+        v = dict.__getitem__(self, k)
+        if _is_raw(v):
+            v = Dto.__new__(self.__class__, v)
+            dict.__setitem__(self, k, v)
+        return v
+
+    def _wrap_all(self):
+        for k, v in dict.items(self):
+            if _is_raw(v):
+                dict.__setitem__(self, k, Dto.__new__(self.__class__, v))
+
+    def get(self, k, default=None):
+        if k in self:
+            return self[k]
+        return default
+
+    def values(self):
+        self._wrap_all()
+        return dict.values(self)
+
+    def items(self):
+        self._wrap_all()
+        return dict.items(self)
+
+    def pop(self, k, *args):
+        return Dto.__new__(self.__class__, dict.pop(self, k, *args))
+
+    def popitem(self):
+        k, v = dict.popitem(self)
+        return k, Dto.__new__(self.__class__, v)
+
+    def setdefault(self, k, default=None):
+        if k in self:
+            return self[k]
+        v = Dto.__new__(self.__class__, default)
+        dict.__setitem__(self, k, v)
+        return v
+
+    def copy(self) -> dict:
+        self._wrap_all()
+        return dict.copy(self)
+
+    def __or__(self, other):
+        self._wrap_all()
+        return dict.__or__(self, other)
+
+
+class LazyDtoList(DtoList):
+    """DtoList that wraps its items on first access.
+
+    Construction only makes a shallow copy. Items are wrapped in place when read
+    through an index or by iteration, and all of them before they are handed out
+    by `copy`, `reversed`, `sort`, `+` or `*`.
+    """
+    __slots__ = ()
+    _lazy = True
+
+    def __init__(self, it: Iterable = None):
+        if it is None:
+            return list.__init__(self)
+        if it is self:
+            return
+        if isinstance(it, Iterable) and not isinstance(
+                it, dict) and not isinstance(it, str):
+            return list.__init__(self, it)
+        raise TypeError(f'expected list-like, but got {it.__class__.__name__}')
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        v = list.__getitem__(self, i)
+        if _is_raw(v):
+            v = Dto.__new__(self.__class__, v)
+            list.__setitem__(self, i, v)
+        return v
+
+    def _wrap_all(self):
+        for i, v in enumerate(list.__iter__(self)):
+            if _is_raw(v):
+                list.__setitem__(self, i, Dto.__new__(self.__class__, v))
+
+    def __iter__(self):
+        self._wrap_all()
+        return list.__iter__(self)
+
+    def __reversed__(self):
+        self._wrap_all()
+        return list.__reversed__(self)
+
+    def pop(self, i: SupportsIndex = -1):
+        return Dto.__new__(self.__class__, list.pop(self, i))
+
+    def copy(self) -> list:
+        self._wrap_all()
+        return list.copy(self)
+
+    def sort(self, *args, **kwargs):
+        self._wrap_all()
+        list.sort(self, *args, **kwargs)
+
+    def __add__(self, arr: list):
+        self._wrap_all()
+        return super().__add__(arr)
+
+    def __mul__(self, n: SupportsIndex):
+        self._wrap_all()
+        return list.__mul__(self, n)
+
+    __rmul__ = __mul__
@@ -0,0 +1,127 @@
+from typing import (Any, Dict)
+
+from .dto import LazyDtoDict
+
+
+class Model:
+    """Base class of the `__slots__` response classes emitted by the code generator.
+
+    Subclasses declare a slot per schema field. `_fields` maps the response key to the
+    name of the field's composite type, or None for scalars and enums, and `_renames`
+    maps response keys that are python keywords to their slot.
+    Keys without a slot, such as aliases or `__typename`, are kept in `_extra`.
+
+    Nested types are looked up by name in `_registry`. A class defining its own
+    `_registry` starts a new one that its subclasses are registered in, so every
+    generated models.py has its own and models of several API versions do not mix.
+
+    Test:
+        >>> class Shop(Model):
+        ...     __slots__ = ('name', 'primaryDomain')
+        ...     _fields = {'name': None, 'primaryDomain': 'Domain'}
+        >>> class Domain(Model):
+        ...     __slots__ = ('host', )
+        ...     _fields = {'host': None}
+        >>> shop = Shop.from_json({'name': 'x', 'primaryDomain': {'host': 'x.com'}})
+        >>> shop.primaryDomain.host
+        'x.com'
+    """
+    __slots__ = ('_extra', )
+    _fields: Dict[str, Any] = {}
+    _renames: Dict[str, str] = {}
+    _registry: Dict[str, type] = {}
+    _setters = None
+
+    def __new__(cls, *args, **kwargs):
+        # a class attribute cannot default a slot, every instance sets it instead
+        obj = super().__new__(cls)
+        obj._extra = None
+        return obj
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if '_registry' not in cls.__dict__:
+            cls._registry[cls.__name__] = cls
+        cls._setters = None
+
+    @classmethod
+    def _build_setters(cls) -> dict:
+        setters = {}
+        for k, typ in cls._fields.items():
+            attr = cls._renames.get(k, k)
+            for klass in cls.__mro__:
+                if attr in klass.__dict__:
+                    setters[k] = (klass.__dict__[attr].__set__, typ)
+                    break
+        cls._setters = setters
+        return setters
+
+    @classmethod
+    def from_json(cls, data: dict):
+        """
+        Build an instance from a decoded JSON object in one pass.
+        """
+        obj = object.__new__(cls)
+        setters = cls._setters or cls._build_setters()
+        registry = cls._registry
+        extra = None
+        for k, v in data.items():
+            setter = setters.get(k)
+            if setter is None:
+                if extra is None:
+                    extra = {}
+                extra[k] = v
+                continue
+            if setter[1] is not None and v is not None:
+                v = _convert(registry, setter[1], v)
+            setter[0](obj, v)
+        obj._extra = extra
+        return obj
+
+    def __getattr__(self, k: str):
+        # reading an unset slot would come back here
+        try:
+            extra = object.__getattribute__(self, '_extra')
+        except AttributeError:
+            extra = None
+        if extra is not None and k in extra:
+            return extra[k]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{k}'")
+
+    def to_dict(self) -> dict:
+        rst = {}
+        for k in self._fields:
+            attr = self._renames.get(k, k)
+            try:
+                v = getattr(self, attr)
+            except AttributeError:
+                continue
+            rst[k] = _to_json(v)
+        if self._extra:
+            rst.update(self._extra)
+        return rst
+
+    def __eq__(self, other):
+        if isinstance(other, Model):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def _convert(registry: Dict[str, type], typ: str, v):
+    if isinstance(v, list):
+        return [None if x is None else _convert(registry, typ, x) for x in v]
+    cls = registry.get(v.get('__typename')) or registry.get(typ)
+    if cls is None:
+        return LazyDtoDict(v)
+    return cls.from_json(v)
+
+
+def _to_json(v):
+    if isinstance(v, Model):
+        return v.to_dict()
+    if isinstance(v, list):
+        return [_to_json(x) for x in v]
+    return v
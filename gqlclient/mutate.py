@@ -0,0 +1,213 @@
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Any, Callable, Iterable, Iterator, List, Tuple)
+
+from .client import decode_body
+from .core import _GQLConfig, alias_configs, parse_gql_config, parse_gql_param, split_aliased
+from .cost import estimate_cost
+
+# (index, item, config) of the items of one chunk
+Chunk = List[Tuple[int, Any, _GQLConfig]]
+
+
+class MutationResult:
+    """Outcome of one item of a bulk mutation.
+
+    Attributes:
+        index: Position of the item in the input.
+        item: The input item.
+        data: The payload the mutation field returned for the item, if any.
+        errors: GraphQL or transport errors of the request of the item.
+        user_errors: `userErrors` of the payload that concern the item.
+    """
+    __slots__ = ('index', 'item', 'data', 'errors', 'user_errors')
+
+    def __init__(self, index: int, item, data=None, errors: list = None, user_errors: list = None) -> None:
+        self.index = index
+        self.item = item
+        self.data = data
+        self.errors = errors or []
+        self.user_errors = user_errors or []
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.user_errors
+
+    def __repr__(self) -> str:
+        return f'MutationResult(index={self.index}, ok={self.ok})'
+
+
+def _field(config: _GQLConfig) -> str:
+    """
+    The response key of the only root field of a mutation config.
+    """
+    keys = [k for k in config._data if k[0] not in '$@']
+    if len(keys) != 1:
+        raise ValueError(f'a bulk mutation must select exactly one root field, not {keys}')
+    return keys[0].split(':')[0].strip()
+
+
+def _user_errors(payload) -> list:
+    if isinstance(payload, dict):
+        return list(payload.get('userErrors') or ())
+    return []
+
+
+def _aliased_size(config: _GQLConfig, max_items: int) -> int:
+    """
+    Upper bound of the size of the root field of a config once aliased by `alias_configs`.
+    """
+    return len(parse_gql_config(config)) + len(_field(config)) + len(str(max_items)) + 2
+
+
+def _pack(sized: Iterable[Tuple[Any, int, int]], max_cost: int, max_bytes: int, max_items: int) -> Iterator[list]:
+    """
+    Group `(entry, cost, size)` in order into chunks within every budget.
+
+    An entry over a budget on its own is a chunk of its own.
+    """
+    chunk, cost, size = [], 0, 0
+    for entry, c, b in sized:
+        if chunk and (cost + c > max_cost or (max_bytes and size + b > max_bytes) or len(chunk) >= max_items):
+            yield chunk
+            chunk, cost, size = [], 0, 0
+        chunk.append(entry)
+        cost += c
+        size += b
+    if chunk:
+        yield chunk
+
+
+def _pipeline(send: Callable[[Any], List[MutationResult]], chunks: Iterator[Any],
+              concurrency: int) -> Iterator[MutationResult]:
+    """
+    Send chunks with at most `concurrency` in flight and yield their results in order.
+    """
+    window = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for chunk in chunks:
+            window.append(executor.submit(send, chunk))
+            if len(window) >= concurrency:
+                yield from window.popleft().result()
+        while window:
+            yield from window.popleft().result()
+
+
+def _response(client, config: _GQLConfig) -> dict:
+    body = client.send(client.payload(config))
+    if not isinstance(body, dict):
+        body = json.loads(body)
+    return body
+
+
+def bulk_mutate(
+    client,
+    items: Iterable[Any],
+    build: Callable[[Any], _GQLConfig],
+    max_cost: int = 1000,
+    max_bytes: int = None,
+    max_items: int = 250,
+    concurrency: int = None,
+) -> Iterator[MutationResult]:
+    """
+    Send one mutation per item, packed under aliases into as few requests as fit.
+
+    Items are packed in order while the estimated cost, and the document size,
+    of a request stay within budget. Requests are pipelined over the pool of the
+    client, and results are yielded in the order of the items.
+
+    Args:
+        client: A `GQLClient`.
+        items: The items, such as input configs.
+        build: Returns the `Mutation` root config of an item, selecting one field,
+            such as `productUpdate` with its `userErrors`.
+        max_cost: The cost budget of one request.
+        max_bytes: Optional budget of the document size of one request, without hoisting.
+        max_items: The maximum number of mutations of one request.
+        concurrency: The maximum number of requests in flight, the pool size by default.
+
+    Example:
+        def build(product):
+            mu = Mutation()
+            mu.productUpdate(payload, input=product)
+            return mu
+        failed = [x for x in bulk_mutate(client, products, build) if not x.ok]
+    """
+    def sized():
+        for i, item in enumerate(items):
+            config = build(item)
+            yield (i, item, config), estimate_cost(config, client.schema), _aliased_size(config, max_items)
+
+    def send(chunk: Chunk) -> List[MutationResult]:
+        try:
+            root, aliases = alias_configs([config for _, _, config in chunk])
+            parts = split_aliased(_response(client, root), aliases)
+        except Exception as e:
+            return [MutationResult(i, item, errors=[{'message': str(e)}]) for i, item, _ in chunk]
+        rst = []
+        for (i, item, config), part in zip(chunk, parts):
+            response = decode_body(config, part)
+            data = (response.get('data') or {}).get(_field(config))
+            rst.append(MutationResult(i, item, data, list(response.get('errors') or ()), _user_errors(data)))
+        return rst
+
+    concurrency = concurrency or client.pool.size
+    if max_bytes:
+        max_bytes -= len('mutation{}')
+    yield from _pipeline(send, _pack(sized(), max_cost, max_bytes, max_items), concurrency)
+
+
+def bulk_mutate_list(
+    client,
+    items: Iterable[Any],
+    build: Callable[[list], _GQLConfig],
+    arg: str,
+    max_items: int = 250,
+    max_bytes: int = None,
+    concurrency: int = None,
+) -> Iterator[MutationResult]:
+    """
+    Send items through a mutation taking them as one list argument, in chunks.
+
+    Every chunk is one request whose `arg` argument holds at most `max_items` items.
+    `userErrors` whose `field` points into the list, such as `['moves', '3', 'id']`,
+    are reported for that item, other `userErrors` for every item of the chunk.
+
+    Args:
+        client: A `GQLClient`.
+        items: The list items, such as `MoveInput` configs.
+        build: Returns the `Mutation` root config sending a list of items as `arg`,
+            such as `collectionReorderProducts` with `moves`.
+        arg: The name of the list argument, used to match `userErrors`.
+        max_items: The maximum length of the list of one request.
+        max_bytes: Optional budget of the serialized list of one request.
+        concurrency: The maximum number of requests in flight, the pool size by default.
+    """
+    def sized():
+        for i, item in enumerate(items):
+            yield (i, item), 0, len(parse_gql_param(item)) + 1
+
+    def send(chunk: list) -> List[MutationResult]:
+        try:
+            config = build([item for _, item in chunk])
+            response = decode_body(config, _response(client, config))
+        except Exception as e:
+            return [MutationResult(i, item, errors=[{'message': str(e)}]) for i, item in chunk]
+        data = (response.get('data') or {}).get(_field(config))
+        errors = list(response.get('errors') or ())
+        shared = []
+        by_item = {}
+        for error in _user_errors(data):
+            field = error.get('field') or ()
+            if len(field) > 1 and field[0] == arg and str(field[1]).isdigit() and int(field[1]) < len(chunk):
+                by_item.setdefault(int(field[1]), []).append(error)
+            else:
+                shared.append(error)
+        return [
+            MutationResult(i, item, data, errors, shared + by_item.get(n, []))
+            for n, (i, item) in enumerate(chunk)
+        ]
+
+    concurrency = concurrency or client.pool.size
+    yield from _pipeline(send, _pack(sized(), 0, max_bytes, max_items), concurrency)
@@ -0,0 +1,135 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Any, AsyncIterator, Iterator, List, Tuple)
+
+from .client import decode_body
+from .core import _GQLConfig
+from .transport import GQLError
+
+
+def _copy(config: _GQLConfig) -> _GQLConfig:
+    """
+    Shallow copy of a config, its fragments are copied too so fields can be replaced.
+    """
+    new = type(config)()
+    new._data = {k: dict(v) if k.startswith('... on ') else v for k, v in config._data.items()}
+    new._adopt(new._data)
+    return new
+
+
+def _connection(query: _GQLConfig, path: str, page_size: int = None) -> Tuple[_GQLConfig, _GQLConfig, List[str]]:
+    """
+    Copy the configs from `query` down to the connection at the dotted `path`.
+
+    Returns the copied root, the copied connection and the response keys. Subtrees
+    off the path are shared, `query` itself is never changed.
+    """
+    root = node = _copy(query)
+    keys = []
+    for name in path.split('.'):
+        key = node._key(name)
+        ctx = node._get_ctx(key)
+        child = ctx.get(key)
+        if not isinstance(child, _GQLConfig):
+            raise ValueError(f'{path!r} does not select a connection, {name!r} is not a field config')
+        child = ctx[key] = _copy(child)
+        node._adopt(child)
+        node = child
+        keys.append(key)
+    if not ('edges' in node._data or 'nodes' in node._data):
+        raise ValueError(f'connection {path!r} selects neither edges nor nodes')
+    page = node._data.get('pageInfo')
+    page = _copy(page) if isinstance(page, _GQLConfig) else _GQLConfig()
+    for field in ('hasNextPage', 'endCursor'):
+        page._data.setdefault(field, '')
+    node._data['pageInfo'] = page
+    if page_size:
+        node._data['$first'] = page_size
+    node._adopt(page)
+    return root, node, keys
+
+
+def _set_after(conn: _GQLConfig, cursor: str):
+    conn._data['$after'] = json.dumps(cursor)
+    conn._invalidate()
+
+
+def _page(response, keys: List[str]) -> Tuple[list, Any]:
+    """
+    Return the nodes of one page and the cursor of the next page, None on the last page.
+    """
+    if response.get('errors'):
+        raise GQLError(response['errors'])
+    conn = response.get('data')
+    for key in keys:
+        if conn is None:
+            return [], None
+        conn = conn.get(key)
+    if conn is None:
+        return [], None
+    if conn.get('edges') is not None:
+        nodes = [edge['node'] for edge in conn['edges']]
+    else:
+        nodes = conn.get('nodes') or []
+    page = conn['pageInfo']
+    return nodes, page['endCursor'] if page['hasNextPage'] else None
+
+
+def paginate(client, query: _GQLConfig, path: str, page_size: int = None) -> Iterator[Any]:
+    """
+    Walk a Relay connection page by page and yield its nodes.
+
+    The `after` argument of the connection is set from `pageInfo.endCursor` of the
+    previous page. The next page is requested as soon as a page arrives, while its
+    nodes are being consumed. `pageInfo { hasNextPage endCursor }` is added to the
+    selection when missing. Pages are requested through a copy of the configs down
+    to the connection, so `query` is left as it is and can be paginated concurrently.
+
+    Args:
+        client: A `GQLClient`.
+        query: A root config selecting the connection, with `edges { node }` or `nodes`.
+        path: The dotted path of the connection field, such as `collection.products`.
+        page_size: Sets the `first` argument of the connection.
+
+    Example:
+        products = ProductConnection()
+        products.edges.node.title = ''
+        query = QueryRoot()
+        query.products(products, first=250)
+        for product in paginate(client, query, 'products'):
+            ...
+    """
+    query, conn, keys = _connection(query, path, page_size)
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        future = executor.submit(client.send, client.payload(query))
+        while future is not None:
+            nodes, cursor = _page(decode_body(query, future.result()), keys)
+            future = None
+            if cursor is not None:
+                _set_after(conn, cursor)
+                future = executor.submit(client.send, client.payload(query))
+            yield from nodes
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def apaginate(client, query: _GQLConfig, path: str, page_size: int = None) -> AsyncIterator[Any]:
+    """
+    `paginate` with an `AsyncGQLClient`, the next page is fetched by a task.
+    """
+    query, conn, keys = _connection(query, path, page_size)
+    task = asyncio.ensure_future(client.send(client.payload(query)))
+    try:
+        while task is not None:
+            nodes, cursor = _page(decode_body(query, await task), keys)
+            task = None
+            if cursor is not None:
+                _set_after(conn, cursor)
+                task = asyncio.ensure_future(client.send(client.payload(query)))
+            for node in nodes:
+                yield node
+    finally:
+        if task is not None:
+            task.cancel()
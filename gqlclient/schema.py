@@ -0,0 +1,58 @@
+import json
+from typing import (Dict, Any, Iterable, Tuple)
+
+# type name -> field name -> (type reference, argument name -> type reference)
+SchemaIndex = Dict[str, Dict[str, Tuple[str, Dict[str, str]]]]
+
+
+def type_ref(data: Dict[str, Any]) -> str:
+    """
+    Render an introspection type reference in GraphQL notation, such as `[ID!]!`.
+    """
+    kind = data['kind']
+    if kind == 'NON_NULL':
+        return f"{type_ref(data['ofType'])}!"
+    if kind == 'LIST':
+        return f"[{type_ref(data['ofType'])}]"
+    return data['name']
+
+
+def base_type(ref: str) -> str:
+    """
+    Strip list and non-null wrappers from a type reference.
+
+    Test:
+        >>> base_type('[MoveInput!]!')
+        'MoveInput'
+    """
+    return ref.strip('[]!')
+
+
+def index_type(data: Dict[str, Any]) -> Dict[str, Tuple[str, Dict[str, str]]]:
+    fields = {}
+    for field in data.get('fields') or []:
+        args = {x['name']: type_ref(x['type']) for x in field.get('args') or []}
+        fields[field['name']] = (type_ref(field['type']), args)
+    for field in data.get('inputFields') or []:
+        fields[field['name']] = (type_ref(field['type']), {})
+    return fields
+
+
+def build_schema_index(types: Iterable[Dict[str, Any]]) -> SchemaIndex:
+    """
+    Build a compact index from the `__schema.types` items of an introspection result.
+    """
+    index = {}
+    for typ in types:
+        if typ['name'].startswith('__'):
+            continue
+        index[typ['name']] = index_type(typ)
+    return index
+
+
+def load_schema_index(path: str) -> SchemaIndex:
+    with open(path, 'r', encoding='utf8') as fi:
+        data = json.load(fi)
+    if 'data' in data:
+        data = data['data']
+    return build_schema_index(data['__schema']['types'])
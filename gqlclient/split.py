@@ -0,0 +1,232 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Any, Callable, Dict, List)
+
+from .client import decode_body, operation_of
+from .core import _GQLConfig, parse_gql_config
+from .cost import _children, estimate_cost
+from .dto import DtoDict
+
+Fits = Callable[[dict], bool]
+
+# the alias of the `id` every part of a split connection selects, see `merge_data`
+ID_ALIAS = '_splitId'
+_ID = {f'{ID_ALIAS}:id': ''}
+# field name -> the selection added to every part of the field
+_IDENTITY = {'nodes': _ID, 'node': _ID, 'edges': {'node': _ID}}
+
+
+def _nest(key: str, args: dict, piece: dict) -> dict:
+    return {key: {**args, **piece}}
+
+
+def _keep(piece: dict, keep: dict) -> dict:
+    """
+    Add the selection `keep` to a piece, without changing the configs it holds.
+    """
+    rst = dict(piece)
+    for k, v in keep.items():
+        if k not in rst:
+            rst[k] = _keep({}, v) if v else v
+        elif v:
+            sub = rst[k]._data if isinstance(rst[k], _GQLConfig) else rst[k]
+            if isinstance(sub, dict):
+                rst[k] = _keep(sub, v)
+    return rst
+
+
+def _partition(selection: dict, fits: Fits) -> List[dict]:
+    """
+    Pack the fields of a selection in order into pieces accepted by `fits`.
+
+    A field too large on its own is split into copies of itself, with the same
+    arguments, each selecting a part of its sub-selection. A leaf too large on its
+    own is kept as a piece of its own.
+    """
+    pieces = []
+    current = {}
+    for k, v in selection.items():
+        if k[0] in '$@':
+            continue
+        candidate = {**current, k: v}
+        if fits(candidate):
+            current = candidate
+            continue
+        children = _children(v)
+        if children is None or fits({k: v}):
+            if current:
+                pieces.append(current)
+            current = {k: v}
+            continue
+        args = {x: y for x, y in children.items() if x[0] in '$@'}
+        keep = _IDENTITY.get(k.rpartition(':')[2].strip())
+
+        def nest(piece: dict) -> dict:
+            return _nest(k, args, _keep(piece, keep) if keep else piece)
+
+        parts = [nest(x) for x in _partition(children, lambda piece: fits(nest(piece)))]
+        if current and fits({**current, **parts[0]}):
+            current.update(parts[0])
+        else:
+            if current:
+                pieces.append(current)
+            current = parts[0]
+        for part in parts[1:]:
+            pieces.append(current)
+            current = part
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_config(
+    config: _GQLConfig,
+    max_cost: int = 1000,
+    schema: dict = None,
+    root: str = None,
+    variables: Dict[str, Any] = None,
+    max_length: int = None,
+) -> List[_GQLConfig]:
+    """
+    Split a root config into queries whose estimated cost is at most `max_cost`.
+
+    Fields are packed in order, fields too expensive on their own are split by their
+    sub-selection, so connections are requested once per part of their node
+    selection with the same arguments. Every part of a connection also selects the
+    `id` of its nodes, aliased `ID_ALIAS`, so the responses of the parts merge back
+    into the response of the whole config, see `merge_data`.
+
+    Args:
+        config: A query root config.
+        max_cost: The cost limit of one query, see `gqlclient.cost.estimate_cost`.
+        schema: Optional schema index.
+        root: Type name of the root config, defaults to its class name.
+        variables: Values of variables used as page sizes.
+        max_length: Optional limit of the length of one document.
+
+    Test:
+        >>> q = _GQLConfig()
+        >>> q.shop.name = ''
+        >>> q.products(q.products, first=10)
+        >>> q.products.edges.node.title = ''
+        >>> q.products.edges.node.options.name = ''
+        >>> for part in split_config(q, max_cost=15):
+        ...     print(parse_gql_config(part))
+        {shop {name } products (first:10){edges {node {title  _splitId:id }}}}
+        {products (first:10){edges {node {options {name } _splitId:id }}}}
+    """
+    if operation_of(config) != 'query':
+        raise ValueError(f'only queries can be split, not {type(config).__name__}')
+    root = root or type(config).__name__
+
+    def fits(selection: dict) -> bool:
+        if estimate_cost(selection, schema, root, variables) > max_cost:
+            return False
+        return max_length is None or len(parse_gql_config(selection)) <= max_length
+
+    rst = []
+    for piece in _partition(config._data, fits):
+        part = type(config)()
+        part._data = piece
+        part._adopt(piece)
+        rst.append(part)
+    return rst
+
+
+def _item_id(v):
+    if not isinstance(v, dict):
+        return None
+    node = v.get('node')
+    if isinstance(node, dict) and ID_ALIAS in node:
+        return node[ID_ALIAS]
+    return v.get(ID_ALIAS)
+
+
+def merge_data(a, b):
+    """
+    Deep merge the data of `b` into the data of `a` and return `a`.
+
+    Items of lists are merged by their `ID_ALIAS` id, or that of their `node`,
+    and by position when they have none.
+
+    Raises:
+        ValueError: The lists hold different numbers of items or other nodes,
+            the data changed between the requests of the parts.
+    """
+    if isinstance(a, dict) and isinstance(b, dict):
+        for k, v in b.items():
+            a[k] = merge_data(a[k], v) if k in a else v
+    elif isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            raise ValueError(f'parts of a split query returned {len(a)} and {len(b)} items of a list')
+        ids = [_item_id(x) for x in b]
+        if None in ids:
+            for i, v in enumerate(b):
+                a[i] = merge_data(a[i], v)
+            return a
+        items = dict(zip(ids, b))
+        for i, v in enumerate(a):
+            key = _item_id(v)
+            if key not in items:
+                raise ValueError(f'parts of a split query returned other nodes, {key!r} is missing from one')
+            a[i] = merge_data(v, items[key])
+    return a
+
+
+def _drop_ids(data):
+    stack = [data]
+    while stack:
+        v = stack.pop()
+        if isinstance(v, dict):
+            v.pop(ID_ALIAS, None)
+            stack.extend(v.values())
+        elif isinstance(v, list):
+            stack.extend(v)
+    return data
+
+
+def merge_responses(query: _GQLConfig, responses: List[Any]) -> DtoDict:
+    """
+    Merge the responses of the parts of a split query into the response of `query`.
+
+    Errors of every part are kept, extensions are not merged. The ids the parts
+    select to be merged are left out.
+    """
+    data = None
+    errors = []
+    for response in responses:
+        if not isinstance(response, dict):
+            response = json.loads(response)
+        errors.extend(response.get('errors') or ())
+        if response.get('data') is not None:
+            data = response['data'] if data is None else merge_data(data, response['data'])
+    body = {'data': data if data is None else _drop_ids(data)}
+    if errors:
+        body['errors'] = errors
+    return decode_body(query, body)
+
+
+def execute_split(client, query: _GQLConfig, max_cost: int = 1000, variables: dict = None,
+                  max_length: int = None) -> DtoDict:
+    """
+    Execute a query split by cost with a `GQLClient`, sending the parts in parallel.
+
+    Returns the merged response, looking like the response of the unsplit query.
+    """
+    parts = split_config(query, max_cost, client.schema, variables=variables, max_length=max_length)
+    payloads = [client.payload(x, variables) for x in parts]
+    if len(payloads) == 1:
+        return merge_responses(query, [client.send(payloads[0])])
+    with ThreadPoolExecutor(max_workers=min(len(payloads), client.pool.size)) as executor:
+        return merge_responses(query, list(executor.map(client.send, payloads)))
+
+
+async def aexecute_split(client, query: _GQLConfig, max_cost: int = 1000, variables: dict = None,
+                         max_length: int = None) -> DtoDict:
+    """
+    `execute_split` with an `AsyncGQLClient`.
+    """
+    parts = split_config(query, max_cost, client.schema, variables=variables, max_length=max_length)
+    responses = await asyncio.gather(*(client.send(client.payload(x, variables)) for x in parts))
+    return merge_responses(query, responses)
@@ -0,0 +1,324 @@
+import asyncio
+import heapq
+import itertools
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import (Awaitable, Callable, Dict, Tuple)
+
+from .transport import Post
+
+THROTTLED = 'THROTTLED'
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+
+def cost_key(document: str) -> str:
+    """
+    The key the cost of a document is learned under.
+
+    String literals, such as cursors, ids and search queries, are blanked, since
+    they do not change the requested cost, while numbers such as `first` do.
+
+    Test:
+        >>> cost_key('{products (first:10,after:"YXJyYXk="){edges {cursor }}}')
+        '{products (first:10,after:""){edges {cursor }}}'
+    """
+    return _STRING.sub('""', document)
+
+
+def is_throttled(response: dict) -> bool:
+    """
+    Whether the server rejected the query because the cost bucket was empty.
+    """
+    for error in response.get('errors') or ():
+        if (error.get('extensions') or {}).get('code') == THROTTLED:
+            return True
+    return False
+
+
+class _AsyncWaiter:
+    """
+    Wakes a coroutine waiting in `CostBucket.acquire_async` from any thread.
+    """
+    __slots__ = ('loop', 'future')
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.future = None
+
+    def arm(self) -> asyncio.Future:
+        self.future = self.loop.create_future()
+        return self.future
+
+    def _set(self):
+        if self.future is not None and not self.future.done():
+            self.future.set_result(None)
+
+    def wake(self):
+        try:
+            self.loop.call_soon_threadsafe(self._set)
+        except RuntimeError:
+            # the loop is closed, nobody is waiting any more
+            pass
+
+
+class CostBucket:
+    """Local model of the leaky bucket of query cost of one shop.
+
+    Every query reserves its requested cost before it is sent, waiting until the
+    bucket holds enough. The model is corrected from `extensions.cost` of every
+    response, so workers sharing a bucket never send a query the server would
+    throttle.
+
+    Waiting queries are started by the earliest `arrival + cost / restore_rate`,
+    cheap queries may pass expensive ones that would wait anyway, and every query
+    is started eventually. Threads wait in `acquire` and coroutines in
+    `acquire_async`, in the same queue.
+
+    Args:
+        maximum: The size of the bucket, replaced by `maximumAvailable` of responses.
+        restore_rate: The cost restored per second, replaced by `restoreRate`.
+        default_cost: The cost reserved for a document never sent before.
+        max_costs: How many learned costs are kept, the least recently used go first.
+
+    Test:
+        >>> bucket = CostBucket(maximum=100, restore_rate=50)
+        >>> bucket.acquire(80)
+        80
+        >>> bucket.release(80, {'requestedQueryCost': 80, 'actualQueryCost': 30,
+        ...     'throttleStatus': {'maximumAvailable': 100.0, 'currentlyAvailable': 70, 'restoreRate': 50.0}})
+        >>> round(bucket.available)
+        70
+    """
+    def __init__(
+        self,
+        maximum: float = 1000.0,
+        restore_rate: float = 50.0,
+        default_cost: float = 100.0,
+        clock: Callable[[], float] = time.monotonic,
+        max_costs: int = 1024,
+    ) -> None:
+        self.maximum = maximum
+        self.restore_rate = restore_rate
+        self.default_cost = default_cost
+        self.max_costs = max_costs
+        # cost_key(document) -> requested cost
+        self.costs: Dict[str, float] = OrderedDict()
+        self._clock = clock
+        self._available = maximum
+        self._stamp = clock()
+        self._in_flight = 0.0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _notify(self):
+        self._cond.notify_all()
+        if self._waiters:
+            waiter = self._waiters[0][3]
+            if waiter is not None:
+                waiter.wake()
+
+    def _refill(self, now: float):
+        self._available = min(self.maximum, self._available + (now - self._stamp) * self.restore_rate)
+        self._stamp = now
+
+    @property
+    def available(self) -> float:
+        with self._cond:
+            self._refill(self._clock())
+            return self._available
+
+    def cost_of(self, document: str) -> float:
+        key = cost_key(document)
+        with self._cond:
+            cost = self.costs.get(key)
+            if cost is None:
+                return self.default_cost
+            self.costs.move_to_end(key)
+            return cost
+
+    def knows(self, document: str) -> bool:
+        return cost_key(document) in self.costs
+
+    def learn(self, document: str, cost: float):
+        """
+        Remember the cost of a document, and of every document of the same `cost_key`.
+        """
+        key = cost_key(document)
+        with self._cond:
+            self.costs[key] = cost
+            self.costs.move_to_end(key)
+            while len(self.costs) > self.max_costs:
+                self.costs.popitem(last=False)
+
+    def acquire(self, cost: float, timeout: float = None) -> float:
+        """
+        Reserve `cost`, blocking until the bucket holds it. Returns the reserved cost.
+        """
+        with self._cond:
+            now = self._clock()
+            cost = min(cost, self.maximum)
+            deadline = None if timeout is None else now + timeout
+            entry = (now + cost / self.restore_rate, next(self._seq), cost, None)
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    ok, wait = self._try_take(entry, deadline, timeout)
+                    if ok:
+                        return cost
+                    self._cond.wait(wait)
+            except BaseException:
+                self._abandon(entry)
+                raise
+
+    async def acquire_async(self, cost: float, timeout: float = None) -> float:
+        """
+        `acquire` from a coroutine, waiting on the event loop instead of blocking it.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = _AsyncWaiter(loop)
+        with self._cond:
+            now = self._clock()
+            cost = min(cost, self.maximum)
+            deadline = None if timeout is None else now + timeout
+            entry = (now + cost / self.restore_rate, next(self._seq), cost, waiter)
+            heapq.heappush(self._waiters, entry)
+        try:
+            while True:
+                with self._cond:
+                    ok, wait = self._try_take(entry, deadline, timeout)
+                    if ok:
+                        return cost
+                    # armed under the lock, so a wake up from now on is not missed
+                    future = waiter.arm()
+                handle = None if wait is None else loop.call_later(wait, waiter._set)
+                try:
+                    await future
+                finally:
+                    if handle is not None:
+                        handle.cancel()
+        except BaseException:
+            with self._cond:
+                self._abandon(entry)
+            raise
+
+    def _try_take(self, entry: tuple, deadline: float, timeout: float) -> Tuple[bool, float]:
+        """
+        Take the cost of `entry` when it is due, else return how long to wait at most.
+        """
+        now = self._clock()
+        self._refill(now)
+        cost = entry[2]
+        head = self._waiters[0] is entry
+        if head and self._available >= cost:
+            heapq.heappop(self._waiters)
+            self._available -= cost
+            self._in_flight += cost
+            self._notify()
+            return True, None
+        wait = (cost - self._available) / self.restore_rate if head else None
+        if deadline is not None:
+            if now >= deadline:
+                raise TimeoutError(f'cost {cost} not available within {timeout}s')
+            wait = deadline - now if wait is None else min(wait, deadline - now)
+        return False, wait
+
+    def _abandon(self, entry: tuple):
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+            self._notify()
+
+    def release(self, reserved: float, cost: dict = None, document: str = None):
+        """
+        Finish a query that reserved `reserved`, with the `extensions.cost` of its response.
+
+        The unused part of the reservation is given back, then the model is lowered
+        to the server's `currentlyAvailable` less the cost still reserved by queries
+        in flight. Responses arrive out of order, so a higher `currentlyAvailable`
+        may be stale and is not trusted.
+        """
+        with self._cond:
+            self._in_flight = max(0.0, self._in_flight - reserved)
+            now = self._clock()
+            self._refill(now)
+            cost = cost or {}
+            status = cost.get('throttleStatus')
+            if document is not None and cost.get('requestedQueryCost') is not None:
+                self.learn(document, cost['requestedQueryCost'])
+            if status:
+                self.maximum = status.get('maximumAvailable', self.maximum)
+                self.restore_rate = status.get('restoreRate', self.restore_rate)
+            if cost:
+                # a throttled query reports no actual cost, nothing was spent
+                actual = cost.get('actualQueryCost') or 0
+                self._available = min(self.maximum, self._available + reserved - actual)
+            if status:
+                self._available = min(self._available, status['currentlyAvailable'] - self._in_flight)
+            self._notify()
+
+
+class ThrottleScheduler:
+    """One `CostBucket` per shop, shared by every client of the shop.
+
+    Example:
+        scheduler = ThrottleScheduler()
+        client = GQLClient(url, throttle=scheduler.bucket('example.myshopify.com'))
+    """
+    def __init__(self, maximum: float = 1000.0, restore_rate: float = 50.0, default_cost: float = 100.0) -> None:
+        self.maximum = maximum
+        self.restore_rate = restore_rate
+        self.default_cost = default_cost
+        self._buckets: Dict[str, CostBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, shop: str) -> CostBucket:
+        bucket = self._buckets.get(shop)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(shop)
+                if bucket is None:
+                    bucket = self._buckets[shop] = CostBucket(self.maximum, self.restore_rate, self.default_cost)
+        return bucket
+
+
+def send_throttled(bucket: CostBucket, post: Post, payload: dict, retries: int = 3) -> dict:
+    """
+    Send a payload once `bucket` holds its cost, and return the decoded response.
+
+    A query throttled anyway, such as by another process of the shop, is sent again
+    up to `retries` times once its requested cost is available.
+    """
+    document = payload.get('query', '')
+    for attempt in range(retries + 1):
+        reserved = bucket.acquire(bucket.cost_of(document))
+        try:
+            response = post(payload)
+        except BaseException:
+            bucket.release(reserved)
+            raise
+        bucket.release(reserved, (response.get('extensions') or {}).get('cost'), document)
+        if attempt == retries or not is_throttled(response):
+            return response
+    return response
+
+
+async def send_throttled_async(bucket: CostBucket, post: Callable[[dict], Awaitable[dict]], payload: dict,
+                               retries: int = 3) -> dict:
+    """
+    `send_throttled` with a coroutine `post`.
+    """
+    document = payload.get('query', '')
+    for attempt in range(retries + 1):
+        reserved = await bucket.acquire_async(bucket.cost_of(document))
+        try:
+            response = await post(payload)
+        except BaseException:
+            bucket.release(reserved)
+            raise
+        bucket.release(reserved, (response.get('extensions') or {}).get('cost'), document)
+        if attempt == retries or not is_throttled(response):
+            return response
+    return response
@@ -0,0 +1,230 @@
+import http.client
+import json
+import queue
+import threading
+import urllib.parse
+import urllib.request
+from typing import (Any, Callable, Dict, Iterator, List, Tuple)
+
+from .dto import LazyDtoDict
+
+Post = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class GQLError(Exception):
+    """Raised when a GraphQL response reports errors."""
+    def __init__(self, errors: List[dict]) -> None:
+        super().__init__('; '.join(str(x.get('message', x)) for x in errors))
+        self.errors = errors
+
+
+class TransportError(Exception):
+    """Raised when the server answers with a non 2xx status."""
+    def __init__(self, status: int, body: bytes) -> None:
+        super().__init__(f'HTTP {status}: {body[:200]!r}')
+        self.status = status
+        self.body = body
+
+
+def _request(url: str, payload: dict, headers: dict = None) -> urllib.request.Request:
+    return urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode('utf8'),
+        headers={
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            **(headers or {}),
+        },
+        method='POST',
+    )
+
+
+def post_json(url: str, payload: dict, headers: dict = None, timeout: float = None) -> dict:
+    """
+    POST a GraphQL payload as JSON and return the decoded response body.
+    """
+    request = _request(url, payload, headers)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def urllib_post(url: str, headers: dict = None, timeout: float = None) -> Post:
+    """
+    Bind `post_json` to an endpoint.
+    """
+    return lambda payload: post_json(url, payload, headers, timeout)
+
+
+def iter_items(fp, path: str, map_type: type = LazyDtoDict) -> Iterator[Any]:
+    """
+    Incrementally parse a response body and yield the values at `path` as they arrive.
+
+    Requires `ijson`. Only one item is held in memory at a time. Errors of the
+    response are raised as `GQLError` after the last item.
+
+    Args:
+        fp: A binary file-like object, such as an HTTP response.
+        path: An ijson prefix, such as `data.products.edges.item.node`.
+        map_type: The dict class objects are built as.
+    """
+    import ijson
+    errors = []
+    events = ijson.parse(fp, use_float=True)
+    for prefix, event, value in events:
+        if prefix == path:
+            target = None
+        elif prefix == 'errors.item':
+            target = errors
+        else:
+            continue
+        if event in ('start_map', 'start_array'):
+            value = _build_value(events, event, value, map_type)
+        elif event in ('end_map', 'end_array', 'map_key'):
+            continue
+        if target is None:
+            yield value
+        else:
+            target.append(value)
+    if errors:
+        raise GQLError(errors)
+
+
+def _build_value(events, event: str, value, map_type):
+    from ijson.common import ObjectBuilder
+    builder = ObjectBuilder(map_type=map_type)
+    depth = 0
+    while True:
+        builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+            if depth == 0:
+                return builder.value
+        _, event, value = next(events)
+
+
+def stream_json(
+    url: str,
+    payload: dict,
+    path: str,
+    headers: dict = None,
+    timeout: float = None,
+    map_type: type = LazyDtoDict,
+) -> Iterator[Any]:
+    """
+    POST a GraphQL payload and stream the values at `path` out of the response.
+    """
+    request = _request(url, payload, headers)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        yield from iter_items(response, path, map_type)
+
+
+# errors of a kept alive connection that the server already closed
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive HTTP connections to one endpoint.
+
+    At most `size` connections are open at the same time, callers block for up to
+    `pool_timeout` seconds when all of them are busy.
+
+    Args:
+        url: The endpoint, http or https.
+        size: The maximum number of connections.
+        timeout: Socket timeout of connecting and reading, in seconds.
+        pool_timeout: How long to wait for a free connection, None waits forever.
+    """
+    def __init__(
+        self,
+        url: str,
+        size: int = 10,
+        timeout: float = 30.0,
+        pool_timeout: float = None,
+    ) -> None:
+        parts = urllib.parse.urlsplit(url)
+        self.url = url
+        self.size = size
+        self.timeout = timeout
+        self.pool_timeout = pool_timeout
+        self.path = parts.path or '/'
+        if parts.query:
+            self.path += f'?{parts.query}'
+        if parts.scheme == 'https':
+            self._connection_cls = http.client.HTTPSConnection
+        else:
+            self._connection_cls = http.client.HTTPConnection
+        self._host = parts.hostname
+        self._port = parts.port
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self) -> http.client.HTTPConnection:
+        return self._acquire()[0]
+
+    def _acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """
+        Take a connection and whether it was kept alive from an earlier request.
+        """
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            raise TimeoutError(f'no free connection to {self.url} within {self.pool_timeout}s')
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._connection_cls(self._host, self._port, timeout=self.timeout), False
+
+    def release(self, conn: http.client.HTTPConnection, reuse: bool = True):
+        if reuse:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def _send(self, conn, body: bytes, headers: dict) -> http.client.HTTPResponse:
+        conn.request('POST', self.path, body, headers)
+        return conn.getresponse()
+
+    def request(self, body: bytes, headers: dict) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """
+        Send a POST and return the connection together with its unread response.
+
+        The connection must be given back through `release` once the response is read.
+        A connection the server closed while idle is replaced once. A fresh connection
+        is never retried, the server may have processed the request already.
+        """
+        conn, reused = self._acquire()
+        try:
+            try:
+                return conn, self._send(conn, body, headers)
+            except _STALE_ERRORS:
+                if not reused:
+                    raise
+                conn.close()
+                return conn, self._send(conn, body, headers)
+        except BaseException:
+            self.release(conn, False)
+            raise
+
+    def post(self, body: bytes, headers: dict) -> Tuple[int, bytes]:
+        conn, response = self.request(body, headers)
+        try:
+            data = response.read()
+        except BaseException:
+            self.release(conn, False)
+            raise
+        self.release(conn, not response.will_close)
+        return response.status, data
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockServer:
+    """Local stand-in GraphQL server.
+
+    `resolve(payload, handler)` returns the response dict of one POSTed payload,
+    or a `(status, dict)` tuple, or None to close the connection without answering.
+    Every payload is recorded in `requests`.
+    """
+    def __init__(self, resolve):
+        self.resolve = resolve
+        self.requests = []
+        self.connections = set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                payload = json.loads(body)
+                server.requests.append(payload)
+                server.connections.add(self.client_address)
+                status, data = 200, server.resolve(payload, self)
+                if data is None:
+                    self.close_connection = True
+                    return
+                if isinstance(data, tuple):
+                    status, data = data
+                data = json.dumps(data).encode('utf8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                data = server.resolve(self.path, self)
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/graphql'
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05, ), daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def apq_resolver(resolve):
+    """
+    Wrap a resolver with the automatic persisted queries protocol.
+    """
+    documents = {}
+
+    def handle(payload, handler):
+        persisted = (payload.get('extensions') or {}).get('persistedQuery')
+        if persisted:
+            h = persisted['sha256Hash']
+            if 'query' in payload:
+                if hashlib.sha256(payload['query'].encode('utf8')).hexdigest() != h:
+                    return {'errors': [{'message': 'provided sha does not match query'}]}
+                documents[h] = payload['query']
+            elif h not in documents:
+                return {
+                    'errors': [{
+                        'message': 'PersistedQueryNotFound',
+                        'extensions': {'code': 'PERSISTED_QUERY_NOT_FOUND'}
+                    }]
+                }
+            payload = {**payload, 'query': documents[h]}
+        return resolve(payload, handler)
+
+    handle.documents = documents
+    return handle
+
+
+def no_apq_resolver(resolve):
+    """
+    Wrap a resolver as a server without persisted queries, which rejects any payload using them.
+    """
+    def handle(payload, handler):
+        if (payload.get('extensions') or {}).get('persistedQuery'):
+            return {
+                'errors': [{
+                    'message': 'PersistedQueryNotSupported',
+                    'extensions': {'code': 'PERSISTED_QUERY_NOT_SUPPORTED'}
+                }]
+            }
+        return resolve(payload, handler)
+
+    return handle
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+import unittest
+from gqlclient import AsyncGQLClient
+from gqlclient.core import _GQLConfig
+from gqlclient.dto import DtoDict
+from gqlclient.transport import TransportError
+from mock_server import MockServer, apq_resolver
+
+
+class Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def __call__(self, payload, handler):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+        if payload.get('variables', {}).get('fail'):
+            return 500, {}
+        return {'data': {'echo': {'query': payload.get('query'), 'variables': payload.get('variables')}}}
+
+
+class TestAsyncClient(unittest.IsolatedAsyncioTestCase):
+    async def test_execute(self):
+        with MockServer(Counter()) as server:
+            async with AsyncGQLClient(server.url) as client:
+                query = _GQLConfig()
+                query.echo.query = ''
+                rst = await client.execute(query)
+                self.assertIsInstance(rst, DtoDict)
+                self.assertEqual(rst.data.echo.query, '{echo {query }}')
+                rst = await client.execute('{a}', {'x': 1})
+                self.assertEqual(rst.data.echo.variables.x, 1)
+                with self.assertRaises(TransportError):
+                    await client.execute('{a}', {'fail': 1})
+                await client.execute('{a}')
+            self.assertEqual(len(server.connections), 1)
+
+    async def test_gather(self):
+        counter = Counter()
+        with MockServer(counter) as server:
+            async with AsyncGQLClient(server.url, pool_size=8) as client:
+                queries = [('{a}', {'i': i}) for i in range(40)]
+                seen = []
+                async for i, rst in client.gather(queries, concurrency=4, with_index=True):
+                    self.assertEqual(rst.data.echo.variables.i, i)
+                    seen.append(i)
+                self.assertEqual(sorted(seen), list(range(40)))
+                self.assertLessEqual(counter.peak, 4)
+                self.assertGreater(counter.peak, 1)
+            self.assertLessEqual(len(server.connections), 4)
+
+    async def test_gather_exceptions(self):
+        with MockServer(Counter()) as server:
+            async with AsyncGQLClient(server.url) as client:
+                queries = [('{a}', {'fail': i == 2, 'i': i}) for i in range(5)]
+                rst = [x async for x in client.gather(queries, return_exceptions=True, with_index=True)]
+                errors = [i for i, x in rst if isinstance(x, Exception)]
+                self.assertEqual(errors, [2])
+                with self.assertRaises(TransportError):
+                    async for _ in client.gather(queries):
+                        pass
+
+    async def test_backpressure(self):
+        counter = Counter()
+        with MockServer(counter) as server:
+            async with AsyncGQLClient(server.url) as client:
+                started = []
+
+                def queries():
+                    for i in range(100):
+                        started.append(i)
+                        yield '{a}'
+
+                results = client.gather(queries(), concurrency=3)
+                await results.__anext__()
+                await asyncio.sleep(0.05)
+                self.assertLessEqual(len(started), 4)
+                await results.aclose()
+
+    async def test_apq(self):
+        with MockServer(apq_resolver(Counter())) as server:
+            async with AsyncGQLClient(server.url, apq=True) as client:
+                for _ in range(2):
+                    rst = await client.execute('{a}')
+                    self.assertEqual(rst.data.echo.query, '{a}')
+            self.assertEqual(len(server.requests), 3)
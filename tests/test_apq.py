@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from gqlclient.apq import *
+from gqlclient.transport import urllib_post
+from mock_server import MockServer, apq_resolver, no_apq_resolver
+
+
+def echo(payload, handler):
+    return {'data': {'query': payload['query'], 'variables': payload.get('variables')}}
+
+
+class TestAPQ(unittest.TestCase):
+    def setUp(self):
+        self.resolver = apq_resolver(echo)
+        self.server = MockServer(self.resolver).__enter__()
+        self.post = urllib_post(self.server.url)
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_fallback(self):
+        registry = PersistedQueryRegistry()
+        doc = '{shop{name}}'
+        rst = execute_persisted(self.post, doc, registry=registry)
+        self.assertEqual(rst, {'data': {'query': doc, 'variables': None}})
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertNotIn('query', self.server.requests[0])
+        self.assertEqual(self.server.requests[1]['query'], doc)
+        rst = execute_persisted(self.post, doc, {'a': 1}, registry)
+        self.assertEqual(rst, {'data': {'query': doc, 'variables': {'a': 1}}})
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertNotIn('query', self.server.requests[2])
+
+    def test_not_supported(self):
+        calls = []
+        with MockServer(no_apq_resolver(echo)) as server:
+            post = urllib_post(server.url)
+            rst = execute_persisted(post, '{shop{name}}', {'a': 1}, on_unsupported=lambda: calls.append(1))
+            self.assertEqual(rst, {'data': {'query': '{shop{name}}', 'variables': {'a': 1}}})
+            self.assertEqual(len(server.requests), 2)
+            self.assertNotIn('extensions', server.requests[1])
+            self.assertEqual(calls, [1])
+
+    def test_by_hash(self):
+        registry = PersistedQueryRegistry()
+        h = registry.add('{shop{id}}')
+        rst = execute_persisted(self.post, h, registry=registry)
+        self.assertEqual(rst['data']['query'], '{shop{id}}')
+
+    def test_disk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'apq.jsonl')
+            registry = PersistedQueryRegistry(path)
+            h = registry.add('{shop{name}}')
+            registry.add('{shop{name}}')
+            registry = PersistedQueryRegistry(path)
+            self.assertEqual(len(registry), 1)
+            self.assertEqual(registry[h], '{shop{name}}')
+            self.assertEqual(registry.add('{shop{name}}'), h)
+
+    def test_is_not_found(self):
+        self.assertTrue(is_not_found({'errors': [{'message': 'PersistedQueryNotFound'}]}))
+        self.assertTrue(is_not_found({'errors': [{'message': '', 'extensions': {'code': NOT_FOUND_CODE}}]}))
+        self.assertFalse(is_not_found({'data': {}}))
+
+    def test_is_not_supported(self):
+        self.assertTrue(is_not_supported({'errors': [{'message': 'PersistedQueryNotSupported'}]}))
+        self.assertTrue(is_not_supported({'errors': [{'message': '', 'extensions': {'code': NOT_SUPPORTED_CODE}}]}))
+        self.assertFalse(is_not_supported({'errors': [{'message': NOT_FOUND}]}))
@@ -0,0 +1,104 @@
+import asyncio
+import re
+import threading
+import unittest
+from gqlclient import AsyncGQLClient, GQLClient
+from gqlclient.batch import AsyncBatcher, Batcher
+from gqlclient.core import _GQLConfig, alias_configs, parse_gql_config, split_aliased
+from gqlclient.transport import TransportError
+from mock_server import MockServer
+
+FIELD = re.compile(r'(?:(\w+):)?product \(id:"(\d+)"\)')
+
+
+def products(payload, handler):
+    data = {}
+    errors = []
+    for alias, i in FIELD.findall(payload['query']):
+        key = alias or 'product'
+        if i == '0':
+            data[key] = None
+            errors.append({'message': 'not found', 'path': [key]})
+        else:
+            data[key] = {'title': f't{i}'}
+    rst = {'data': data}
+    if errors:
+        rst['errors'] = errors
+    return rst
+
+
+def product_query(i) -> _GQLConfig:
+    product = _GQLConfig()
+    product.title = ''
+    query = _GQLConfig()
+    query.product(product, id=f'"{i}"')
+    return query
+
+
+class TestAlias(unittest.TestCase):
+    def test_alias(self):
+        a = product_query(1)
+        b = product_query(2)
+        b._data['other:product'] = b._data.pop('product')
+        root, aliases = alias_configs([a, b])
+        self.assertEqual(parse_gql_config(root),
+                         '{b0_product:product (id:"1"){title } b1_other:product (id:"2"){title }}')
+        self.assertEqual(aliases, [{'b0_product': 'product'}, {'b1_other': 'other'}])
+        body = {
+            'data': {'b0_product': {'title': 'a'}, 'b1_other': None},
+            'errors': [{'message': 'x', 'path': ['b1_other', 'title']}, {'message': 'y'}],
+        }
+        first, second = split_aliased(body, aliases)
+        self.assertEqual(first, {'data': {'product': {'title': 'a'}}, 'errors': [{'message': 'y'}]})
+        self.assertEqual(second['data'], {'other': None})
+        self.assertEqual(second['errors'], [{'message': 'x', 'path': ['other', 'title']}, {'message': 'y'}])
+        self.assertRaises(ValueError, lambda: alias_configs([{'$first': 1}]))
+
+
+class TestBatcher(unittest.TestCase):
+    def test_window(self):
+        with MockServer(products) as server, GQLClient(server.url) as client, \
+                Batcher(client, window=0.05) as batcher:
+            futures = [batcher.submit(product_query(i)) for i in range(1, 6)]
+            titles = [x.result().data.product.title for x in futures]
+            self.assertEqual(titles, ['t1', 't2', 't3', 't4', 't5'])
+            self.assertEqual(len(server.requests), 1)
+            self.assertEqual(batcher.execute(product_query(7)).data.product.title, 't7')
+            self.assertEqual(server.requests[-1]['query'], '{product (id:"7"){title }}')
+
+    def test_size(self):
+        with MockServer(products) as server, GQLClient(server.url) as client, \
+                Batcher(client, max_size=3, window=10) as batcher:
+            results = [None] * 6
+
+            def work(i):
+                results[i] = batcher.execute(product_query(i + 1))
+
+            threads = [threading.Thread(target=work, args=(i, )) for i in range(6)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(5)
+            self.assertEqual([x.data.product.title for x in results], [f't{i}' for i in range(1, 7)])
+            self.assertEqual(len(server.requests), 2)
+
+    def test_errors(self):
+        with MockServer(products) as server, GQLClient(server.url) as client, Batcher(client) as batcher:
+            ok, missing = batcher.submit(product_query(1)), batcher.submit(product_query(0))
+            self.assertNotIn('errors', ok.result())
+            self.assertEqual(missing.result().errors[0].path, ['product'])
+            self.assertIsNone(missing.result().data.product)
+        with MockServer(lambda payload, handler: (500, {})) as server, GQLClient(server.url) as client, \
+                Batcher(client) as batcher:
+            futures = [batcher.submit(product_query(i)) for i in range(1, 3)]
+            for future in futures:
+                self.assertRaises(TransportError, future.result)
+
+
+class TestAsyncBatcher(unittest.IsolatedAsyncioTestCase):
+    async def test_batch(self):
+        with MockServer(products) as server:
+            async with AsyncGQLClient(server.url) as client, AsyncBatcher(client, max_size=4) as batcher:
+                results = await asyncio.gather(*(batcher.execute(product_query(i)) for i in range(1, 7)))
+                self.assertEqual([x.data.product.title for x in results], [f't{i}' for i in range(1, 7)])
+                self.assertEqual(len(server.requests), 2)
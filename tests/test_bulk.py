@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+import unittest
+from gqlclient import GQLClient
+from gqlclient.bulk import BulkOperationError, bulk_export, iter_bulk_objects
+from gqlclient.core import _GQLConfig
+from mock_server import MockServer
+
+LINES = [
+    {'id': 'gid://shopify/Product/1', 'title': 'a'},
+    {'id': 'gid://shopify/ProductVariant/11', '__parentId': 'gid://shopify/Product/1'},
+    {'id': 'gid://shopify/InventoryLevel/111', '__parentId': 'gid://shopify/ProductVariant/11'},
+    {'id': 'gid://shopify/ProductVariant/12', '__parentId': 'gid://shopify/Product/1'},
+    {'id': 'gid://shopify/Product/2', 'title': 'b'},
+    {'id': 'gid://shopify/Product/3', 'title': 'c'},
+    {'id': 'gid://shopify/ProductVariant/31', '__parentId': 'gid://shopify/Product/3'},
+]
+FIELDS = {'ProductVariant': 'variants', 'InventoryLevel': 'inventoryLevels'}
+
+
+def write_lines(lines) -> str:
+    with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as fo:
+        for x in lines:
+            fo.write(json.dumps(x) + '\n')
+    return fo.name
+
+
+class BulkServer:
+    def __init__(self, status: str = 'COMPLETED'):
+        self.status = status
+        self.polls = 0
+        self.url = None
+
+    def __call__(self, payload, handler):
+        if isinstance(payload, str):
+            return ''.join(json.dumps(x) + '\n' for x in LINES).encode('utf8')
+        if 'bulkOperationRunQuery' in payload['query']:
+            if not payload['variables']['query'].startswith('{'):
+                return {'data': {'bulkOperationRunQuery': {'userErrors': [{'field': None, 'message': 'invalid'}]}}}
+            operation = {'id': 'gid://shopify/BulkOperation/1', 'status': 'CREATED'}
+            return {'data': {'bulkOperationRunQuery': {'bulkOperation': operation, 'userErrors': []}}}
+        self.polls += 1
+        status = 'RUNNING' if self.polls < 2 else self.status
+        node = {'id': payload['variables']['id'], 'status': status, 'errorCode': None, 'url': None}
+        if status == 'COMPLETED':
+            node['url'] = self.url.replace('/graphql', '/result.jsonl')
+        return {'data': {'node': node}}
+
+
+class TestBulkObjects(unittest.TestCase):
+    def test_assemble(self):
+        path = write_lines(LINES)
+        try:
+            trees = list(iter_bulk_objects(path, FIELDS))
+        finally:
+            os.remove(path)
+        self.assertEqual([x.title for x in trees], ['a', 'b', 'c'])
+        self.assertEqual([x.id for x in trees[0].variants], ['gid://shopify/ProductVariant/11',
+                                                            'gid://shopify/ProductVariant/12'])
+        self.assertEqual(trees[0].variants[0].inventoryLevels[0].id, 'gid://shopify/InventoryLevel/111')
+        self.assertNotIn('__parentId', trees[0].variants[0])
+        self.assertNotIn('variants', trees[1])
+        self.assertEqual(len(trees[2].variants), 1)
+
+    def test_bounds(self):
+        path = write_lines([LINES[0], LINES[4], LINES[1]])
+        try:
+            self.assertRaises(BulkOperationError, lambda: list(iter_bulk_objects(path)))
+        finally:
+            os.remove(path)
+        path = write_lines(LINES[:4])
+        try:
+            self.assertRaises(BulkOperationError, lambda: list(iter_bulk_objects(path, max_index=2)))
+        finally:
+            os.remove(path)
+        path = write_lines([])
+        try:
+            self.assertEqual(list(iter_bulk_objects(path)), [])
+        finally:
+            os.remove(path)
+
+
+class TestBulkExport(unittest.TestCase):
+    def query(self) -> _GQLConfig:
+        query = _GQLConfig()
+        query.products.edges.node.title = ''
+        return query
+
+    def test_export(self):
+        resolver = BulkServer()
+        with MockServer(resolver) as server, GQLClient(server.url) as client:
+            resolver.url = server.url
+            trees = list(bulk_export(client, self.query(), FIELDS, poll_interval=0.01))
+            self.assertEqual([x.title for x in trees], ['a', 'b', 'c'])
+            self.assertEqual(server.requests[0]['variables']['query'], '{products {edges {node {title }}}}')
+            self.assertEqual(resolver.polls, 2)
+
+    def test_failed(self):
+        resolver = BulkServer('FAILED')
+        with MockServer(resolver) as server, GQLClient(server.url) as client:
+            resolver.url = server.url
+            self.assertRaises(BulkOperationError, lambda: list(bulk_export(client, self.query(), poll_interval=0.01)))
+            self.assertRaises(BulkOperationError, lambda: list(bulk_export(client, 'query {a}')))
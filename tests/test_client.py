@@ -0,0 +1,104 @@
+import threading
+import unittest
+from gqlclient import GQLClient
+from gqlclient.core import Variable, _GQLConfig, document_hash, prepare
+from gqlclient.dto import DtoDict
+from gqlclient.transport import TransportError
+from mock_server import MockServer, apq_resolver, no_apq_resolver
+
+
+def echo(payload, handler):
+    return {'data': {'shop': {'name': payload['query'], 'variables': payload.get('variables')}}}
+
+
+def shop_query() -> _GQLConfig:
+    query = _GQLConfig()
+    query.shop.name = ''
+    return query
+
+
+class Mutation(_GQLConfig):
+    pass
+
+
+class TestClient(unittest.TestCase):
+    def test_execute(self):
+        with MockServer(echo) as server, GQLClient(server.url, pool_size=2) as client:
+            rst = client.execute(shop_query())
+            self.assertIsInstance(rst, DtoDict)
+            self.assertEqual(rst.data.shop.name, '{shop {name }}')
+            mu = Mutation()
+            mu.shopUpdate('', name='"x"')
+            self.assertEqual(client.execute(mu).data['shop']['name'], 'mutation{shopUpdate (name:"x")}')
+            self.assertEqual(client.execute('{shop{id}}', {'a': 1}).data.shop.variables, {'a': 1})
+            query = _GQLConfig()
+            query.node(shop_query(), id=Variable('id', 'ID!'))
+            rst = client.execute(prepare(query), {'id': '1'})
+            self.assertEqual(rst.data['shop']['variables'], {'id': '1'})
+            self.assertEqual(len(server.connections), 1)
+
+    def test_pool(self):
+        event = threading.Event()
+
+        def slow(payload, handler):
+            event.wait(5)
+            return echo(payload, handler)
+
+        with MockServer(slow) as server, GQLClient(server.url, pool_size=2, pool_timeout=0.2) as client:
+            threads = [threading.Thread(target=client.execute, args=('{a}', )) for _ in range(2)]
+            for t in threads:
+                t.start()
+            while len(server.requests) < 2:
+                pass
+            self.assertRaises(TimeoutError, lambda: client.execute('{a}'))
+            event.set()
+            for t in threads:
+                t.join()
+            for _ in range(5):
+                client.execute('{a}')
+            self.assertEqual(len(server.connections), 2)
+
+    def test_apq(self):
+        with MockServer(apq_resolver(echo)) as server, GQLClient(server.url, apq=True) as client:
+            self.assertEqual(client.execute(shop_query()).data.shop.name, '{shop {name }}')
+            self.assertEqual(client.execute(shop_query()).data.shop.name, '{shop {name }}')
+            self.assertEqual(len(server.requests), 3)
+
+    def test_apq_not_supported(self):
+        with MockServer(no_apq_resolver(echo)) as server, GQLClient(server.url, apq=True) as client:
+            self.assertEqual(client.execute(shop_query()).data.shop.name, '{shop {name }}')
+            self.assertEqual(client.execute(shop_query()).data.shop.name, '{shop {name }}')
+            self.assertEqual(len(server.requests), 3)
+            self.assertFalse(client.apq)
+
+    def test_canonical(self):
+        with MockServer(apq_resolver(echo)) as server, GQLClient(server.url, apq=True, canonical=True) as client:
+            query = shop_query()
+            query.products('', first=1, reverse=True)
+            self.assertEqual(client.execute(query).data.shop.name, '{products(first:1,reverse:true) shop{name}}')
+            self.assertEqual(server.requests[0]['extensions']['persistedQuery']['sha256Hash'], document_hash(query))
+            mu = Mutation()
+            mu.shopUpdate('', name='"x"')
+            client.execute(mu)
+            self.assertEqual(server.requests[-1]['extensions']['persistedQuery']['sha256Hash'], document_hash(mu))
+
+    def test_stream(self):
+        def edges(payload, handler):
+            return {'data': {'products': {'edges': [{'node': {'id': i}} for i in range(100)]}}}
+
+        with MockServer(edges) as server, GQLClient(server.url, pool_size=1) as client:
+            for _ in range(2):
+                ids = [x.id for x in client.stream('{products}', 'data.products.edges.item.node')]
+                self.assertEqual(ids, list(range(100)))
+            self.assertEqual(len(server.connections), 1)
+
+    def test_status(self):
+        def fail(payload, handler):
+            return 502, {'errors': [{'message': 'bad gateway'}]}
+
+        with MockServer(fail) as server, GQLClient(server.url) as client:
+            with self.assertRaises(TransportError) as ctx:
+                client.execute('{a}')
+            self.assertEqual(ctx.exception.status, 502)
+            with self.assertRaises(TransportError):
+                list(client.stream('{a}', 'data'))
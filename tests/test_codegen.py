@@ -0,0 +1,129 @@
+import functools
+import importlib
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from gqlclient import __main__ as codegen
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), 'mini.schema.json')
+
+
+def read_tree(path: str) -> dict:
+    """
+    The content of every generated file under `path`, by relative path.
+    """
+    rst = {}
+    for dirpath, _, names in os.walk(path):
+        for name in names:
+            if name == codegen.MANIFEST_NAME or name.endswith('.pyc'):
+                continue
+            full = os.path.join(dirpath, name)
+            with open(full, 'rb') as fi:
+                rst[os.path.relpath(full, path)] = fi.read()
+    return rst
+
+
+class CodegenTestCase(unittest.TestCase):
+    def setUp(self):
+        codegen.CLASS_FIELDS_DICT.clear()
+        codegen.SCHEMA_INDEX.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, *names: str) -> str:
+        return os.path.join(self.tmp.name, *names)
+
+    def generate(self, name: str, schema_path: str = SCHEMA_PATH, **kwargs) -> dict:
+        os.makedirs(self.path(name), exist_ok=True)
+        codegen.generate(schema_path, self.path(name), **kwargs)
+        return read_tree(self.path(name))
+
+
+class TestJobs(CodegenTestCase):
+    def test_same_output(self):
+        serial = self.generate('serial', jobs=1)
+        self.assertIn('config.py', serial)
+        self.assertEqual(self.generate('parallel', jobs=2), serial)
+
+
+class TestIncremental(CodegenTestCase):
+    def render(self, work_dir: str, schema_path: str = SCHEMA_PATH):
+        types, _ = codegen.load_schema(schema_path)
+        return codegen.render_incremental(types, work_dir)
+
+    def test_unchanged(self):
+        full = self.generate('full')
+        first = self.generate('out', incremental=True)
+        self.assertEqual(first, full)
+        self.assertTrue(os.path.exists(self.path('out', codegen.MANIFEST_NAME)))
+        _, n_stale = self.render(self.path('out'))
+        self.assertEqual(n_stale, 0)
+        self.assertEqual(self.generate('out', incremental=True), full)
+
+    def test_interface_field(self):
+        with open(SCHEMA_PATH, encoding='utf8') as fi:
+            schema = json.load(fi)
+        self.generate('out', incremental=True)
+        node = next(x for x in schema['__schema']['types'] if x['name'] == 'Node')
+        node['fields'].append(dict(node['fields'][0], name='legacyId'))
+        bumped = self.path('bumped.json')
+        with open(bumped, 'w', encoding='utf8') as fo:
+            json.dump(schema, fo)
+        _, n_stale = self.render(self.path('out'), bumped)
+        # the interface and both of its implementations
+        self.assertEqual(n_stale, 3)
+        codegen.CLASS_FIELDS_DICT.clear()
+        codegen.SCHEMA_INDEX.clear()
+        self.assertEqual(self.generate('out', bumped, incremental=True), self.generate('full', bumped))
+
+    def test_generator_hash(self):
+        self.generate('out', incremental=True)
+        with mock.patch.object(codegen, '_generator_hash', return_value='0' * 40):
+            _, n_stale = self.render(self.path('out'))
+        types, _ = codegen.load_schema(SCHEMA_PATH)
+        self.assertEqual(n_stale, len(types))
+        self.assertEqual(self.render(self.path('out'))[1], len(types))
+        self.assertEqual(self.render(self.path('out'))[1], 0)
+
+
+class TestSplit(CodegenTestCase):
+    def setUp(self):
+        super().setUp()
+        # a few types per module, so looking one up leaves the others unloaded
+        package = functools.partial(codegen.ConfigPackage, group_size=4)
+        with mock.patch.object(codegen, 'ConfigPackage', package):
+            self.generate('split_out', split=True)
+        with open(self.path('split_out', '__init__.py'), 'w'):
+            pass
+        sys.path.insert(0, self.tmp.name)
+        self.addCleanup(sys.path.remove, self.tmp.name)
+        self.addCleanup(self.unload)
+
+    def unload(self):
+        for name in list(sys.modules):
+            if name.split('.')[0] == 'split_out':
+                del sys.modules[name]
+
+    def test_lazy(self):
+        config = importlib.import_module('split_out.config')
+        self.assertNotIn('split_out.config._g0', sys.modules)
+        self.assertNotIn('Product', vars(config))
+        self.assertIn('Product', dir(config))
+        product = config.Product
+        self.assertIs(product, sys.modules['split_out.config._g0'].Product)
+        self.assertIs(vars(config)['Product'], product)
+        self.assertNotIn('split_out.config._g1', sys.modules)
+        self.assertNotIn('split_out.config._directives', sys.modules)
+        self.assertEqual(config.PageInfo.__module__, 'split_out.config._g1')
+        self.assertTrue(callable(config.include))
+        self.assertNotIn('config.py', os.listdir(self.path('split_out')))
+
+    def test_unknown(self):
+        config = importlib.import_module('split_out.config')
+        self.assertRaises(AttributeError, lambda: config.NoSuchType)
+        self.assertFalse(hasattr(config, '_g0'))
+        with self.assertRaises(ImportError):
+            exec('from split_out.config import NoSuchType', {})
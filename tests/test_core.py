@@ -0,0 +1,325 @@
+import copy
+import io
+import pickle
+import subprocess
+import sys
+import unittest
+from gqlclient.core import *
+from gqlclient.core import _GQLConfig
+
+
+def build_query(collection_id) -> _GQLConfig:
+    query = _GQLConfig()
+    con = _GQLConfig()
+    con.handle = ''
+    con.hasProduct('', id=1)
+    query.collection(con, id=collection_id)
+    return query
+
+
+class TestPrepare(unittest.TestCase):
+    def test_document(self):
+        pq = prepare(build_query(Variable('id', 'ID!')))
+        self.assertEqual(
+            pq.document,
+            'query($id:ID!){collection (id:$id){handle  hasProduct (id:1)}}')
+        self.assertEqual(list(pq.slots), ['id'])
+        pq = prepare(build_query('"gid://1"'), 'query', 'Q')
+        self.assertEqual(
+            pq.document,
+            'query Q{collection (id:"gid://1"){handle  hasProduct (id:1)}}')
+        self.assertEqual(pq.slots, {})
+
+    def test_bind(self):
+        pq = prepare(build_query(Variable('id', 'ID!')))
+        self.assertEqual(pq.bind(id='gid://1'), {'id': 'gid://1'})
+        self.assertEqual(pq(id='gid://2'), {
+            'query': pq.document,
+            'variables': {'id': 'gid://2'}
+        })
+        self.assertRaises(TypeError, lambda: pq.bind())
+        self.assertRaises(TypeError, lambda: pq.bind(id='1', other=2))
+
+    def test_default(self):
+        query = _GQLConfig()
+        query.products('', first=Variable('first', 'Int', 10),
+                       query=Variable('query', 'String'))
+        pq = prepare(query)
+        self.assertEqual(pq.bind(), {'first': 10})
+        self.assertEqual(pq.bind(first=1, query='x'), {'first': 1, 'query': 'x'})
+
+    def test_conflict(self):
+        query = _GQLConfig()
+        query.a('', id=Variable('id', 'ID!'))
+        query.b('', id=Variable('id', 'String'))
+        self.assertRaises(ValueError, lambda: prepare(query))
+
+    def test_immutable(self):
+        pq = prepare(build_query(Variable('id', 'ID!')))
+        with self.assertRaises(AttributeError):
+            pq.document = ''
+
+
+SCHEMA = {
+    'QueryRoot': {
+        'collection': ('Collection', {'id': 'ID!'}),
+        'products': ('ProductConnection!', {'first': 'Int', 'query': 'String'}),
+    },
+    'Collection': {
+        'handle': ('String!', {}),
+        'hasProduct': ('Boolean!', {'id': 'ID!'}),
+    },
+    'Mutation': {
+        'collectionReorderProducts': ('CollectionReorderProductsPayload', {
+            'id': 'ID!',
+            'moves': '[MoveInput!]!'
+        }),
+    },
+}
+
+
+class TestHoist(unittest.TestCase):
+    def test_hoist(self):
+        doc, variables = parse_gql_config(build_query('"gid://1"'), SCHEMA, 'QueryRoot')
+        self.assertEqual(
+            doc, 'query($collection_hasProduct_id:ID!,$collection_id:ID!)'
+            '{collection (id:$collection_id){handle  hasProduct (id:$collection_hasProduct_id)}}')
+        self.assertEqual(variables, {'collection_hasProduct_id': 1, 'collection_id': 'gid://1'})
+        doc2, variables = parse_gql_config(build_query('"gid://2"'), SCHEMA, 'QueryRoot')
+        self.assertEqual(doc, doc2)
+        self.assertEqual(variables['collection_id'], 'gid://2')
+
+    def test_input_objects(self):
+        mu = _GQLConfig()
+        move = _GQLConfig()
+        move.id = '"1111"'
+        move.newPosition = '"0"'
+        mu.collectionReorderProducts('', id='"gid://1"', moves=[move, {'id': '"2"', 'newPosition': 3}])
+        doc, variables = parse_gql_config(mu, SCHEMA, 'Mutation', 'mutation')
+        self.assertTrue(doc.startswith(
+            'mutation($collectionReorderProducts_id:ID!,$collectionReorderProducts_moves:[MoveInput!]!)'))
+        self.assertEqual(variables['collectionReorderProducts_moves'], [
+            {'id': '1111', 'newPosition': '0'},
+            {'id': '2', 'newPosition': 3},
+        ])
+
+    def test_untyped_stay_inline(self):
+        query = _GQLConfig()
+        query.products('', first=10, query=Variable('q', 'String'), unknown='ACTIVE')
+        doc, variables = parse_gql_config(query, SCHEMA, 'QueryRoot')
+        self.assertEqual(
+            doc, 'query($products_first:Int,$q:String){products (first:$products_first,query:$q,unknown:ACTIVE)}')
+        self.assertEqual(variables, {'products_first': 10})
+
+    def test_aliases(self):
+        query = build_query('"gid://1"')
+        query._data['other:collection'] = build_query('"gid://2"')._data['collection']
+        doc, variables = parse_gql_config(query, SCHEMA, 'QueryRoot')
+        self.assertIn('other:collection (id:$other_id)', doc)
+        self.assertEqual(variables['other_id'], 'gid://2')
+        self.assertEqual(variables['other_hasProduct_id'], 1)
+
+    def test_prepare(self):
+        pq = prepare(build_query('"gid://1"'), schema=SCHEMA, root='QueryRoot')
+        self.assertEqual(pq.bind(), {'collection_hasProduct_id': 1, 'collection_id': 'gid://1'})
+        self.assertEqual(pq.bind(collection_id='gid://2')['collection_id'], 'gid://2')
+
+
+class TestWrite(unittest.TestCase):
+    def build_tree(self, depth=3):
+        root = _GQLConfig()
+        node = root
+        for i in range(depth):
+            child = _GQLConfig()
+            child.id = ''
+            child.title = ''
+            move = _GQLConfig()
+            move.id = '"1"'
+            move.newPosition = i
+            node.field(child, first=i, moves=[move, {'id': '"2"', 'x': [1, [2.5]]}], var=Variable('v', 'Int'))
+            node = child
+        return root
+
+    def test_identical(self):
+        for depth in range(5):
+            tree = self.build_tree(depth)
+            self.assertEqual(write_gql_config(tree), parse_gql_config(tree))
+        self.assertEqual(write_gql_config('raw'), 'raw')
+        self.assertEqual(write_gql_config({}), '')
+
+    def test_sinks(self):
+        tree = self.build_tree()
+        expected = parse_gql_config(tree)
+        buf = io.BytesIO()
+        self.assertIs(write_gql_config(tree, buf), buf)
+        self.assertEqual(buf.getvalue(), expected.encode('utf8'))
+        buf = io.StringIO()
+        write_gql_config(tree, buf)
+        self.assertEqual(buf.getvalue(), expected)
+        self.assertEqual(write_gql_config(tree, bytearray()), expected.encode('utf8'))
+
+    def test_deep(self):
+        value = 1
+        for _ in range(sys.getrecursionlimit() * 2):
+            value = [value]
+        query = _GQLConfig()
+        query.nested('', ids=value)
+        doc = write_gql_config(query)
+        self.assertTrue(doc.startswith('{nested (ids:[[['))
+        self.assertEqual(len(doc), sys.getrecursionlimit() * 4 + len('{nested (ids:1)}'))
+
+
+class TestCache(unittest.TestCase):
+    def test_incremental(self):
+        query = build_query('"gid://1"')
+        doc = parse_gql_config(query)
+        con = query.collection
+        self.assertEqual(con._cache, doc[len('{collection '):-1])
+        con.hasProduct('', id=2)
+        self.assertIsNone(query._cache)
+        self.assertIsNone(con._cache)
+        self.assertEqual(parse_gql_config(query), doc.replace('id:1', 'id:2'))
+        del con.handle
+        self.assertEqual(parse_gql_config(query), '{collection (id:"gid://1"){hasProduct (id:2)}}')
+        con.title
+        self.assertEqual(parse_gql_config(query), '{collection (id:"gid://1"){hasProduct (id:2) title }}')
+
+    def test_untouched_subtrees(self):
+        query = _GQLConfig()
+        query.a.x = ''
+        query.b.y = ''
+        parse_gql_config(query)
+        b = query.b
+        cached = b._cache
+        query.a.z = ''
+        self.assertIs(b._cache, cached)
+        self.assertEqual(parse_gql_config(query), '{a {x  z } b {y }}')
+
+    def test_shared(self):
+        query = _GQLConfig()
+        con = _GQLConfig()
+        con.products.id = ''
+        query.collection(con, id=1)
+        self.assertEqual(parse_gql_config(query), '{collection (id:1){products {id }}}')
+        con.products.title = ''
+        self.assertEqual(parse_gql_config(query), '{collection (id:1){products {id  title }}}')
+        query.collection(con, id=2)
+        self.assertEqual(len(con.products._parents), 2)
+
+    def test_input_values(self):
+        query = _GQLConfig()
+        move = _GQLConfig()
+        move.id = 1
+        query.reorder('', moves=[move])
+        self.assertEqual(parse_gql_config(query), '{reorder (moves:[{id:1}])}')
+        move.id = 2
+        self.assertEqual(parse_gql_config(query), '{reorder (moves:[{id:2}])}')
+        directive_impl(query.reorder, 'include', if_='true')
+        self.assertEqual(write_gql_config(query), parse_gql_config(query))
+        self.assertEqual(parse_gql_config(query), '{reorder (moves:[{id:2}]){@include (if:true)}}')
+
+    def test_bool_values(self):
+        query = _GQLConfig()
+        query.products('', reverse=True, filter={'flag': False, 'n': 1})
+        self.assertEqual(parse_gql_config(query), '{products (reverse:true,filter:{flag:false,n:1})}')
+        self.assertEqual(write_gql_config(query), parse_gql_config(query))
+
+    def test_nested_input_values(self):
+        query = _GQLConfig()
+        move = _GQLConfig()
+        inner = _GQLConfig()
+        inner.a = 1
+        move.inner = inner
+        query.reorder('', moves=[move])
+        self.assertEqual(parse_gql_config(query), '{reorder (moves:[{inner:{a:1}}])}')
+        inner.a = 2
+        self.assertEqual(parse_gql_config(query), '{reorder (moves:[{inner:{a:2}}])}')
+        self.assertEqual(write_gql_config(query), '{reorder (moves:[{inner:{a:2}}])}')
+
+    def test_deepcopy(self):
+        query = build_query(1)
+        doc = parse_gql_config(query)
+        q2 = copy.deepcopy(query)
+        q2.collection.title = ''
+        self.assertEqual(parse_gql_config(q2), doc[:-2] + ' title }}')
+        self.assertEqual(parse_gql_config(query), doc)
+        query.collection.id = ''
+        self.assertEqual(parse_gql_config(q2), doc[:-2] + ' title }}')
+
+    def test_pickle(self):
+        query = build_query(1)
+        doc = parse_gql_config(query)
+        q2 = pickle.loads(pickle.dumps(query))
+        self.assertIsNone(q2._cache)
+        self.assertEqual(parse_gql_config(q2), doc)
+        q2.collection.title = ''
+        self.assertEqual(parse_gql_config(q2), doc[:-2] + ' title }}')
+        self.assertEqual(parse_gql_config(query), doc)
+
+
+class TestFragments(unittest.TestCase):
+    def test_routes(self):
+        routes = FragmentRoutes({'Collection': ('id', 'handle'), 'Product': ('id', 'title')})
+
+        class Node(_GQLConfig):
+            _fragments = routes.of('Collection', 'Product')
+
+        class SearchResult(_GQLConfig):
+            _fragments = routes.of('Collection', 'Product')
+
+        node = Node()
+        node.handle = ''
+        node.title = ''
+        node.id = ''
+        self.assertEqual(parse_gql_config(node), '{... on Collection {handle } ... on Product {title  id }}')
+        del node.handle
+        self.assertEqual(parse_gql_config(node), '{... on Product {title  id }}')
+        self.assertIs(Node._fragments, SearchResult()._fragments)
+        self.assertIsNone(Node._judge_attr_from('cursor'))
+        self.assertEqual(_GQLConfig._fragments, {})
+
+    def test_attr_from(self):
+        class Node(_GQLConfig):
+            _attr_from = {'handle': 'Collection'}
+
+        node = Node()
+        node.handle = ''
+        self.assertEqual(parse_gql_config(node), '{... on Collection {handle }}')
+        self.assertEqual(Node._judge_attr_from('handle'), 'Collection')
+
+
+class TestCanonical(unittest.TestCase):
+    def test_order(self):
+        a = _GQLConfig()
+        a.shop.name = ''
+        a.products('', first=10, query='"x"')
+        a.products.id = ''
+        move = _GQLConfig()
+        move.newPosition = '"0"'
+        move.id = '"1"'
+        a.reorder('', moves=[move, {'newPosition': '"1"', 'id': '"2"'}], flag=True)
+        b = _GQLConfig()
+        b.reorder('', flag=True, moves=[{'id': '"1"', 'newPosition': '"0"'}, {'id': '"2"', 'newPosition': '"1"'}])
+        b.products('', query='"x"', first=10)
+        b.products.id = ''
+        b.shop.name = ''
+        self.assertEqual(canonical_gql_config(a), canonical_gql_config(b))
+        self.assertEqual(
+            canonical_gql_config(a), '{products(first:10,query:"x"){id} '
+            'reorder(flag:true,moves:[{id:"1",newPosition:"0"},{id:"2",newPosition:"1"}]) shop{name}}')
+
+    def test_hash(self):
+        query = build_query('"gid://1"')
+        digest = document_hash(query)
+        self.assertEqual(len(digest), 64)
+        self.assertEqual(digest, document_hash(canonical_gql_config(query)))
+        self.assertNotEqual(digest, document_hash(build_query('"gid://2"')))
+        self.assertEqual(document_hash('{shop{name}}'),
+                         '353b44decaddc8204b5f22ef88e82df1a412e490b52e9e0375266a36bbca3513')
+
+
+class TestImport(unittest.TestCase):
+    def test_light(self):
+        code = 'import sys, gqlclient.core; print(sorted({"asyncio", "http.client", "ssl"} & set(sys.modules)))'
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), '[]')
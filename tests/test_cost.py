@@ -0,0 +1,149 @@
+import unittest
+from gqlclient import GQLClient
+from gqlclient.core import Variable, _GQLConfig
+from gqlclient.cost import estimate_cost
+from gqlclient.throttle import CostBucket
+from mock_server import MockServer
+
+SCHEMA = {
+    'QueryRoot': {
+        'shop': ('Shop!', {}),
+        'products': ('ProductConnection!', {'first': 'Int', 'last': 'Int', 'after': 'String'}),
+        'node': ('Node', {'id': 'ID!'}),
+    },
+    'Mutation': {
+        'productUpdate': ('ProductUpdatePayload', {'input': 'ProductInput!'}),
+    },
+    'ProductUpdatePayload': {
+        'product': ('Product', {}),
+        'userErrors': ('[UserError!]!', {}),
+    },
+    'UserError': {
+        'message': ('String!', {}),
+    },
+    'Shop': {
+        'name': ('String!', {}),
+        'primaryDomain': ('Domain!', {}),
+    },
+    'Domain': {
+        'host': ('String!', {}),
+    },
+    'ProductConnection': {
+        'edges': ('[ProductEdge!]!', {}),
+        'nodes': ('[Product!]!', {}),
+        'pageInfo': ('PageInfo!', {}),
+    },
+    'ProductEdge': {
+        'node': ('Product!', {}),
+        'cursor': ('String!', {}),
+    },
+    'Product': {
+        'title': ('String!', {}),
+        'options': ('[ProductOption!]!', {}),
+        'variants': ('ProductVariantConnection!', {'first': 'Int'}),
+    },
+    'ProductOption': {
+        'name': ('String!', {}),
+    },
+    'ProductVariantConnection': {
+        'nodes': ('[ProductVariant!]!', {}),
+    },
+    'ProductVariant': {
+        'id': ('ID!', {}),
+    },
+    'PageInfo': {
+        'hasNextPage': ('Boolean!', {}),
+    },
+}
+
+
+class QueryRoot(_GQLConfig):
+    pass
+
+
+class Mutation(_GQLConfig):
+    pass
+
+
+def products(size=None, **kwds) -> _GQLConfig:
+    variants = _GQLConfig()
+    variants.nodes.id = ''
+    node = _GQLConfig()
+    node.title = ''
+    node.options.name = ''
+    node.variants(variants, first=size)
+    rst = _GQLConfig()
+    rst.edges.node = node
+    rst.pageInfo.hasNextPage = ''
+    rst(rst, **kwds)
+    return rst
+
+
+class TestEstimate(unittest.TestCase):
+    def test_objects(self):
+        query = QueryRoot()
+        query.shop.name = ''
+        self.assertEqual(estimate_cost(query, SCHEMA), 1)
+        query.shop.primaryDomain.host = ''
+        self.assertEqual(estimate_cost(query, SCHEMA), 2)
+        self.assertEqual(estimate_cost(_GQLConfig(), SCHEMA), 0)
+
+    def test_connections(self):
+        query = QueryRoot()
+        query.products(products(3), first=10)
+        # 2 + 10 * (product 1 + options 1 + variants (2 + 3 * 1))
+        self.assertEqual(estimate_cost(query, SCHEMA), 72)
+        query.products(products(3), last='"10"')
+        self.assertEqual(estimate_cost(query, SCHEMA), 2 + 1 * 7)
+        self.assertEqual(estimate_cost(query, SCHEMA, default_size=5), 2 + 5 * 7)
+        query.products(products(3), first='$n')
+        self.assertEqual(estimate_cost(query, SCHEMA, variables={'n': 2}), 2 + 2 * 7)
+        query.products(products(3), first=Variable('n', 'Int', 4))
+        self.assertEqual(estimate_cost(query, SCHEMA), 2 + 4 * 7)
+        self.assertEqual(estimate_cost(query, SCHEMA, variables={'n': 1}), 2 + 1 * 7)
+
+    def test_schema(self):
+        query = QueryRoot()
+        query.products(products(3), first=10)
+        query.shop.primaryDomain.host = ''
+        # without a schema connections are found by their edges or nodes
+        self.assertEqual(estimate_cost(query), estimate_cost(query, SCHEMA))
+        query.shop.primaryDomain.nodes.host = ''
+        self.assertEqual(estimate_cost(query, SCHEMA) - 72, 3)
+        self.assertEqual(estimate_cost(query) - 72, 1 + 2 + 1)
+
+    def test_fragments(self):
+        product = _GQLConfig()
+        product._data['... on Product'] = {'title': '', 'options': {'name': ''}}
+        product._data['... on ProductVariant'] = {'id': ''}
+        query = QueryRoot()
+        query.node(product, id='"1"')
+        self.assertEqual(estimate_cost(query, SCHEMA), 2)
+
+    def test_mutation(self):
+        mutation = Mutation()
+        mutation.productUpdate.userErrors.message = ''
+        mutation.productUpdate.product.title = ''
+        self.assertEqual(estimate_cost(mutation, SCHEMA), 10 + 2)
+        mutation._data['other:productUpdate'] = ''
+        self.assertEqual(estimate_cost(mutation, SCHEMA), 10 + 2 + 10)
+
+
+class TestClientEstimate(unittest.TestCase):
+    def test_throttle(self):
+        bucket = CostBucket()
+        cost = {'requestedQueryCost': 70}
+        with MockServer(lambda payload, handler: {'data': {}, 'extensions': {'cost': cost}}) as server, \
+                GQLClient(server.url, throttle=bucket) as client:
+            query = QueryRoot()
+            query.products(products(3), first=10)
+            client.execute(query)
+            self.assertEqual(list(bucket.costs.values()), [70])
+            client.execute('{shop{name}}')
+            self.assertEqual(len(bucket.costs), 2)
+            query.products(products(3), first=20)
+            reserved = []
+            acquire = bucket.acquire
+            bucket.acquire = lambda cost: reserved.append(cost) or acquire(cost)
+            client.execute(query)
+            self.assertEqual(reserved, [2 + 20 * 7])
@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+from gqlclient.core import _GQLConfig, prepare
+from gqlclient.decoder import compile_decoder, decode_response
+from gqlclient.dto import *
+
+
+def build_query() -> _GQLConfig:
+    query = _GQLConfig()
+    node = query.products.edges.node
+    node.id = ''
+    node.seo.title = ''
+    query.products.pageInfo.hasNextPage = ''
+    query.node('', id=1)
+    return query
+
+
+class TestDecoder(unittest.TestCase):
+    def test_decode(self):
+        data = {
+            'products': {
+                'edges': [{'node': {'id': '1', 'seo': {'title': 't'}}}, None, {'node': {'id': '2', 'seo': None}}],
+                'pageInfo': {'hasNextPage': False},
+            },
+            'node': {'json': {'a': 1}},
+        }
+        rst = compile_decoder(build_query())(data)
+        self.assertEqual(rst, data)
+        self.assertIsInstance(rst, DtoDict)
+        self.assertIsInstance(rst.products.edges, DtoList)
+        self.assertEqual(rst.products.edges[0].node.seo.title, 't')
+        self.assertIsNone(rst.products.edges[1])
+        self.assertIsNone(rst.products.edges[2].node.seo)
+        self.assertIs(type(rst.node), dict)
+
+    def test_cache(self):
+        self.assertIs(compile_decoder(build_query()), compile_decoder(prepare(build_query())))
+        self.assertIsNot(compile_decoder(build_query()), compile_decoder(build_query(), LazyDtoDict))
+
+    def test_shape_kept(self):
+        query = build_query()
+        decoder = compile_decoder(query)
+        with mock.patch('gqlclient.decoder.response_shape') as shape:
+            self.assertIs(compile_decoder(query), decoder)
+            self.assertIs(compile_decoder(query), decoder)
+            self.assertFalse(shape.called)
+        query.products.edges.node.seo.description = ''
+        self.assertIs(compile_decoder(query), decoder)
+        query.products.edges.node.variants.nodes.id = ''
+        rst = compile_decoder(query)({'products': {'edges': [{'node': {'variants': {'nodes': [{'id': 1}]}}}]}})
+        self.assertEqual(rst.products.edges[0].node.variants.nodes[0].id, 1)
+
+    def test_nested_lists(self):
+        query = _GQLConfig()
+        query.matrix.x = ''
+        rst = compile_decoder(query)({'matrix': [[{'x': 1}], [{'x': 2}, None]]})
+        self.assertEqual(rst.matrix[1][0].x, 2)
+        self.assertIsInstance(rst.matrix[0], DtoList)
+
+    def test_response(self):
+        rst = decode_response(build_query(), '{"data": {"products": null}, "errors": [{"message": "x"}]}')
+        self.assertIsNone(rst.data.products)
+        self.assertEqual(rst.errors[0].message, 'x')
+        self.assertIsNone(decode_response(build_query(), {'data': None}).data)
@@ -168,6 +168,44 @@ class TestDtoBase(unittest.TestCase):
         self.assertIsInstance(pa[1], DtoDict)
         self.assertIsInstance(pa[2], L)
 
+    def test_key_override_chain(self):
+        class D(self.DtoDict):
+            def _key(self, attrName: str) -> str:
+                return attrName.replace('_', '-')
+
+        class E(D):
+            pass
+
+        class F(E):
+            def _key(self, attrName: str) -> str:
+                return attrName.upper()
+
+        self.assertEqual(E({"a-1": 1}).a_1, 1)
+        self.assertEqual(F({"A_1": 2}).a_1, 2)
+        self.assertEqual(D({"a-1": 1}).a_1, 1)
+        f = F()
+        f.x = 1
+        self.assertEqual(f, {'X': 1})
+        del f.x
+        self.assertEqual(f, {})
+
+    def test_key_mixin_and_late(self):
+        class M:
+            def _key(self, attrName: str) -> str:
+                return attrName.replace('_', '-')
+
+        class X(M, self.DtoDict):
+            pass
+
+        self.assertEqual(X({"a-1": 1}).a_1, 1)
+
+        class Y(self.DtoDict):
+            pass
+
+        Y._key = lambda self, attrName: attrName.upper()
+        self.assertEqual(Y({"A": 2}).a, 2)
+        self.assertEqual(self.DtoDict({"a": 3}).a, 3)
+
     def test_init(self):
         pa = self.DtoList([1, "ACS", [1, 2], {"a": 0}])
         pa = self.DtoList(pa)
@@ -208,3 +246,50 @@ class TestDto2(TestDtoBase):
         self.DtoDict = DtoDict2
         self.DtoList = DtoList2
         self.Dto = Dto
+
+
+class TestLazyDto(TestDtoBase):
+    def setUp(self):
+        self.DtoDict = LazyDtoDict
+        self.DtoList = LazyDtoList
+        self.Dto = Dto
+
+    def test_lazy(self):
+        raw = {"a": {"x": [{"y": 1}]}, "b": [[1], {"z": 2}]}
+        pd = self.DtoDict(raw)
+        self.assertIs(dict.__getitem__(pd, 'a'), raw['a'])
+        a = pd.a
+        self.assertIsInstance(a, LazyDtoDict)
+        self.assertIs(pd.a, a)
+        self.assertIs(pd['a'], a)
+        self.assertIs(type(dict.__getitem__(a, 'x')), list)
+        self.assertIsInstance(a.x[0], LazyDtoDict)
+        self.assertEqual(a.x[0].y, 1)
+        self.assertIsInstance(list(pd.b)[0], LazyDtoList)
+        self.assertIsInstance(pd.b[1], LazyDtoDict)
+        self.assertIsInstance(pd.get('b'), LazyDtoList)
+        self.assertTrue(all(isinstance(v, Dto) for v in pd.values()))
+        self.assertEqual(pd, raw)
+        self.assertEqual(pd.pop('b')[0], [1])
+        pa = self.DtoList([{'x': 1}, [2], 3])
+        self.assertEqual(pa[:2], [{'x': 1}, [2]])
+        self.assertIsInstance(pa[:2][0], LazyDtoDict)
+        self.assertIsInstance(pa.pop(0), LazyDtoDict)
+
+    def test_lazy_copies(self):
+        pd = self.DtoDict({'a': {'x': 1}, 'b': {'y': 2}, 'c': {'z': 3}})
+        self.assertEqual(pd.setdefault('a').x, 1)
+        self.assertEqual(pd.setdefault('d', {'w': 4}).w, 4)
+        self.assertEqual(pd.copy()['b'].y, 2)
+        self.assertEqual((pd | {})['c'].z, 3)
+        k, v = pd.popitem()
+        self.assertEqual((k, v.w), ('d', 4))
+        pa = self.DtoList([{'x': 1}, {'x': 2}])
+        self.assertEqual([v.x for v in reversed(pa)], [2, 1])
+        pa = self.DtoList([{'x': 1}, {'x': 2}])
+        self.assertEqual(pa.copy()[1].x, 2)
+        self.assertEqual((self.DtoList([{'x': 1}]) + [])[0].x, 1)
+        self.assertEqual((self.DtoList([{'x': 1}]) * 2)[1].x, 1)
+        pa = self.DtoList([{'x': 2}, {'x': 1}])
+        pa.sort(key=lambda v: v.x)
+        self.assertEqual(pa[0].x, 1)
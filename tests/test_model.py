@@ -0,0 +1,90 @@
+import copy
+import pickle
+import unittest
+from gqlclient.dto import LazyDtoDict
+from gqlclient.model import Model
+
+
+class TModel(Model):
+    __slots__ = ()
+    _registry = {}
+
+
+class TModelProduct(TModel):
+    __slots__ = ('id', 'title', 'from_', 'variants')
+    _fields = {'id': None, 'title': None, 'from': None, 'variants': 'TModelVariant'}
+    _renames = {'from': 'from_'}
+
+
+class TModelVariant(TModel):
+    __slots__ = ('sku', )
+    _fields = {'sku': None}
+
+
+class TestModel(unittest.TestCase):
+    def test_from_json(self):
+        data = {
+            'id': '1',
+            'from': 'x',
+            'variants': [{'sku': 'a'}, None, {'sku': 'b'}],
+            'alias': 2,
+        }
+        p = TModelProduct.from_json(data)
+        self.assertEqual(p.id, '1')
+        self.assertEqual(p.from_, 'x')
+        self.assertEqual(p.alias, 2)
+        self.assertIsInstance(p.variants[0], TModelVariant)
+        self.assertEqual([v and v.sku for v in p.variants], ['a', None, 'b'])
+        self.assertRaises(AttributeError, lambda: p.title)
+        self.assertRaises(AttributeError, lambda: p.missing)
+        self.assertEqual(p.to_dict(), data)
+        self.assertEqual(p, data)
+        self.assertFalse(hasattr(p, '__dict__'))
+
+    def test_typename(self):
+        class TModelRoot(TModel):
+            __slots__ = ('node', 'other')
+            _fields = {'node': 'TModelNode', 'other': 'TModelUnknown'}
+
+        root = TModelRoot.from_json({
+            'node': {'__typename': 'TModelVariant', 'sku': 'a'},
+            'other': {'x': {'y': 1}},
+        })
+        self.assertIsInstance(root.node, TModelVariant)
+        self.assertEqual(root.node.__getattr__('__typename'), 'TModelVariant')
+        self.assertIsInstance(root.other, LazyDtoDict)
+        self.assertEqual(root.other.x.y, 1)
+
+    def test_registries(self):
+        class Other(Model):
+            __slots__ = ()
+            _registry = {}
+
+        class TModelVariant(Other):
+            __slots__ = ('id', )
+            _fields = {'id': None}
+
+        p = TModelProduct.from_json({'variants': [{'sku': 'a'}]})
+        self.assertIs(type(p.variants[0]), TModel._registry['TModelVariant'])
+        self.assertIsNot(TModel._registry['TModelVariant'], TModelVariant)
+        self.assertNotIn('TModelProduct', Model._registry)
+        self.assertFalse(hasattr(p, '__dict__'))
+
+    def test_construct(self):
+        p = TModelProduct()
+        self.assertRaises(AttributeError, lambda: p.title)
+        self.assertRaises(AttributeError, lambda: p.missing)
+        self.assertEqual(p.to_dict(), {})
+        p.title = 't'
+        self.assertEqual(p.to_dict(), {'title': 't'})
+
+    def test_copy(self):
+        p = TModelProduct.from_json({'id': '1', 'variants': [{'sku': 'a'}], 'alias': 2})
+        for q in (copy.copy(p), copy.deepcopy(p), pickle.loads(pickle.dumps(p))):
+            self.assertIsInstance(q, TModelProduct)
+            self.assertIsInstance(q.variants[0], TModelVariant)
+            self.assertEqual(q.alias, 2)
+            self.assertEqual(q, p)
+        q = copy.copy(TModelProduct())
+        self.assertRaises(AttributeError, lambda: q.id)
+        self.assertEqual(pickle.loads(pickle.dumps(q)).to_dict(), {})
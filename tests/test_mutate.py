@@ -0,0 +1,117 @@
+import re
+import unittest
+from gqlclient import GQLClient
+from gqlclient.core import _GQLConfig
+from gqlclient.mutate import bulk_mutate, bulk_mutate_list
+from mock_server import MockServer
+
+UPDATE = re.compile(r'(\w+):productUpdate \(input:\{id:"(\d+)",title:"(\w*)"\}\)')
+MOVE = re.compile(r'\{id:"(\d+)",newPosition:"(\d+)"\}')
+
+
+class Mutation(_GQLConfig):
+    pass
+
+
+def resolve(payload, handler):
+    query = payload['query']
+    if 'collectionReorderProducts' in query:
+        if 'id:"fail"' in query:
+            return {'errors': [{'message': 'internal'}]}
+        user_errors = [{
+            'field': ['moves', str(n), 'id'],
+            'message': 'not found'
+        } for n, (i, _) in enumerate(MOVE.findall(query)) if i == '0']
+        if 'id:"gone"' in query:
+            user_errors.append({'field': ['id'], 'message': 'collection not found'})
+        return {'data': {'collectionReorderProducts': {'job': {'id': '1'}, 'userErrors': user_errors}}}
+    data = {}
+    for alias, i, title in UPDATE.findall(query):
+        user_errors = [] if title else [{'field': ['input', 'title'], 'message': 'blank'}]
+        data[alias] = {'product': None if user_errors else {'id': i}, 'userErrors': user_errors}
+    return {'data': data}
+
+
+def product_input(i: int, title: str = 'x') -> _GQLConfig:
+    item = _GQLConfig()
+    item.id = f'"{i}"'
+    item.title = f'"{title}"'
+    return item
+
+
+def update(item) -> Mutation:
+    payload = _GQLConfig()
+    payload.product.id = ''
+    payload.userErrors.field = ''
+    payload.userErrors.message = ''
+    mu = Mutation()
+    mu.productUpdate(payload, input=item)
+    return mu
+
+
+def move(i: int) -> _GQLConfig:
+    item = _GQLConfig()
+    item.id = f'"{i}"'
+    item.newPosition = f'"{i}"'
+    return item
+
+
+def reorder(collection: str):
+    def build(moves) -> Mutation:
+        payload = _GQLConfig()
+        payload.job.id = ''
+        payload.userErrors.field = ''
+        payload.userErrors.message = ''
+        mu = Mutation()
+        mu.collectionReorderProducts(payload, id=f'"{collection}"', moves=moves)
+        return mu
+
+    return build
+
+
+class TestBulkMutate(unittest.TestCase):
+    def test_aliased(self):
+        items = [product_input(i, '' if i == 3 else 'x') for i in range(1, 11)]
+        with MockServer(resolve) as server, GQLClient(server.url, pool_size=2) as client:
+            results = list(bulk_mutate(client, items, update, max_cost=50))
+            # every productUpdate costs 10 + 2
+            self.assertEqual(len(server.requests), 3)
+            self.assertTrue(all(x['query'].startswith('mutation{') for x in server.requests))
+        self.assertEqual([x.index for x in results], list(range(10)))
+        self.assertEqual([x.ok for x in results], [i != 2 for i in range(10)])
+        self.assertIs(results[0].item, items[0])
+        self.assertEqual(results[0].data.product.id, '1')
+        self.assertEqual(results[2].user_errors[0].message, 'blank')
+
+    def test_bytes(self):
+        items = [product_input(i) for i in range(1, 11)]
+        with MockServer(resolve) as server, GQLClient(server.url) as client:
+            results = list(bulk_mutate(client, items, update, max_bytes=300))
+            self.assertTrue(all(x.ok for x in results))
+            self.assertTrue(all(len(x['query']) <= 300 for x in server.requests))
+            self.assertGreater(len(server.requests), 2)
+
+    def test_transport_error(self):
+        with MockServer(lambda payload, handler: (502, {})) as server, GQLClient(server.url) as client:
+            results = list(bulk_mutate(client, [product_input(1), product_input(2)], update))
+            self.assertEqual(len(results), 2)
+            self.assertTrue(all('502' in x.errors[0]['message'] for x in results))
+
+
+class TestBulkMutateList(unittest.TestCase):
+    def test_chunks(self):
+        items = [move(i) for i in range(7)]
+        with MockServer(resolve) as server, GQLClient(server.url) as client:
+            results = list(bulk_mutate_list(client, items, reorder('1'), 'moves', max_items=3))
+            self.assertEqual(len(server.requests), 3)
+        self.assertEqual([x.ok for x in results], [False] + [True] * 6)
+        self.assertEqual(results[0].user_errors[0].field, ['moves', '0', 'id'])
+        self.assertEqual(results[4].data.job.id, '1')
+
+    def test_shared_errors(self):
+        with MockServer(resolve) as server, GQLClient(server.url) as client:
+            results = list(bulk_mutate_list(client, [move(1), move(2)], reorder('gone'), 'moves'))
+            self.assertEqual([x.user_errors[0]['message'] for x in results], ['collection not found'] * 2)
+            results = list(bulk_mutate_list(client, [move(1), move(2)], reorder('fail'), 'moves'))
+            self.assertEqual([x.errors[0]['message'] for x in results], ['internal'] * 2)
+            self.assertIsNone(results[0].data)
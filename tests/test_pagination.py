@@ -0,0 +1,85 @@
+import re
+import threading
+import unittest
+from gqlclient import AsyncGQLClient, GQLClient
+from gqlclient.core import _GQLConfig, parse_gql_config
+from gqlclient.pagination import apaginate, paginate
+from mock_server import MockServer
+
+PRODUCTS = [{'id': str(i)} for i in range(7)]
+
+
+def products(payload, handler):
+    first = int(re.search(r'first:(\d+)', payload['query']).group(1))
+    after = re.search(r'after:"(\d+)"', payload['query'])
+    start = int(after.group(1)) if after else 0
+    page = PRODUCTS[start:start + first]
+    return {
+        'data': {
+            'shop': {
+                'products': {
+                    'edges': [{'node': x} for x in page],
+                    'pageInfo': {'hasNextPage': start + first < len(PRODUCTS), 'endCursor': str(start + first)},
+                }
+            }
+        }
+    }
+
+
+def products_query() -> _GQLConfig:
+    products = _GQLConfig()
+    products.edges.node.id = ''
+    query = _GQLConfig()
+    query.shop.products(products, first=3)
+    return query
+
+
+class TestPaginate(unittest.TestCase):
+    def test_paginate(self):
+        query = products_query()
+        document = parse_gql_config(query)
+        with MockServer(products) as server, GQLClient(server.url) as client:
+            ids = [x.id for x in paginate(client, query, 'shop.products')]
+            self.assertEqual(ids, [x['id'] for x in PRODUCTS])
+            self.assertEqual(len(server.requests), 3)
+            self.assertRegex(server.requests[0]['query'], r'pageInfo {hasNextPage +endCursor }')
+            self.assertNotIn('after', server.requests[0]['query'])
+            self.assertIn('after:"6"', server.requests[2]['query'])
+            self.assertEqual(len(list(paginate(client, query, 'shop.products', page_size=10))), 7)
+        self.assertEqual(parse_gql_config(query), document)
+
+    def test_concurrent(self):
+        query = products_query()
+        with MockServer(products) as server, GQLClient(server.url) as client:
+            a = paginate(client, query, 'shop.products')
+            b = paginate(client, query, 'shop.products', page_size=2)
+            ids = []
+            for x, y in zip(a, b):
+                ids.append((x.id, y.id))
+            self.assertEqual(ids, [(x['id'], x['id']) for x in PRODUCTS])
+
+    def test_prefetch(self):
+        with MockServer(products) as server, GQLClient(server.url) as client:
+            pages = paginate(client, products_query(), 'shop.products')
+            next(pages)
+            for _ in range(100):
+                if len(server.requests) == 2:
+                    break
+                threading.Event().wait(0.01)
+            self.assertEqual(len(server.requests), 2)
+            pages.close()
+
+    def test_errors(self):
+        with MockServer(lambda payload, handler: {'errors': [{'message': 'throttled'}]}) as server, \
+                GQLClient(server.url) as client:
+            self.assertRaises(Exception, lambda: list(paginate(client, products_query(), 'shop.products')))
+            self.assertRaises(ValueError, lambda: list(paginate(client, products_query(), 'shop.orders')))
+
+
+class TestAsyncPaginate(unittest.IsolatedAsyncioTestCase):
+    async def test_paginate(self):
+        with MockServer(products) as server:
+            async with AsyncGQLClient(server.url) as client:
+                ids = [x.id async for x in apaginate(client, products_query(), 'shop.products')]
+                self.assertEqual(ids, [x['id'] for x in PRODUCTS])
+                self.assertEqual(len(server.requests), 3)
@@ -0,0 +1,149 @@
+import re
+import unittest
+from gqlclient import AsyncGQLClient, GQLClient
+from gqlclient.core import _GQLConfig, parse_gql_config
+from gqlclient.cost import estimate_cost
+from gqlclient.split import aexecute_split, execute_split, merge_data, merge_responses, split_config
+from mock_server import MockServer
+
+DATA = {
+    'shop': {'name': 'a', 'primaryDomain': {'host': 'a.example', 'url': 'https://a.example'}},
+    'products': {
+        'edges': [{
+            'node': {
+                'id': f'{i}',
+                'title': f'p{i}',
+                'options': [{'name': 'size', 'values': ['s', 'm']}],
+                'variants': {'nodes': [{'id': f'{i}.{j}', 'price': j} for j in range(2)]},
+            }
+        } for i in range(3)],
+        'pageInfo': {'hasNextPage': False},
+    },
+}
+
+
+def parse_selection(document: str) -> dict:
+    """
+    Parse the selection sets of a serialized config, arguments are skipped.
+    """
+    tokens = re.findall(r'\([^)]*\)|[{}]|[^\s{}()]+', document)
+    stack = [{}]
+    last = None
+    for token in tokens:
+        if token == '{':
+            stack[-1][last] = child = {}
+            stack.append(child)
+        elif token == '}':
+            stack.pop()
+        elif token[0] != '(':
+            last = token
+            stack[-1][last] = None
+    return stack[0][None]
+
+
+def select(data, selection):
+    if selection is None or data is None:
+        return data
+    if isinstance(data, list):
+        return [select(x, selection) for x in data]
+    rst = {}
+    for k, v in selection.items():
+        alias, _, name = k.rpartition(':')
+        rst[alias or name] = select(data[name], v)
+    return rst
+
+
+def resolve(payload, handler):
+    return {'data': select(DATA, parse_selection(payload['query']))}
+
+
+def catalog() -> _GQLConfig:
+    variants = _GQLConfig()
+    variants.nodes.id = ''
+    variants.nodes.price = ''
+    node = _GQLConfig()
+    node.title = ''
+    node.options.name = ''
+    node.options.values = ''
+    node.variants(variants, first=2)
+    products = _GQLConfig()
+    products.edges.node = node
+    products.pageInfo.hasNextPage = ''
+    query = _GQLConfig()
+    query.shop.name = ''
+    query.shop.primaryDomain.host = ''
+    query.shop.primaryDomain.url = ''
+    query.products(products, first=3)
+    return query
+
+
+class TestSplit(unittest.TestCase):
+    def test_split(self):
+        query = catalog()
+        total = estimate_cost(query)
+        self.assertEqual(split_config(query, total)[0]._data, query._data)
+        parts = split_config(query, 17)
+        self.assertGreater(len(parts), 1)
+        for part in parts:
+            self.assertLessEqual(estimate_cost(part), 17)
+        merged = merge_responses(query, [resolve({'query': parse_gql_config(x)}, None) for x in parts])
+        self.assertEqual(merged.data, select(DATA, parse_selection(parse_gql_config(query))))
+        self.assertTrue(all('(first:3)' in parse_gql_config(x) for x in parts if 'products' in x._data))
+
+    def test_unsplittable(self):
+        query = _GQLConfig()
+        query.products(query.products, first=100)
+        query.products.edges.node.title = ''
+        self.assertEqual(len(split_config(query, 10)), 1)
+        self.assertRaises(ValueError, lambda: split_config(type('Mutation', (_GQLConfig, ), {})()))
+
+    def test_max_length(self):
+        query = catalog()
+        parts = split_config(query, 10000, max_length=100)
+        self.assertGreater(len(parts), 2)
+        for part in parts:
+            self.assertLessEqual(len(parse_gql_config(part)), 100)
+
+    def test_merge(self):
+        self.assertEqual(merge_data({'a': [{'x': 1}], 'b': 1}, {'a': [{'y': 2}], 'c': None}),
+                         {'a': [{'x': 1, 'y': 2}], 'b': 1, 'c': None})
+        self.assertRaises(ValueError, lambda: merge_data({'p': [{'t': 1}, {'t': 2}]}, {'p': [{'o': 1}]}))
+        a = {'p': [{'node': {'_splitId': 1, 't': 1}}, {'node': {'_splitId': 2, 't': 2}}]}
+        b = {'p': [{'node': {'_splitId': 2, 'o': 2}}, {'node': {'_splitId': 1, 'o': 1}}]}
+        self.assertEqual([x['node']['o'] for x in merge_data(a, b)['p']], [1, 2])
+        b = {'p': [{'node': {'_splitId': 3, 'o': 3}}, {'node': {'_splitId': 1, 'o': 1}}]}
+        self.assertRaises(ValueError, lambda: merge_data(a, b))
+
+    def test_changed_between_parts(self):
+        query = catalog()
+        parts = split_config(query, 10)
+        for part in map(parse_gql_config, parts):
+            if 'edges' in part:
+                self.assertIn('_splitId:id', part)
+        responses = [resolve({'query': parse_gql_config(x)}, None) for x in parts]
+        edges = next(x['data']['products']['edges'] for x in responses[1:] if 'edges' in x['data'].get('products', {}))
+        edges.reverse()
+        merged = merge_responses(query, responses)
+        self.assertEqual(merged.data, select(DATA, parse_selection(parse_gql_config(query))))
+        del edges[0]
+        self.assertRaises(ValueError, lambda: merge_responses(query, responses))
+
+    def test_execute(self):
+        query = catalog()
+        with MockServer(resolve) as server, GQLClient(server.url) as client:
+            whole = client.execute(query)
+            rst = execute_split(client, query, max_cost=10)
+            self.assertGreater(len(server.requests), 3)
+            self.assertEqual(rst, whole)
+            self.assertEqual(rst.data.products.edges[2].node.variants.nodes[1].id, '2.1')
+            self.assertEqual(list(rst.data.shop), ['name', 'primaryDomain'])
+
+
+class TestAsyncSplit(unittest.IsolatedAsyncioTestCase):
+    async def test_execute(self):
+        query = catalog()
+        with MockServer(resolve) as server:
+            async with AsyncGQLClient(server.url) as client:
+                whole = await client.execute(query)
+                self.assertEqual(await aexecute_split(client, query, max_cost=10), whole)
+                self.assertGreater(len(server.requests), 3)
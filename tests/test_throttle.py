@@ -0,0 +1,199 @@
+import asyncio
+import threading
+import time
+import unittest
+from gqlclient import AsyncGQLClient, GQLClient
+from gqlclient.throttle import CostBucket, ThrottleScheduler, is_throttled
+from mock_server import MockServer
+
+
+class ShopBucket:
+    """Stand-in of the cost bucket of a shop."""
+    def __init__(self, maximum: float = 100.0, restore_rate: float = 1000.0, requested: int = 30, actual: int = 20):
+        self.maximum = maximum
+        self.restore_rate = restore_rate
+        self.requested = requested
+        self.actual = actual
+        self.available = maximum
+        self.stamp = time.monotonic()
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, payload, handler):
+        with self.lock:
+            now = time.monotonic()
+            self.available = min(self.maximum, self.available + (now - self.stamp) * self.restore_rate)
+            self.stamp = now
+            ok = self.available >= self.requested
+            if ok:
+                self.available -= self.actual
+            else:
+                self.throttled += 1
+            cost = {
+                'requestedQueryCost': self.requested,
+                'actualQueryCost': self.actual if ok else None,
+                'throttleStatus': {
+                    'maximumAvailable': self.maximum,
+                    'currentlyAvailable': self.available,
+                    'restoreRate': self.restore_rate,
+                },
+            }
+        if not ok:
+            return {'errors': [{'message': 'Throttled', 'extensions': {'code': 'THROTTLED'}}],
+                    'extensions': {'cost': cost}}
+        return {'data': {'shop': {'name': 'a'}}, 'extensions': {'cost': cost}}
+
+
+def hammer(client, n: int, workers: int) -> list:
+    results = []
+
+    def work():
+        for _ in range(n):
+            results.append(client.execute('{shop{name}}'))
+
+    threads = [threading.Thread(target=work) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class TestCostBucket(unittest.TestCase):
+    def test_order(self):
+        bucket = CostBucket(maximum=10, restore_rate=100)
+        bucket.acquire(10)
+        order = []
+
+        def take(cost):
+            bucket.acquire(cost)
+            order.append(cost)
+
+        big = threading.Thread(target=take, args=(10, ))
+        big.start()
+        time.sleep(0.01)
+        small = threading.Thread(target=take, args=(1, ))
+        small.start()
+        big.join()
+        small.join()
+        self.assertEqual(order, [1, 10])
+
+    def test_timeout(self):
+        bucket = CostBucket(maximum=10, restore_rate=1)
+        bucket.acquire(10)
+        self.assertRaises(TimeoutError, lambda: bucket.acquire(5, timeout=0.01))
+        self.assertEqual(bucket._waiters, [])
+
+    def test_costs(self):
+        bucket = CostBucket(max_costs=2)
+        for i in range(10):
+            bucket.release(0, {'requestedQueryCost': 30}, f'{{products (first:10,after:"c{i}"){{id }}}}')
+        self.assertEqual(len(bucket.costs), 1)
+        self.assertEqual(bucket.cost_of('{products (first:10,after:"x"){id }}'), 30)
+        self.assertEqual(bucket.cost_of('{products (first:50,after:"x"){id }}'), 100)
+        bucket.learn('{a }', 1)
+        bucket.cost_of('{products (first:10,after:"y"){id }}')
+        bucket.learn('{b }', 2)
+        self.assertEqual(list(bucket.costs), ['{products (first:10,after:""){id }}', '{b }'])
+
+    def test_release(self):
+        bucket = CostBucket(maximum=100, restore_rate=0.001)
+        bucket.acquire(50)
+        bucket.acquire(30)
+        bucket.release(50, {'requestedQueryCost': 50, 'actualQueryCost': 10}, 'a')
+        self.assertAlmostEqual(bucket.available, 60, places=1)
+        self.assertEqual(bucket.cost_of('a'), 50)
+        self.assertEqual(bucket.cost_of('b'), 100)
+        bucket.acquire(30)
+        status = {'maximumAvailable': 200.0, 'currentlyAvailable': 150.0, 'restoreRate': 10.0}
+        bucket.release(30, {'actualQueryCost': 10, 'throttleStatus': status})
+        self.assertAlmostEqual(bucket.available, 50, places=0)
+        self.assertEqual((bucket.maximum, bucket.restore_rate), (200.0, 10.0))
+        bucket.release(30, {'throttleStatus': {**status, 'currentlyAvailable': 40.0}})
+        self.assertAlmostEqual(bucket.available, 40, places=0)
+
+    def test_scheduler(self):
+        scheduler = ThrottleScheduler(maximum=10)
+        self.assertIs(scheduler.bucket('a'), scheduler.bucket('a'))
+        self.assertIsNot(scheduler.bucket('a'), scheduler.bucket('b'))
+
+
+class TestThrottledClient(unittest.TestCase):
+    def test_unthrottled(self):
+        shop = ShopBucket()
+        with MockServer(shop) as server, GQLClient(server.url, pool_size=8) as client:
+            results = hammer(client, 5, 8)
+            self.assertTrue(shop.throttled)
+            self.assertTrue(any(is_throttled(x) for x in results))
+
+    def test_throttled(self):
+        shop = ShopBucket()
+        bucket = CostBucket(maximum=shop.maximum, restore_rate=shop.restore_rate, default_cost=shop.requested)
+        with MockServer(shop) as server, GQLClient(server.url, pool_size=8, throttle=bucket) as client:
+            results = hammer(client, 5, 8)
+            self.assertEqual(len(results), 40)
+            self.assertFalse(any(is_throttled(x) for x in results))
+            self.assertEqual(shop.throttled, 0)
+            self.assertEqual(results[0].data.shop.name, 'a')
+
+    def test_retry(self):
+        shop = ShopBucket()
+        bucket = CostBucket(maximum=shop.maximum, restore_rate=shop.restore_rate, default_cost=1)
+        with MockServer(shop) as server, GQLClient(server.url, pool_size=8, throttle=bucket) as client:
+            results = hammer(client, 5, 8)
+            self.assertFalse(any(is_throttled(x) for x in results))
+            self.assertEqual(bucket.cost_of('{shop{name}}'), shop.requested)
+
+
+class TestAsyncCostBucket(unittest.IsolatedAsyncioTestCase):
+    async def test_order(self):
+        bucket = CostBucket(maximum=10, restore_rate=100)
+        bucket.acquire(10)
+        order = []
+
+        async def take(cost):
+            await bucket.acquire_async(cost)
+            order.append(cost)
+
+        big = asyncio.ensure_future(take(10))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(big, take(1))
+        self.assertEqual(order, [1, 10])
+
+    async def test_timeout(self):
+        bucket = CostBucket(maximum=10, restore_rate=1)
+        bucket.acquire(10)
+        with self.assertRaises(TimeoutError):
+            await bucket.acquire_async(5, timeout=0.01)
+        self.assertEqual(bucket._waiters, [])
+
+    async def test_thread_release(self):
+        bucket = CostBucket(maximum=10, restore_rate=0.001)
+        bucket.acquire(10)
+        threading.Timer(0.02, bucket.release, (10, {'actualQueryCost': 0})).start()
+        self.assertEqual(await asyncio.wait_for(bucket.acquire_async(10), 1), 10)
+
+
+class TestAsyncThrottledClient(unittest.IsolatedAsyncioTestCase):
+    async def hammer(self, client, n: int) -> list:
+        return [x async for x in client.gather(['{shop{name}}'] * n, concurrency=8)]
+
+    async def test_throttled(self):
+        shop = ShopBucket()
+        bucket = CostBucket(maximum=shop.maximum, restore_rate=shop.restore_rate, default_cost=shop.requested)
+        with MockServer(shop) as server:
+            async with AsyncGQLClient(server.url, pool_size=8, throttle=bucket) as client:
+                results = await self.hammer(client, 40)
+        self.assertEqual(len(results), 40)
+        self.assertFalse(any(is_throttled(x) for x in results))
+        self.assertEqual(shop.throttled, 0)
+        self.assertEqual(results[0].data.shop.name, 'a')
+
+    async def test_retry(self):
+        shop = ShopBucket()
+        bucket = CostBucket(maximum=shop.maximum, restore_rate=shop.restore_rate, default_cost=1)
+        with MockServer(shop) as server:
+            async with AsyncGQLClient(server.url, pool_size=8, throttle=bucket) as client:
+                results = await self.hammer(client, 40)
+        self.assertFalse(any(is_throttled(x) for x in results))
+        self.assertEqual(bucket.cost_of('{shop{name}}'), shop.requested)
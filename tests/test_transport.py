@@ -0,0 +1,71 @@
+import http.client
+import io
+import json
+import unittest
+from gqlclient.dto import LazyDtoDict
+from gqlclient.transport import *
+from mock_server import MockServer
+
+
+def products(n):
+    return {
+        'data': {
+            'products': {
+                'edges': [{'node': {'id': str(i), 'price': i + 0.5, 'tags': ['a'], 'seo': {'title': 't'}}}
+                          for i in range(n)],
+                'pageInfo': {'hasNextPage': False},
+            }
+        }
+    }
+
+
+class TestStream(unittest.TestCase):
+    def test_iter_items(self):
+        body = io.BytesIO(json.dumps(products(3)).encode('utf8'))
+        nodes = list(iter_items(body, 'data.products.edges.item.node'))
+        self.assertEqual(nodes, [x['node'] for x in products(3)['data']['products']['edges']])
+        self.assertIsInstance(nodes[0], LazyDtoDict)
+        self.assertEqual(nodes[1].seo.title, 't')
+        self.assertEqual(nodes[1].price, 1.5)
+        body = io.BytesIO(json.dumps(products(2)).encode('utf8'))
+        self.assertEqual(list(iter_items(body, 'data.products.pageInfo.hasNextPage')), [False])
+
+    def test_errors(self):
+        body = {'data': {'products': {'edges': [{'node': {'id': '1'}}]}}, 'errors': [{'message': 'boom'}]}
+        items = iter_items(io.BytesIO(json.dumps(body).encode('utf8')), 'data.products.edges.item.node')
+        self.assertEqual(next(items), {'id': '1'})
+        with self.assertRaises(GQLError) as ctx:
+            next(items)
+        self.assertEqual(ctx.exception.errors, [{'message': 'boom'}])
+
+    def test_stream_json(self):
+        with MockServer(lambda payload, handler: products(500)) as server:
+            nodes = stream_json(server.url, {'query': '{products{edges{node{id}}}}'},
+                                'data.products.edges.item.node')
+            self.assertEqual([x.id for x in nodes], [str(i) for i in range(500)])
+            self.assertEqual(server.requests, [{'query': '{products{edges{node{id}}}}'}])
+
+
+class TestConnectionPool(unittest.TestCase):
+    def test_retry_stale(self):
+        calls = []
+
+        def resolve(payload, handler):
+            calls.append(payload)
+            return None if len(calls) == 2 else {'data': {'n': len(calls)}}
+
+        with MockServer(resolve) as server:
+            pool = ConnectionPool(server.url, size=1)
+            body = json.dumps({'query': '{n }'}).encode('utf8')
+            self.assertEqual(pool.post(body, {}), (200, b'{"data": {"n": 1}}'))
+            # the kept alive connection is dropped, the request is sent again on a new one
+            self.assertEqual(pool.post(body, {}), (200, b'{"data": {"n": 3}}'))
+            pool.close()
+
+    def test_no_retry_fresh(self):
+        with MockServer(lambda payload, handler: None) as server:
+            pool = ConnectionPool(server.url, size=1)
+            body = json.dumps({'query': 'mutation{n }'}).encode('utf8')
+            self.assertRaises(http.client.RemoteDisconnected, pool.post, body, {})
+            self.assertEqual(len(server.requests), 1)
+            pool.close()